@@ -3,9 +3,11 @@ import json
 import urllib.request
 import urllib.error
 import re
+import time
 from typing import List
 
 from app.config import GROQ_API_KEY, GROQ_MODEL, GROQ_BASE_URL
+from app.utils.metrics import GROQ_LATENCY
 
 
 class GroqClient:
@@ -25,7 +27,10 @@ class GroqClient:
             "temperature": temperature,
             "max_tokens": max_tokens
         }
-        return await asyncio.to_thread(self._chat_sync, payload)
+        started = time.perf_counter()
+        content = await asyncio.to_thread(self._chat_sync, payload)
+        GROQ_LATENCY.observe(time.perf_counter() - started, "ok" if content is not None else "error")
+        return content
 
     def _chat_sync(self, payload: dict):
         url = f"{self.base_url}/chat/completions"
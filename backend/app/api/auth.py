@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, Header, Query, Cookie, Response
 from pydantic import BaseModel
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 from datetime import datetime, timezone, timedelta
+import asyncio
 import secrets
 
 from app.db.session import SessionLocal
 from app.db.models import User, SessionToken, PasswordReset, AuditEvent
-from app.auth.security import hash_password, verify_password, new_token, token_expiry
+from app.auth.security import hash_password_async, verify_password_async, needs_rehash, new_token, token_expiry
+from app.auth.session_cache import session_cache
 
 router = APIRouter()
 
@@ -49,6 +52,36 @@ def get_db():
         db.close()
 
 
+def user_from_token(db: Session, token: str) -> User | None:
+    """The active user behind a session token (cached), or None if it is unknown, expired or inactive."""
+    if not token:
+        return None
+    user = session_cache.get(token)
+    if user is not None:
+        return user
+    session = db.query(SessionToken).filter(SessionToken.token == token).first()
+    if not session:
+        return None
+    # SQLite hands back naive datetimes for timezone-aware columns; they are UTC.
+    expires_at = session.expires_at if session.expires_at.tzinfo else session.expires_at.replace(tzinfo=timezone.utc)
+    if expires_at < datetime.now(timezone.utc):
+        return None
+    user = db.query(User).filter(User.id == session.user_id).first()
+    if not user or not user.active:
+        return None
+    session_cache.put(token, user, expires_at)
+    return user
+
+
+def stream_user(token: str) -> User | None:
+    """Resolve a ?token= query param for SSE streams (EventSource cannot send headers)."""
+    db = SessionLocal()
+    try:
+        return user_from_token(db, token)
+    finally:
+        db.close()
+
+
 def get_current_user(
     authorization: str = Header(default=""),
     auth_token: str | None = Cookie(default=None),
@@ -62,14 +95,9 @@ def get_current_user(
 
     if not token:
         raise HTTPException(status_code=401, detail="Missing token")
-    session = db.query(SessionToken).filter(SessionToken.token == token).first()
-    if not session:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    if session.expires_at < datetime.now(timezone.utc):
-        raise HTTPException(status_code=401, detail="Token expired")
-    user = db.query(User).filter(User.id == session.user_id).first()
-    if not user or not user.active:
-        raise HTTPException(status_code=401, detail="User inactive")
+    user = user_from_token(db, token)
+    if user is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
     return user
 
 
@@ -81,38 +109,54 @@ def require_role(roles: list):
     return _guard
 
 
-@router.post("/auth/login")
-def login(payload: LoginRequest, response: Response, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == payload.email).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="Invalid email")
-    
-    if not verify_password(payload.password, user.password_hash):
-        db.add(AuditEvent(
-            user_id=user.id,
-            action="failed_login",
-            meta={"user_name": user.name, "role": user.role, "email": user.email, "reason": "incorrect_password"}
-        ))
-        db.commit()
-        raise HTTPException(status_code=401, detail="Incorrect password")
-    if not user.active:
-        raise HTTPException(status_code=403, detail="User inactive")
+# login, register, create_user and reset_password are async so they can await the
+# password hash pool; their DB work goes through asyncio.to_thread like any sync
+# endpoint, so a query waiting on a lock never stalls the event loop.
 
-    token = new_token()
-    session = SessionToken(
+def _user_by_email(db: Session, email: str) -> User | None:
+    return db.query(User).filter(User.email == email).first()
+
+
+def _record_failed_login(db: Session, user: User):
+    db.add(AuditEvent(
         user_id=user.id,
-        token=token,
-        expires_at=token_expiry()
-    )
-    db.add(session)
+        action="failed_login",
+        meta={"user_name": user.name, "role": user.role, "email": user.email, "reason": "incorrect_password"}
+    ))
     db.commit()
+
+
+def _open_session(db: Session, user: User, new_hash: str | None) -> tuple[str, datetime]:
+    if new_hash:
+        user.password_hash = new_hash
+    token = new_token()
+    expires_at = token_expiry()
+    db.add(SessionToken(user_id=user.id, token=token, expires_at=expires_at))
     db.add(AuditEvent(
         user_id=user.id,
         action="user_login",
         meta={"user_name": user.name, "role": user.role, "email": user.email}
     ))
     db.commit()
-    max_age = int((session.expires_at - datetime.now(timezone.utc)).total_seconds())
+    return token, expires_at
+
+
+@router.post("/auth/login")
+async def login(payload: LoginRequest, response: Response, db: Session = Depends(get_db)):
+    user = await asyncio.to_thread(_user_by_email, db, payload.email)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid email")
+
+    if not await verify_password_async(payload.password, user.password_hash):
+        await asyncio.to_thread(_record_failed_login, db, user)
+        raise HTTPException(status_code=401, detail="Incorrect password")
+    if not user.active:
+        raise HTTPException(status_code=403, detail="User inactive")
+    role, name = user.role, user.name
+    new_hash = await hash_password_async(payload.password) if needs_rehash(user.password_hash) else None
+
+    token, expires_at = await asyncio.to_thread(_open_session, db, user, new_hash)
+    max_age = int((expires_at - datetime.now(timezone.utc)).total_seconds())
     response.set_cookie(
         key="auth_token",
         value=token,
@@ -121,7 +165,7 @@ def login(payload: LoginRequest, response: Response, db: Session = Depends(get_d
         samesite="lax",
         max_age=max_age if max_age > 0 else None
     )
-    return {"token": token, "role": user.role, "name": user.name}
+    return {"token": token, "role": role, "name": name}
 
 
 @router.post("/auth/logout")
@@ -148,6 +192,7 @@ def logout(
                     meta={"user_name": user.name, "role": user.role, "email": user.email}
                 ))
         db.query(SessionToken).filter(SessionToken.token == token).delete()
+        session_cache.invalidate_token(token)
     response.delete_cookie("auth_token")
     db.commit()
     return {"ok": True}
@@ -211,8 +256,27 @@ def user_options(
     return {"doctors": doctors, "nurses": nurses}
 
 
+def _insert_user(db: Session, user: User, audit_user_id: int | None = None) -> dict:
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    if audit_user_id is not None:
+        db.add(AuditEvent(
+            user_id=audit_user_id,
+            action="user_created",
+            meta={
+                "user_name": user.name,
+                "role": user.role,
+                "email": user.email,
+                "department": user.department or ""
+            }
+        ))
+        db.commit()
+    return {"id": user.id, "email": user.email, "role": user.role}
+
+
 @router.post("/auth/users")
-def create_user(
+async def create_user(
     payload: CreateUserRequest,
     db: Session = Depends(get_db),
     user: User = Depends(require_role(["admin"]))
@@ -221,58 +285,40 @@ def create_user(
         raise HTTPException(status_code=400, detail="Invalid role")
     if not payload.name.strip():
         raise HTTPException(status_code=400, detail="Name required")
-    existing = db.query(User).filter(User.email == payload.email).first()
-    if existing:
+    if await asyncio.to_thread(_user_by_email, db, payload.email):
         raise HTTPException(status_code=400, detail="User exists")
     new_user = User(
         name=payload.name.strip(),
         email=payload.email,
-        password_hash=hash_password(payload.password),
+        password_hash=await hash_password_async(payload.password),
         role=payload.role,
         active=True,
         department=payload.department
     )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    db.add(AuditEvent(
-        user_id=user.id,
-        action="user_created",
-        meta={
-            "user_name": new_user.name,
-            "role": new_user.role,
-            "email": new_user.email,
-            "department": payload.department or ""
-        }
-    ))
-    db.commit()
-    return {"id": new_user.id, "email": new_user.email, "role": new_user.role}
+    return await asyncio.to_thread(_insert_user, db, new_user, user.id)
 
 
 @router.post("/auth/register")
-def register(payload: RegisterRequest, db: Session = Depends(get_db)):
+async def register(payload: RegisterRequest, db: Session = Depends(get_db)):
     allowed = ["doctor", "staff", "nurse"]
     if payload.role not in allowed:
         raise HTTPException(status_code=400, detail="Invalid role")
     if not payload.name.strip():
         raise HTTPException(status_code=400, detail="Name required")
 
-    existing = db.query(User).filter(User.email == payload.email).first()
-    if existing:
+    if await asyncio.to_thread(_user_by_email, db, payload.email):
         raise HTTPException(status_code=400, detail="User exists")
 
     new_user = User(
         name=payload.name.strip(),
         email=payload.email,
-        password_hash=hash_password(payload.password),
+        password_hash=await hash_password_async(payload.password),
         role=payload.role,
         active=False,
         department=payload.department
     )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    return {"id": new_user.id, "email": new_user.email, "role": new_user.role, "status": "pending"}
+    created = await asyncio.to_thread(_insert_user, db, new_user)
+    return {**created, "status": "pending"}
 
 
 @router.post("/auth/forgot")
@@ -293,22 +339,36 @@ def forgot_password(payload: ForgotPasswordRequest, db: Session = Depends(get_db
     return {"ok": True, "reset_token": token}
 
 
-@router.post("/auth/reset")
-def reset_password(payload: ResetPasswordRequest, db: Session = Depends(get_db)):
-    token = payload.token.strip()
-    if not token:
-        raise HTTPException(status_code=400, detail="Token required")
+def _valid_reset(db: Session, token: str) -> PasswordReset:
     reset = db.query(PasswordReset).filter(PasswordReset.token == token).first()
     if not reset or reset.used:
         raise HTTPException(status_code=400, detail="Invalid reset token")
-    if reset.expires_at < datetime.now(timezone.utc):
+    # SQLite hands back naive datetimes for timezone-aware columns; they are UTC.
+    expires_at = reset.expires_at if reset.expires_at.tzinfo else reset.expires_at.replace(tzinfo=timezone.utc)
+    if expires_at < datetime.now(timezone.utc):
         raise HTTPException(status_code=400, detail="Reset token expired")
-    user = db.query(User).filter(User.id == reset.user_id).first()
-    if not user:
+    if not db.query(User.id).filter(User.id == reset.user_id).first():
         raise HTTPException(status_code=404, detail="User not found")
-    user.password_hash = hash_password(payload.password)
+    return reset
+
+
+def _apply_reset(db: Session, reset: PasswordReset, password_hash: str) -> int:
+    user_id = reset.user_id
+    db.query(User).filter(User.id == user_id).update({"password_hash": password_hash}, synchronize_session=False)
     reset.used = True
     db.commit()
+    return user_id
+
+
+@router.post("/auth/reset")
+async def reset_password(payload: ResetPasswordRequest, db: Session = Depends(get_db)):
+    token = payload.token.strip()
+    if not token:
+        raise HTTPException(status_code=400, detail="Token required")
+    reset = await asyncio.to_thread(_valid_reset, db, token)
+    password_hash = await hash_password_async(payload.password)
+    user_id = await asyncio.to_thread(_apply_reset, db, reset, password_hash)
+    session_cache.invalidate_user(user_id)
     return {"ok": True}
 
 
@@ -346,6 +406,7 @@ def approve_access_request(
         raise HTTPException(status_code=404, detail="User not found")
     target.active = True
     db.commit()
+    session_cache.invalidate_user(target.id)
     db.add(AuditEvent(
         user_id=user.id,
         action="user_created",
@@ -380,6 +441,7 @@ def reject_access_request(
     ))
     db.delete(target)
     db.commit()
+    session_cache.invalidate_user(user_id)
     return {"ok": True}
 
 
@@ -389,14 +451,14 @@ def list_staff(
     user: User = Depends(require_role(["admin"]))
 ):
     users = db.query(User).order_by(User.created_at.desc()).all()
+    last_active = dict(
+        db.query(AuditEvent.user_id, func.max(AuditEvent.created_at))
+        .group_by(AuditEvent.user_id)
+        .all()
+    )
     results = []
     for row in users:
-        last_event = (
-            db.query(AuditEvent)
-            .filter(AuditEvent.user_id == row.id)
-            .order_by(AuditEvent.created_at.desc())
-            .first()
-        )
+        last_seen = last_active.get(row.id)
         results.append({
             "id": row.id,
             "name": row.name,
@@ -405,7 +467,7 @@ def list_staff(
             "active": row.active,
             "department": row.department,
             "created_at": row.created_at.isoformat() if row.created_at else None,
-            "last_active": last_event.created_at.isoformat() if last_event and last_event.created_at else None
+            "last_active": last_seen.isoformat() if last_seen else None
         })
     return results
 
@@ -430,20 +492,20 @@ def list_admin_events(
         "twilio_webhook_error"
     ]
     rows = (
-        db.query(AuditEvent)
+        db.query(AuditEvent, User.name, User.role)
+        .outerjoin(User, User.id == AuditEvent.user_id)
         .filter(AuditEvent.action.in_(allowed))
         .order_by(AuditEvent.created_at.desc())
         .limit(limit)
         .all()
     )
     results = []
-    for row in rows:
-        actor = db.query(User).filter(User.id == row.user_id).first()
+    for row, actor_name, actor_role in rows:
         meta = row.meta or {}
-        if actor:
+        if actor_name is not None:
             meta = dict(meta)
-            meta.setdefault("user_name", actor.name)
-            meta.setdefault("role", actor.role)
+            meta.setdefault("user_name", actor_name)
+            meta.setdefault("role", actor_role)
         results.append({
             "id": row.id,
             "user_id": row.user_id,
@@ -460,24 +522,24 @@ def security_metrics(
     user: User = Depends(require_role(["admin"]))
 ):
     now = datetime.now(timezone.utc)
-    users = db.query(User).all()
-    active_users = [u for u in users if u.active]
-    active_count = len(active_users) or 1
-
-    active_sessions = (
-        db.query(SessionToken)
-        .filter(SessionToken.expires_at > now)
-        .all()
-    )
-    active_session_users = {s.user_id for s in active_sessions}
-    mfa_coverage = round((len([u for u in active_users if u.id in active_session_users]) / active_count) * 100)
-
     ninety_days_ago = now - timedelta(days=90)
-    rotated = len([u for u in active_users if u.created_at and u.created_at >= ninety_days_ago])
+    is_active = User.active.is_(True)
+    active_count, rotated, policy_exceptions = db.query(
+        func.count(case((is_active, 1))),
+        func.count(case((is_active & (User.created_at >= ninety_days_ago), 1))),
+        func.count(case((~is_active, 1))),
+    ).one()
+    active_count = active_count or 1
+
+    with_session = (
+        db.query(func.count(func.distinct(SessionToken.user_id)))
+        .join(User, User.id == SessionToken.user_id)
+        .filter(is_active, SessionToken.expires_at > now)
+        .scalar()
+    )
+    mfa_coverage = round((with_session / active_count) * 100)
     password_rotation = round((rotated / active_count) * 100)
 
-    policy_exceptions = len([u for u in users if not u.active])
-
     return {
         "mfa_coverage": mfa_coverage,
         "password_rotation": password_rotation,
@@ -512,4 +574,5 @@ def delete_user(
     ))
     db.delete(target)
     db.commit()
+    session_cache.invalidate_user(user_id)
     return {"ok": True}
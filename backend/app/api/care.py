@@ -6,13 +6,18 @@ from zoneinfo import ZoneInfo
 from sqlalchemy.orm import Session
 
 from app.db.session import SessionLocal
-from app.db.models import CareAssignment, Intervention, AuditEvent, User, CallLog, ReadmissionRisk, Patient, MedicationReminder, MedicationEvent
+from app.db.models import CareAssignment, Intervention, AuditEvent, User, CallLog, ReadmissionRisk, Patient, MedicationReminder, MedicationEvent, MedicationSchedule
+from app.db.medication_schedule import DEFAULT_TIMEZONE as SCHEDULE_TIMEZONE, materialize_schedule, parse_times, stop_schedule
+from app.db import reminder_state
 from app.risk.trainer import train_from_db
 from app.risk.feature_builder import build_features
 from app.risk.predictor import load_model, predict_risk
 from app.risk.shap_explainer import explain_risk
 from app.db.models import AgentResponse
 from app.api.auth import get_current_user, require_role
+from app.realtime.hub import hub
+from app.realtime.alerts import notify_high_alerts
+from app.db.call_timeline import refresh_call_timeline
 
 router = APIRouter()
 
@@ -89,7 +94,9 @@ class MedicationBulkIn(BaseModel):
     medication_name: str
     dose: Optional[str] = None
     times: List[str]  # ["morning", "afternoon", "evening"] or specific "HH:MM"
-    days: int = 1
+    days: int = 1  # course length; ignored when until_stopped
+    interval_days: int = 1  # every n-th day
+    until_stopped: bool = False  # open-ended: keeps going until the schedule is stopped
 
 
 @router.get("/care/assignments")
@@ -213,6 +220,13 @@ def create_audit(
     return {"id": row.id}
 
 
+def _notify_risk_changed(patient_id: int):
+    hub.notify("logs", int(patient_id))
+    hub.notify("patients")
+    hub.notify("alerts")
+    notify_high_alerts()
+
+
 @router.post("/care/risk-override")
 def risk_override(
     payload: RiskOverrideIn,
@@ -280,6 +294,8 @@ def risk_override(
     db.add(audit)
     db.commit()
     db.refresh(risk)
+    refresh_call_timeline(db, log.id)
+    _notify_risk_changed(payload.patient_id)
     return {"ok": True, "call_log_id": log.id, "risk_score": risk_score, "risk_level": log.risk_level}
 
 
@@ -314,6 +330,8 @@ def response_review(
     db.add(audit)
     db.commit()
     db.refresh(audit)
+    refresh_call_timeline(db, log.id)
+    hub.notify("logs", payload.patient_id)
     return {"ok": True, "id": audit.id}
 
 
@@ -549,6 +567,8 @@ async def response_correction(
     db.add(audit)
     db.commit()
     db.refresh(audit)
+    refresh_call_timeline(db, log.id)
+    _notify_risk_changed(patient_id)
     return {"ok": True, "id": audit.id}
 
 
@@ -602,54 +622,75 @@ def create_bulk_medication_reminders(
 ):
     if not payload.patient_id or not payload.medication_name:
         raise HTTPException(status_code=400, detail="patient_id and medication_name required")
-    
-    ist = ZoneInfo("Asia/Kolkata")
-    now_ist = datetime.now(ist)
-    
-    time_map = {
-        "morning": "09:00",
-        "afternoon": "14:00",
-        "evening": "20:00"
-    }
+    if payload.days < 1 or payload.interval_days < 1:
+        raise HTTPException(status_code=400, detail="days and interval_days must be >= 1")
+    try:
+        times = parse_times(payload.times)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    reminders_created = []
-    for day_offset in range(payload.days):
-        base_date = now_ist + timedelta(days=day_offset)
-        for t_key in payload.times:
-            t_str = time_map.get(t_key.lower(), t_key)
-            try:
-                hour, minute = map(int, t_str.split(':'))
-                scheduled_ist = base_date.replace(hour=hour, minute=minute, second=0, microsecond=0)
-                
-                # If scheduled time is in the past for today, skip or move to tomorrow?
-                # Usually better to only schedule future ones if it's "today"
-                if day_offset == 0 and scheduled_ist < now_ist:
-                    continue
-                
-                scheduled_utc = scheduled_ist.astimezone(ZoneInfo("UTC"))
-                
-                reminder = MedicationReminder(
-                    patient_id=payload.patient_id,
-                    medication_name=payload.medication_name,
-                    dose=payload.dose,
-                    scheduled_for=scheduled_utc,
-                    status="scheduled"
-                )
-                db.add(reminder)
-                db.flush() # Get ID
-                
-                db.add(MedicationEvent(
-                    reminder_id=reminder.id,
-                    event_type="scheduled",
-                    meta={"scheduled_for": scheduled_utc.isoformat(), "label": t_key}
-                ))
-                reminders_created.append(reminder.id)
-            except Exception as e:
-                print(f"Error scheduling {t_key}: {e}")
-                continue
-    
+    now_utc = datetime.now(timezone.utc)
+    today = now_utc.astimezone(ZoneInfo(SCHEDULE_TIMEZONE)).date()
+    schedule = MedicationSchedule(
+        patient_id=payload.patient_id,
+        medication_name=payload.medication_name,
+        dose=payload.dose,
+        times=times,
+        interval_days=payload.interval_days,
+        timezone=SCHEDULE_TIMEZONE,
+        start_date=today,
+        end_date=None if payload.until_stopped else today + timedelta(days=payload.days - 1),
+    )
+    db.add(schedule)
+    db.flush()
+    # Only the first few days are created now; the scheduler materializes the rest as they come up.
+    reminders_created = materialize_schedule(db, schedule, now_utc)
     db.commit()
-    return {"ok": True, "count": len(reminders_created), "ids": reminders_created}
+    return {"ok": True, "count": len(reminders_created), "ids": reminders_created, "schedule_id": schedule.id}
+
+
+def _schedule_out(schedule: MedicationSchedule) -> dict:
+    return {
+        "id": schedule.id,
+        "patient_id": schedule.patient_id,
+        "medication_name": schedule.medication_name,
+        "dose": schedule.dose,
+        "times": schedule.times,
+        "interval_days": schedule.interval_days,
+        "timezone": schedule.timezone,
+        "start_date": str(schedule.start_date),
+        "end_date": str(schedule.end_date) if schedule.end_date else None,
+        "materialized_through": str(schedule.materialized_through) if schedule.materialized_through else None,
+        "active": schedule.active,
+    }
+
+
+@router.get("/care/medication/schedules")
+def list_medication_schedules(
+    patient_id: Optional[int] = None,
+    include_inactive: bool = False,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    query = db.query(MedicationSchedule)
+    if patient_id:
+        query = query.filter(MedicationSchedule.patient_id == patient_id)
+    if not include_inactive:
+        query = query.filter(MedicationSchedule.active.is_(True))
+    return [_schedule_out(row) for row in query.order_by(MedicationSchedule.created_at.desc()).limit(100)]
+
+
+@router.post("/care/medication/schedules/{schedule_id}/stop")
+def stop_medication_schedule(
+    schedule_id: int,
+    db: Session = Depends(get_db),
+    user: User = Depends(require_role(["nurse", "staff", "admin"]))
+):
+    schedule = db.query(MedicationSchedule).filter(MedicationSchedule.id == schedule_id).first()
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    removed = stop_schedule(db, schedule)
+    return {"ok": True, "removed_reminders": removed}
 
 
 @router.post("/care/medication/reminders/{reminder_id}/trigger-call")
@@ -668,10 +709,11 @@ def trigger_medication_call_endpoint(
         raise HTTPException(status_code=404, detail="Patient not found")
     
     call = make_medication_call(patient.phone_number, reminder.id)
-    reminder.call_placed_at = datetime.utcnow()
-    reminder.call_sid = call.sid if call else None
-    reminder.status = "call_placed"
-    
+    # Staff can re-call from any state; still one UPDATE, so a callback landing now is not lost.
+    reminder_state.transition(
+        db, reminder.id, reminder_state.CALL_PLACED, force=True,
+        call_sid=call.sid if call else None,
+    )
     db.add(MedicationEvent(
         reminder_id=reminder.id,
         event_type="call_placed",
@@ -739,16 +781,19 @@ def update_medication_reminder(
         else:
             scheduled_for = scheduled_for.astimezone(ZoneInfo("UTC"))
         reminder.scheduled_for = scheduled_for
+        if reminder.status == reminder_state.SCHEDULED:
+            reminder.next_action_at = scheduled_for
 
     if payload.dose is not None:
         reminder.dose = payload.dose
 
     if payload.status is not None:
         status = payload.status.strip().lower()
-        allowed = {"scheduled", "paused", "sms_sent", "call_placed", "taken", "missed", "no_response", "not_taken"}
-        if status not in allowed:
+        if status not in reminder_state.STATUSES:
             raise HTTPException(status_code=400, detail="Invalid reminder status")
-        reminder.status = status
+        if status != reminder.status:
+            db.flush()
+            reminder_state.transition(db, reminder.id, status, force=True)
 
     db.commit()
     db.refresh(reminder)
@@ -769,21 +814,16 @@ def list_audit(
     user: User = Depends(require_role(["admin"]))
 ):
     rows = (
-        db.query(AuditEvent)
+        db.query(AuditEvent, User.name, Patient.name)
+        .outerjoin(User, User.id == AuditEvent.user_id)
+        .outerjoin(Patient, Patient.id == AuditEvent.patient_id)
         .order_by(AuditEvent.created_at.desc())
         .limit(limit)
         .all()
     )
     results = []
-    for row in rows:
-        meta = row.meta or {}
-        patient_name = None
-        if meta.get("patient_id") is not None:
-            patient = db.query(Patient).filter(Patient.id == meta.get("patient_id")).first()
-            patient_name = patient.name if patient else None
-        actor = db.query(User).filter(User.id == row.user_id).first()
-        doctor_name = actor.name if actor else None
-        enriched = dict(meta)
+    for row, doctor_name, patient_name in rows:
+        enriched = dict(row.meta or {})
         if patient_name:
             enriched["patient_name"] = patient_name
         if doctor_name:
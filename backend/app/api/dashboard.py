@@ -1,22 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import FileResponse, JSONResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime, date, timedelta, timezone
 from zoneinfo import ZoneInfo
 import json
-import time
+import os
+import shutil
+import tempfile
 
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.db.session import SessionLocal
-from app.db.models import Patient, CallLog, ReadmissionRisk, PatientCall, AgentResponse, AuditEvent, MedicationReminder, Intervention
-from app.api.auth import get_current_user, require_role
-from app.db.models import SessionToken, User
+from app.db.models import Patient, PatientProfile, CallLog, ReadmissionRisk
+from app.api.auth import get_current_user, require_role, stream_user
 from app.telephony.twilio_client import make_call
-from app.config import DEFAULT_COUNTRY_CODE
+from app.config import DEFAULT_COUNTRY_CODE, PATIENT_ARCHIVE_ON_DELETE
 from app.agent.intents import INTENTS
 from app.agent.protocols import normalize_protocol
+from app.realtime.hub import hub
+from app.realtime.alerts import notify_high_alerts
+from app.realtime.sse import sse_response
+from app.db.call_timeline import patient_timeline, refresh_call_timeline
+from app.db.patient_archive import delete_patients
+from app.reports import aggregates as reports
+from app.reports import rollups
+from app.reports import export
 
 router = APIRouter()
 
@@ -74,51 +85,51 @@ def get_db():
         db.close()
 
 
-def _user_from_token(db: Session, token: str) -> User | None:
-    if not token:
-        return None
-    session = db.query(SessionToken).filter(SessionToken.token == token).first()
-    if not session or session.expires_at < datetime.now(timezone.utc):
-        return None
-    user = db.query(User).filter(User.id == session.user_id).first()
-    if not user or not user.active:
-        return None
-    return user
-
-
 def _get_patient_profile_meta(db: Session, patient_id: int) -> dict:
-    row = (
-        db.query(Intervention)
-        .filter(Intervention.patient_id == patient_id, Intervention.type == "patient_profile")
-        .order_by(Intervention.created_at.desc())
-        .first()
-    )
-    if not row or not row.note:
-        return {}
-    try:
-        parsed = json.loads(row.note)
-        return parsed if isinstance(parsed, dict) else {}
-    except Exception:
+    row = db.query(PatientProfile).filter(PatientProfile.patient_id == patient_id).first()
+    if not row:
         return {}
+    return {"diagnosis": row.diagnosis, "medications_text": row.medications_text}
 
 
 def _save_patient_profile_meta(db: Session, patient_id: int, diagnosis: Optional[str], medications_text: Optional[str]):
-    payload = {
-        "diagnosis": diagnosis or "",
-        "medications_text": medications_text or ""
-    }
-    row = Intervention(
-        patient_id=patient_id,
-        type="patient_profile",
-        status="active",
-        note=json.dumps(payload),
-        risk_before=None,
-        risk_after=None
-    )
-    db.add(row)
+    row = db.query(PatientProfile).filter(PatientProfile.patient_id == patient_id).first()
+    if row is None:
+        row = PatientProfile(patient_id=patient_id)
+        db.add(row)
+    row.diagnosis = diagnosis or ""
+    row.medications_text = medications_text or ""
     db.commit()
 
 
+def _latest_risk_scores(db: Session, patient_ids: list[int]) -> dict[int, Optional[float]]:
+    """Latest ReadmissionRisk score for each patient in one windowed query."""
+    if not patient_ids:
+        return {}
+    ranked = (
+        db.query(
+            ReadmissionRisk.patient_id.label("patient_id"),
+            ReadmissionRisk.score.label("score"),
+            func.row_number().over(
+                partition_by=ReadmissionRisk.patient_id,
+                order_by=(ReadmissionRisk.created_at.desc(), ReadmissionRisk.id.desc()),
+            ).label("rn"),
+        )
+        .filter(ReadmissionRisk.patient_id.in_(patient_ids))
+        .subquery()
+    )
+    rows = db.query(ranked.c.patient_id, ranked.c.score).filter(ranked.c.rn == 1).all()
+    return {row.patient_id: row.score for row in rows}
+
+
+PATIENT_FIELDS = list(PatientOut.model_fields.keys())
+
+
+def _notify_roster_changed():
+    hub.notify("patients")
+    hub.notify("scheduler")
+
+
 def track_to_protocol(track: str) -> str:
     t = (track or "").lower()
     # Cardiovascular Category
@@ -206,16 +217,39 @@ def _compute_next_call(patient: Patient) -> dict:
 
 
 @router.get("/patients", response_model=List[PatientOut])
-def list_patients(db: Session = Depends(get_db), user=Depends(get_current_user)):
-    patients = db.query(Patient).all()
+def list_patients(
+    response: Response,
+    after_id: Optional[int] = Query(None, description="Keyset cursor: return patients with id > after_id."),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size; omit to return every patient."),
+    fields: Optional[str] = Query(None, description="Comma separated subset of PatientOut fields."),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    selected = None
+    if fields:
+        selected = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in selected if f not in PATIENT_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        if "id" not in selected:
+            selected.insert(0, "id")
+
+    query = (
+        db.query(Patient, PatientProfile)
+        .outerjoin(PatientProfile, PatientProfile.patient_id == Patient.id)
+        .order_by(Patient.id.asc())
+    )
+    if after_id is not None:
+        query = query.filter(Patient.id > after_id)
+    if limit is not None:
+        query = query.limit(limit)
+    page = query.all()
+
+    need_risk = selected is None or "risk_score" in selected
+    risks = _latest_risk_scores(db, [p.id for p, _ in page]) if need_risk else {}
+
     results = []
-    for p in patients:
-        risk = (
-            db.query(ReadmissionRisk)
-            .filter(ReadmissionRisk.patient_id == p.id)
-            .order_by(ReadmissionRisk.created_at.desc())
-            .first()
-        )
+    for p, profile in page:
         results.append({
             "id": p.id,
             "name": p.name,
@@ -228,10 +262,17 @@ def list_patients(db: Session = Depends(get_db), user=Depends(get_current_user))
             "call_time": p.call_time,
             "days_to_monitor": p.days_to_monitor,
             "active": p.active,
-            "risk_score": risk.score if risk else None,
-            "diagnosis": _get_patient_profile_meta(db, p.id).get("diagnosis"),
-            "medications_text": _get_patient_profile_meta(db, p.id).get("medications_text")
+            "risk_score": risks.get(p.id),
+            "diagnosis": profile.diagnosis if profile else None,
+            "medications_text": profile.medications_text if profile else None
         })
+
+    next_cursor = str(page[-1][0].id) if limit is not None and len(page) == limit else None
+    if selected is not None:
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+        return JSONResponse([{k: row[k] for k in selected} for row in results], headers=headers)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return results
 
 
@@ -255,6 +296,7 @@ def create_patient(payload: PatientCreate, db: Session = Depends(get_db), user=D
     db.refresh(patient)
     if payload.diagnosis or payload.medications_text:
         _save_patient_profile_meta(db, patient.id, payload.diagnosis, payload.medications_text)
+    _notify_roster_changed()
     return {
         "id": patient.id,
         "name": patient.name,
@@ -317,6 +359,7 @@ def update_patient(patient_id: int, payload: PatientUpdate, db: Session = Depend
         .first()
     )
     profile = _get_patient_profile_meta(db, patient.id)
+    _notify_roster_changed()
     return {
         "id": patient.id,
         "name": patient.name,
@@ -336,143 +379,34 @@ def update_patient(patient_id: int, payload: PatientUpdate, db: Session = Depend
 
 
 @router.delete("/patients/{patient_id}")
-def delete_patient(patient_id: int, db: Session = Depends(get_db), user=Depends(require_role(["admin", "nurse", "staff"]))):
-    patient = db.query(Patient).filter(Patient.id == patient_id).first()
+def delete_patient(
+    patient_id: int,
+    archive: Optional[bool] = Query(None, description="Copy the patient's rows to archived_rows first (default: PATIENT_ARCHIVE_ON_DELETE)."),
+    db: Session = Depends(get_db),
+    user=Depends(require_role(["admin", "nurse", "staff"])),
+):
+    patient = db.query(Patient.id).filter(Patient.id == patient_id).first()
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
 
-    # Remove related care workflow rows first to satisfy FK constraints.
-    from app.db.models import CareAssignment, Intervention
-    db.query(CareAssignment).filter(CareAssignment.patient_id == patient_id).delete(synchronize_session=False)
-    db.query(Intervention).filter(Intervention.patient_id == patient_id).delete(synchronize_session=False)
-
-    call_logs = db.query(CallLog).filter(CallLog.patient_id == patient_id).all()
-    log_ids = [l.id for l in call_logs]
-    if log_ids:
-        db.query(ReadmissionRisk).filter(ReadmissionRisk.call_log_id.in_(log_ids)).delete(synchronize_session=False)
-    db.query(CallLog).filter(CallLog.patient_id == patient_id).delete(synchronize_session=False)
-
-    # Remove any patient-level risk rows not tied to a call log.
-    db.query(ReadmissionRisk).filter(ReadmissionRisk.patient_id == patient_id).delete(synchronize_session=False)
-
-    calls = db.query(PatientCall).filter(PatientCall.patient_id == str(patient_id)).all()
-    call_ids = [c.id for c in calls]
-    if call_ids:
-        db.query(AgentResponse).filter(AgentResponse.call_id.in_(call_ids)).delete(synchronize_session=False)
-    db.query(PatientCall).filter(PatientCall.patient_id == str(patient_id)).delete(synchronize_session=False)
-
-    db.delete(patient)
-    db.commit()
-    return {"ok": True}
+    summary = delete_patients(db, [patient_id], archive=PATIENT_ARCHIVE_ON_DELETE if archive is None else archive)
+    _notify_roster_changed()
+    hub.notify("logs", patient_id)
+    hub.notify("alerts")
+    notify_high_alerts()
+    return {"ok": True, "deleted": summary["deleted"], "archived": summary["archive"]}
 
 
 @router.get("/patients/{patient_id}/all-logs")
 def patient_logs(patient_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    logs = (
-        db.query(CallLog)
-        .filter(CallLog.patient_id == patient_id)
-        .order_by(CallLog.created_at.asc())
-        .all()
-    )
     patient = db.query(Patient).filter(Patient.id == patient_id).first()
+    protocol = patient.protocol if patient else None
     result = []
-    for log in logs:
-        risk = (
-            db.query(ReadmissionRisk)
-            .filter(ReadmissionRisk.call_log_id == log.id)
-            .order_by(ReadmissionRisk.created_at.desc())
-            .first()
-        )
-        responses = []
-        transcripts = []
-        if log.patient_call_id:
-            resp_rows = (
-                db.query(AgentResponse)
-                .filter(AgentResponse.call_id == log.patient_call_id)
-                .order_by(AgentResponse.created_at.asc())
-                .all()
-            )
-            review_rows = (
-                db.query(AuditEvent)
-                .filter(AuditEvent.action.in_(["response_review", "response_correction"]))
-                .order_by(AuditEvent.created_at.desc())
-                .all()
-            )
-            review_map = {}
-            correction_map = {}
-            for row in review_rows:
-                meta = row.meta or {}
-                if str(meta.get("call_log_id")) != str(log.id):
-                    continue
-                intent_id = meta.get("intent_id")
-                if not intent_id:
-                    continue
-                if row.action == "response_review" and intent_id not in review_map:
-                    review_map[intent_id] = {
-                        "label": meta.get("label"),
-                        "reason": meta.get("reason") or "",
-                        "created_at": row.created_at
-                    }
-                if row.action == "response_correction" and intent_id not in correction_map:
-                    correction_map[intent_id] = {
-                        "answer": meta.get("answer"),
-                        "trend": meta.get("trend"),
-                        "reason": meta.get("reason") or "",
-                        "created_at": row.created_at
-                    }
-            responses = [
-                {
-                    "intent_id": r.intent_id,
-                    "label": INTENTS.get(r.intent_id, {}).get("clinical_meaning") or r.intent_id,
-                    "question": (INTENTS.get(r.intent_id, {}).get("allowed_phrases") or [None])[0],
-                    "domain": INTENTS.get(r.intent_id, {}).get("domain"),
-                    "response_type": INTENTS.get(r.intent_id, {}).get("response_type"),
-                    "raw_text": r.raw_text,
-                    "structured_data": r.structured_data,
-                    "red_flag": r.red_flag,
-                    "confidence": r.confidence,
-                    "review_status": (
-                        "confirmed" if (review_map.get(r.intent_id, {}).get("label") == 1)
-                        else "cleared" if (review_map.get(r.intent_id, {}).get("label") == 0)
-                        else None
-                    ),
-                    "review_reason": review_map.get(r.intent_id, {}).get("reason"),
-                    "corrected_answer": correction_map.get(r.intent_id, {}).get("answer"),
-                    "corrected_trend": correction_map.get(r.intent_id, {}).get("trend"),
-                    "corrected_reason": correction_map.get(r.intent_id, {}).get("reason")
-                }
-                for r in resp_rows
-            ]
-            transcripts = [r.raw_text for r in resp_rows if r.raw_text]
-        explanation = risk.explanation if risk else None
-        risk_source = risk.model_version if risk else None
-        if isinstance(explanation, str):
-            try:
-                explanation = json.loads(explanation)
-            except Exception:
-                explanation = None
-        if explanation is None:
-            explanation = {"top_factors": []}
-
-        entry = {
-            "id": log.id,
-            "patient_id": log.patient_id,
-            "protocol": patient.protocol if patient else None,
-            "created_at": log.created_at,
-            "risk_score": log.risk_score,
-            "risk_level": log.risk_level,
-            "explanation": explanation,
-            "risk_source": risk_source or "model",
-            "status": log.status,
-            "answered": log.answered,
-            "transcripts": transcripts,
-            "responses": responses,
-            "doctor_note": log.doctor_note if user.role in ["doctor", "admin", "nurse"] else None,
-            "flow_log": log.flow_log,
-            "scheduled_for": log.scheduled_for,
-            "started_at": log.started_at,
-            "ended_at": log.ended_at
-        }
+    for stored in patient_timeline(db, patient_id):
+        entry = {"id": stored["id"], "patient_id": stored["patient_id"], "protocol": protocol}
+        entry.update(stored)
+        if user.role not in ["doctor", "admin", "nurse"]:
+            entry["doctor_note"] = None
         if user.role == "staff":
             entry["explanation"] = {"top_factors": []}
         result.append(entry)
@@ -494,6 +428,8 @@ def save_doctor_note(patient_id: int, log_id: int, payload: DoctorNoteIn, db: Se
         raise HTTPException(status_code=404, detail="Log not found")
     log.doctor_note = payload.note
     db.commit()
+    refresh_call_timeline(db, log.id)
+    hub.notify("logs", patient_id)
     return {"ok": True}
 
 
@@ -529,143 +465,76 @@ def manual_call(
         )
         db.add(log)
         db.commit()
+        hub.notify("logs", patient_id)
     return {"ok": True, "call_id": call_id}
 
 
 @router.get("/reports/daily")
 def daily_report(report_date: Optional[date] = None, db: Session = Depends(get_db)):
-    day = report_date or datetime.utcnow().date()
-    start = datetime.combine(day, datetime.min.time())
-    end = datetime.combine(day, datetime.max.time())
-
-    total = db.query(CallLog).filter(CallLog.created_at.between(start, end)).count()
-    answered = db.query(CallLog).filter(
-        CallLog.created_at.between(start, end),
-        CallLog.answered.is_(True)
-    ).count()
-    high_risk = db.query(CallLog).filter(
-        CallLog.created_at.between(start, end),
-        CallLog.risk_level == "high"
-    ).count()
-    failed = db.query(CallLog).filter(
-        CallLog.created_at.between(start, end),
-        CallLog.answered.is_(False)
-    ).count()
-
-    reminders_scheduled = db.query(MedicationReminder).filter(
-        MedicationReminder.scheduled_for.between(start, end)
-    ).count()
-    reminder_sms_sent = db.query(MedicationReminder).filter(
-        MedicationReminder.sms_sent_at != None,
-        MedicationReminder.sms_sent_at.between(start, end)
-    ).count()
-    confirmation_calls = db.query(MedicationReminder).filter(
-        MedicationReminder.call_placed_at != None,
-        MedicationReminder.call_placed_at.between(start, end)
-    ).count()
-    confirmation_success = db.query(MedicationReminder).filter(
-        MedicationReminder.call_placed_at != None,
-        MedicationReminder.call_placed_at.between(start, end),
-        MedicationReminder.status == "taken"
-    ).count()
-    success_rate = 0
-    if confirmation_calls:
-        success_rate = round((confirmation_success / confirmation_calls) * 100)
-
-    return {
-        "date": str(day),
-        "total_calls": total,
-        "answered_calls": answered,
-        "high_risk_calls": high_risk,
-        "ivr_calls_day": total,
-        "failed_calls": failed,
-        "reminders_scheduled": reminders_scheduled,
-        "reminder_sms_sent": reminder_sms_sent,
-        "confirmation_calls": confirmation_calls,
-        "confirmation_success_rate": success_rate
-    }
+    return reports.daily_report(db, report_date or datetime.utcnow().date())
 
 
 @router.get("/reports/system")
 def system_report(db: Session = Depends(get_db)):
-    now = datetime.now(timezone.utc)
-    minute_ago = now - timedelta(minutes=1)
-
-    calls_per_min = (
-        db.query(CallLog)
-        .filter(CallLog.created_at >= minute_ago)
-        .count()
-    )
-
-    queue = db.query(CallLog).filter(
-        CallLog.status == "scheduled",
-        CallLog.scheduled_for.isnot(None),
-        CallLog.scheduled_for <= now
-    ).count()
-
-    in_progress = db.query(CallLog).filter(CallLog.status == "in_progress").count()
-    scheduled_future = db.query(CallLog).filter(
-        CallLog.status == "scheduled",
-        CallLog.scheduled_for.isnot(None),
-        CallLog.scheduled_for > now
-    ).count()
-
-    last_success = db.query(CallLog).filter(
-        CallLog.ended_at.isnot(None)
-    ).order_by(CallLog.ended_at.desc()).first()
-
-    incident = (
-        db.query(AuditEvent)
-        .filter(AuditEvent.action.in_(["api_failure", "twilio_webhook_error", "ivr_service_restart"]))
-        .order_by(AuditEvent.created_at.desc())
-        .first()
-    )
-    system_status = "operational"
-    if queue >= 20:
-        system_status = "degraded"
-    if incident and incident.created_at and (now - incident.created_at) < timedelta(hours=6):
-        system_status = "incident"
-
-    return {
-        "timestamp": now.isoformat(),
-        "ivr_calls_per_minute": calls_per_min,
-        "queue_size": queue,
-        "active_calls": in_progress,
-        "retry_queue_size": queue,
-        "twilio_status": "Operational",
-        "twilio_checked_at": now.isoformat(),
-        "scheduler_running": in_progress + scheduled_future,
-        "scheduler_delayed": queue,
-        "scheduler_last_success": last_success.ended_at.isoformat() if last_success and last_success.ended_at else None,
-        "system_status": system_status,
-        "last_incident": incident.created_at.isoformat() if incident and incident.created_at else None
-    }
+    return reports.system_report(db, datetime.now(timezone.utc))
 
 
 @router.get("/reports/overview")
 def overview_report(report_date: Optional[date] = None, db: Session = Depends(get_db)):
-    day = report_date or datetime.utcnow().date()
-    start = datetime.combine(day, datetime.min.time())
-    end = datetime.combine(day, datetime.max.time())
-
-    monitoring_calls = db.query(CallLog).filter(CallLog.created_at.between(start, end)).count()
-    sms_sent = db.query(MedicationReminder).filter(
-        MedicationReminder.sms_sent_at != None,
-        MedicationReminder.sms_sent_at.between(start, end)
-    ).count()
-    confirmation_calls = db.query(MedicationReminder).filter(
-        MedicationReminder.call_placed_at != None,
-        MedicationReminder.call_placed_at.between(start, end)
-    ).count()
+    return reports.overview_report(db, report_date or datetime.utcnow().date())
+
 
+@router.get("/reports/trends")
+def trends_report(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    protocol: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days >= rollups.TRENDS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {rollups.TRENDS_MAX_DAYS} days")
     return {
-        "date": str(day),
-        "monitoring_calls": monitoring_calls,
-        "medication_sms": sms_sent,
-        "confirmation_calls": confirmation_calls
+        "start": str(start),
+        "end": str(end),
+        "protocol": protocol,
+        "days": rollups.trends(db, start, end, protocol)
     }
 
 
+@router.get("/reports/export/{table}")
+def export_report_table(
+    table: str,
+    format: str = Query("parquet", description="parquet or arrow"),
+    since: Optional[datetime] = Query(None, description="Only rows created at or after this time (inclusive incremental watermark)."),
+    db: Session = Depends(get_db),
+    user=Depends(require_role(["admin"])),
+):
+    if table not in export.DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown table; choose one of {sorted(export.DATASETS)}")
+    if format not in export.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {sorted(export.FORMATS)}")
+    out_dir = tempfile.mkdtemp(prefix="export-")
+    try:
+        result = export.export_table(db, table, out_dir, fmt=format, since=since, keep_empty=True)
+    except RuntimeError as e:
+        shutil.rmtree(out_dir, ignore_errors=True)
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception:
+        shutil.rmtree(out_dir, ignore_errors=True)
+        raise
+    return FileResponse(
+        result["path"],
+        filename=os.path.basename(result["path"]),
+        media_type="application/vnd.apache.parquet" if format == "parquet" else "application/vnd.apache.arrow.file",
+        headers={"X-Export-Rows": str(result["rows"]), "X-Export-Watermark": result["watermark"] or ""},
+        background=BackgroundTask(shutil.rmtree, out_dir, ignore_errors=True),
+    )
+
+
 @router.get("/scheduler")
 def scheduler_view(db: Session = Depends(get_db), user=Depends(get_current_user)):
     patients = db.query(Patient).all()
@@ -687,243 +556,128 @@ def scheduler_view(db: Session = Depends(get_db), user=Depends(get_current_user)
     return results
 
 
+def _logs_snapshot(db: Session, patient_id: int) -> list[dict]:
+    return patient_timeline(db, patient_id)
+
+
+def _logs_for_role(rows: list[dict], role: str) -> list[dict]:
+    """The logs snapshot is shared by all viewers; strip what this role may not see."""
+    if role in ["doctor", "admin", "nurse"]:
+        return rows
+    hidden = []
+    for row in rows:
+        row = dict(row, doctor_note=None)
+        if role == "staff":
+            row["explanation"] = {"top_factors": []}
+        hidden.append(row)
+    return hidden
+
+
+def _patients_snapshot(db: Session, key=None) -> list[dict]:
+    patients = db.query(Patient).order_by(Patient.id.asc()).all()
+    scores = _latest_risk_scores(db, [p.id for p in patients])
+    return [
+        {
+            "id": p.id,
+            "name": p.name,
+            "phone_number": p.phone_number,
+            "disease_track": p.disease_track,
+            "protocol": p.protocol,
+            "active": p.active,
+            "risk_score": scores.get(p.id)
+        }
+        for p in patients
+    ]
+
+
+def _scheduler_snapshot(db: Session, key=None) -> list[dict]:
+    payload = []
+    for p in db.query(Patient).order_by(Patient.id.asc()).all():
+        schedule = _compute_next_call(p)
+        payload.append({
+            "id": p.id,
+            "name": p.name,
+            "phone_number": p.phone_number,
+            "protocol": p.protocol,
+            "timezone": p.timezone,
+            "call_time": p.call_time,
+            "next_call_at": schedule["next_call_at"],
+            "days_remaining": schedule["days_remaining"],
+            "monitor_end": schedule["monitor_end"],
+            "active": p.active
+        })
+    return payload
+
+
+def _alerts_snapshot(db: Session, key=None) -> list[dict]:
+    rows = (
+        db.query(CallLog, Patient)
+        .outerjoin(Patient, Patient.id == CallLog.patient_id)
+        .filter(CallLog.risk_level == "high")
+        .order_by(CallLog.created_at.desc())
+        .limit(50)
+        .all()
+    )
+    return [
+        {
+            "log_id": log.id,
+            "patient_id": log.patient_id,
+            "patient_name": patient.name if patient else None,
+            "protocol": patient.protocol if patient else None,
+            "risk_score": log.risk_score,
+            "created_at": log.created_at.isoformat() if log.created_at else None
+        }
+        for log, patient in rows
+    ]
+
+
+hub.register("logs", _logs_snapshot)
+hub.register("patients", _patients_snapshot)
+hub.register("scheduler", _scheduler_snapshot)
+hub.register("alerts", _alerts_snapshot, key_field="log_id")
+
+
 @router.get("/stream/logs")
 def stream_logs(
     patient_id: int,
-    token: str = Query(default="")
+    token: str = Query(default=""),
+    last_event_id: Optional[str] = Header(default=None)
 ):
-    db = SessionLocal()
-    try:
-        user = _user_from_token(db, token)
-    finally:
-        db.close()
+    user = stream_user(token)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
-
-    def event_generator():
-        last_count = -1
-        while True:
-            db_local = SessionLocal()
-            try:
-                logs = (
-                    db_local.query(CallLog)
-                    .filter(CallLog.patient_id == patient_id)
-                    .order_by(CallLog.created_at.asc())
-                    .all()
-                )
-                if len(logs) != last_count:
-                    last_count = len(logs)
-                    payload = []
-                    for log in logs:
-                        risk = (
-                            db_local.query(ReadmissionRisk)
-                            .filter(ReadmissionRisk.call_log_id == log.id)
-                            .order_by(ReadmissionRisk.created_at.desc())
-                            .first()
-                        )
-                        explanation = risk.explanation if risk else None
-                        risk_source = risk.model_version if risk else None
-                        if isinstance(explanation, str):
-                            try:
-                                explanation = json.loads(explanation)
-                            except Exception:
-                                explanation = None
-                        if explanation is None:
-                            explanation = {"top_factors": []}
-
-                        responses = []
-                        transcripts = []
-                        if log.patient_call_id:
-                            resp_rows = (
-                                db_local.query(AgentResponse)
-                                .filter(AgentResponse.call_id == log.patient_call_id)
-                                .order_by(AgentResponse.created_at.asc())
-                                .all()
-                            )
-                            responses = [
-                                {
-                                    "intent_id": r.intent_id,
-                                    "label": INTENTS.get(r.intent_id, {}).get("clinical_meaning") or r.intent_id,
-                                    "question": (INTENTS.get(r.intent_id, {}).get("allowed_phrases") or [None])[0],
-                                    "domain": INTENTS.get(r.intent_id, {}).get("domain"),
-                                    "response_type": INTENTS.get(r.intent_id, {}).get("response_type"),
-                                    "raw_text": r.raw_text,
-                                    "structured_data": r.structured_data,
-                                    "red_flag": r.red_flag,
-                                    "confidence": r.confidence
-                                }
-                                for r in resp_rows
-                            ]
-                            transcripts = [r.raw_text for r in resp_rows if r.raw_text]
-
-                        entry = {
-                            "id": log.id,
-                            "protocol": None,
-                            "created_at": log.created_at.isoformat() if log.created_at else None,
-                            "risk_score": log.risk_score,
-                            "risk_level": log.risk_level,
-                            "explanation": explanation,
-                            "risk_source": risk_source or "model",
-                            "status": log.status,
-                            "answered": log.answered,
-                            "transcripts": transcripts,
-                            "responses": responses,
-                            "doctor_note": log.doctor_note if user.role in ["doctor", "admin", "nurse"] else None,
-                            "flow_log": log.flow_log,
-                            "scheduled_for": log.scheduled_for.isoformat() if log.scheduled_for else None,
-                            "started_at": log.started_at.isoformat() if log.started_at else None,
-                            "ended_at": log.ended_at.isoformat() if log.ended_at else None
-                        }
-                        if user.role == "staff":
-                            entry["explanation"] = {"top_factors": []}
-                        payload.append(entry)
-
-                    data = json.dumps(payload)
-                    yield f"event: logs\ndata: {data}\n\n"
-            finally:
-                db_local.close()
-            time.sleep(2)
-
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    return sse_response("logs", patient_id, last_event_id, transform=lambda rows: _logs_for_role(rows, user.role))
 
 
 @router.get("/stream/patients")
 def stream_patients(
-    token: str = Query(default="")
+    token: str = Query(default=""),
+    last_event_id: Optional[str] = Header(default=None)
 ):
-    db = SessionLocal()
-    try:
-        user = _user_from_token(db, token)
-    finally:
-        db.close()
-    if not user:
+    if not stream_user(token):
         raise HTTPException(status_code=401, detail="Unauthorized")
-
-    def event_generator():
-        last_signature = ""
-        while True:
-            db_local = SessionLocal()
-            try:
-                patients = db_local.query(Patient).all()
-                payload = []
-                for p in patients:
-                    risk = (
-                        db_local.query(ReadmissionRisk)
-                        .filter(ReadmissionRisk.patient_id == p.id)
-                        .order_by(ReadmissionRisk.created_at.desc())
-                        .first()
-                    )
-                    payload.append({
-                        "id": p.id,
-                        "name": p.name,
-                        "phone_number": p.phone_number,
-                        "disease_track": p.disease_track,
-                        "protocol": p.protocol,
-                        "active": p.active,
-                        "risk_score": risk.score if risk else None
-                    })
-                data = json.dumps(payload, sort_keys=True)
-                signature = str(hash(data))
-                if signature != last_signature:
-                    last_signature = signature
-                    yield f"event: patients\ndata: {data}\n\n"
-            finally:
-                db_local.close()
-            time.sleep(3)
-
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    return sse_response("patients", last_event_id=last_event_id)
 
 
 @router.get("/stream/scheduler")
 def stream_scheduler(
-    token: str = Query(default="")
+    token: str = Query(default=""),
+    last_event_id: Optional[str] = Header(default=None)
 ):
-    db = SessionLocal()
-    try:
-        user = _user_from_token(db, token)
-    finally:
-        db.close()
-    if not user:
+    if not stream_user(token):
         raise HTTPException(status_code=401, detail="Unauthorized")
-
-    def event_generator():
-        last_signature = ""
-        while True:
-            db_local = SessionLocal()
-            try:
-                patients = db_local.query(Patient).all()
-                payload = []
-                for p in patients:
-                    schedule = _compute_next_call(p)
-                    payload.append({
-                        "id": p.id,
-                        "name": p.name,
-                        "phone_number": p.phone_number,
-                        "protocol": p.protocol,
-                        "timezone": p.timezone,
-                        "call_time": p.call_time,
-                        "next_call_at": schedule["next_call_at"],
-                        "days_remaining": schedule["days_remaining"],
-                        "monitor_end": schedule["monitor_end"],
-                        "active": p.active
-                    })
-                data = json.dumps(payload, sort_keys=True)
-                signature = str(hash(data))
-                if signature != last_signature:
-                    last_signature = signature
-                    yield f"event: scheduler\ndata: {data}\n\n"
-            finally:
-                db_local.close()
-            time.sleep(3)
-
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    return sse_response("scheduler", last_event_id=last_event_id)
 
 
 @router.get("/stream/alerts")
 def stream_alerts(
-    token: str = Query(default="")
+    token: str = Query(default=""),
+    last_event_id: Optional[str] = Header(default=None)
 ):
-    db = SessionLocal()
-    try:
-        user = _user_from_token(db, token)
-    finally:
-        db.close()
+    user = stream_user(token)
     if not user or user.role not in ["doctor", "nurse", "admin", "staff"]:
         raise HTTPException(status_code=403, detail="Forbidden")
-
-    def event_generator():
-        last_signature = ""
-        while True:
-            db_local = SessionLocal()
-            try:
-                logs = (
-                    db_local.query(CallLog)
-                    .filter(CallLog.risk_level == "high")
-                    .order_by(CallLog.created_at.desc())
-                    .limit(50)
-                    .all()
-                )
-                payload = []
-                for log in logs:
-                    patient = db_local.query(Patient).filter(Patient.id == log.patient_id).first()
-                    payload.append({
-                        "log_id": log.id,
-                        "patient_id": log.patient_id,
-                        "patient_name": patient.name if patient else None,
-                        "protocol": patient.protocol if patient else None,
-                        "risk_score": log.risk_score,
-                        "created_at": log.created_at.isoformat() if log.created_at else None
-                    })
-                data = json.dumps(payload, sort_keys=True)
-                signature = str(hash(data))
-                if signature != last_signature:
-                    last_signature = signature
-                    yield f"event: alerts\ndata: {data}\n\n"
-            finally:
-                db_local.close()
-            time.sleep(5)
-
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    return sse_response("alerts", last_event_id=last_event_id)
 
 
 @router.get("/meta/intents")
@@ -8,13 +8,12 @@ import json
 from datetime import datetime, timezone, date, timedelta
 from typing import Optional, List, Any
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from pydantic import BaseModel, Field, validator
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, desc, func
 
-from app.api.auth import get_current_user, require_role
+from app.api.auth import get_current_user, require_role, stream_user
 from app.agent.intents import INTENTS
 from app.db.models import (
     User,
@@ -30,9 +29,18 @@ from app.db.models import (
 )
 from app.agent.protocols import get_protocol_intents
 from app.db.session import SessionLocal
+from app.realtime.alerts import HIGH_ALERTS_CACHE, notify_high_alerts
+from app.realtime.hub import hub
+from app.realtime.sse import sse_response
+from app.db.call_timeline import refresh_call_timeline
 
 router = APIRouter()
 
+# CallLog.risk_score is stored on a 0-100 scale.
+HIGH_ALERT_SCORE = 70.0
+HIGH_ALERT_FEED_HOURS = 24
+HIGH_ALERT_FEED_SIZE = 100
+
 
 def get_db():
     db = SessionLocal()
@@ -107,12 +115,12 @@ def _strip_date_tag(note: Optional[str]) -> str:
 
 
 def _get_risk_level(score: Optional[float]) -> str:
-    """Convert risk score to level category"""
+    """Convert a 0-100 risk score to level category"""
     if score is None:
         return "unknown"
-    if score >= 0.7:
+    if score >= HIGH_ALERT_SCORE:
         return "high"
-    elif score >= 0.4:
+    elif score >= 40:
         return "medium"
     else:
         return "low"
@@ -149,6 +157,13 @@ def _log_audit(db: Session, user_id: int, action: str, meta: dict):
     db.commit()
 
 
+def _notify_alert_changed(patient_id: int):
+    """Push alert actions to the dashboard streams and drop cached alert lists."""
+    hub.notify("logs", patient_id)
+    hub.notify("alerts")
+    notify_high_alerts()
+
+
 def _ensure_dict(val: Any) -> Optional[dict]:
     """Robustly convert potentially doubly-encoded JSON strings to dict"""
     if not val:
@@ -180,9 +195,14 @@ def get_high_alerts(
     user: User = Depends(require_role(["doctor", "admin"]))
 ):
     """
-    Get patients with high risk scores (>= 0.7) from recent calls.
+    Get patients with high risk scores (>= HIGH_ALERT_SCORE, 0-100 scale) from recent calls.
     By default, excludes already-actioned alerts.
     """
+    cache_key = (user.role, hours, include_actioned, date.today(), HIGH_ALERTS_CACHE.version)
+    cached = HIGH_ALERTS_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
     # Use today's calendar date instead of a sliding window
     today_start = datetime.combine(date.today(), datetime.min.time()).replace(tzinfo=timezone.utc)
     
@@ -209,7 +229,7 @@ def get_high_alerts(
             )
         )
         .filter(
-            CallLog.risk_score >= 0.7,
+            CallLog.risk_score >= HIGH_ALERT_SCORE,
             Patient.active == True
         )
     )
@@ -225,28 +245,42 @@ def get_high_alerts(
     # Sort by risk score DESC
     query = query.order_by(desc(CallLog.risk_score), desc(CallLog.created_at))
     
+    rows = query.all()
+    call_log_ids = [call_log.id for call_log, _ in rows]
+    patient_ids = list({patient.id for _, patient in rows})
+
+    # One IN query each instead of three lookups per alert row.
+    explanations = {}
+    corrected_call_ids = set()
+    actions_by_patient = {}
+    if call_log_ids:
+        for risk_record in (
+            db.query(ReadmissionRisk)
+            .filter(ReadmissionRisk.call_log_id.in_(call_log_ids))
+            .order_by(ReadmissionRisk.created_at.asc(), ReadmissionRisk.id.asc())
+            .all()
+        ):
+            if risk_record.explanation:
+                explanations[risk_record.call_log_id] = risk_record.explanation
+        corrected_call_ids = {
+            row.call_log_id
+            for row in db.query(ResponseCorrection.call_log_id)
+            .filter(ResponseCorrection.call_log_id.in_(call_log_ids))
+            .distinct()
+        }
+        for action in (
+            db.query(AlertAction)
+            .filter(AlertAction.patient_id.in_(patient_ids))
+            .order_by(AlertAction.created_at.desc())
+            .all()
+        ):
+            actions_by_patient.setdefault(action.patient_id, []).append(action)
+
     results = []
-    for call_log, patient in query.all():
-        # Get explanation preview
-        risk_record = db.query(ReadmissionRisk).filter(
-            ReadmissionRisk.call_log_id == call_log.id
-        ).first()
-        
-        # Ensure we unique by patient_id in response if subquery somehow fails to be strict
-        # (Safer for some SQL dialects)
+    for call_log, patient in rows:
         explanation_preview = None
-        if risk_record and risk_record.explanation:
-            explanation_preview = _ensure_dict(risk_record.explanation)
-        
-        # Get nurse correction status
-        has_correction = db.query(ResponseCorrection).filter(
-            ResponseCorrection.call_log_id == call_log.id
-        ).first() is not None
-
-        # Get previous actions
-        actions = db.query(AlertAction).filter(
-            AlertAction.patient_id == patient.id
-        ).order_by(AlertAction.created_at.desc()).all()
+        if call_log.id in explanations:
+            explanation_preview = _ensure_dict(explanations[call_log.id])
 
         results.append(HighAlertResponse(
             patient_id=patient.id,
@@ -259,12 +293,12 @@ def get_high_alerts(
             risk_level=call_log.risk_level or _get_risk_level(call_log.risk_score),
             call_time=call_log.created_at,
             explanation_preview=explanation_preview,
-            has_nurse_correction=has_correction,
+            has_nurse_correction=call_log.id in corrected_call_ids,
             previous_actions=[{
                 "action": a.action,
                 "created_at": a.created_at,
                 "doctor_note": _strip_date_tag(a.doctor_note)
-            } for a in actions]
+            } for a in actions_by_patient.get(patient.id, [])]
         ))
     
     # Final deduplication in memory to be absolutely certain
@@ -273,57 +307,56 @@ def get_high_alerts(
         if r.patient_id not in final_unique:
             final_unique[r.patient_id] = r
     
-    return list(final_unique.values())
+    response = list(final_unique.values())
+    HIGH_ALERTS_CACHE.set(cache_key, response)
+    return response
+
+
+def _high_alerts_snapshot(db: Session, key=None) -> list[dict]:
+    """Ring buffer contents for the doctor alert feed: the newest high-risk calls."""
+    since = datetime.now(timezone.utc) - timedelta(hours=HIGH_ALERT_FEED_HOURS)
+    rows = (
+        db.query(CallLog, Patient)
+        .join(Patient, CallLog.patient_id == Patient.id)
+        .filter(
+            CallLog.risk_score >= HIGH_ALERT_SCORE,
+            CallLog.created_at >= since,
+            Patient.active == True
+        )
+        .order_by(desc(CallLog.created_at), desc(CallLog.id))
+        .limit(HIGH_ALERT_FEED_SIZE)
+        .all()
+    )
+    return [
+        {
+            "patient_id": patient.id,
+            "patient_name": patient.name,
+            "call_log_id": call_log.id,
+            "risk_score": call_log.risk_score,
+            "risk_level": call_log.risk_level,
+            "call_time": call_log.created_at.isoformat() if call_log.created_at else None
+        }
+        for call_log, patient in rows
+    ]
+
+
+hub.register("high_alerts", _high_alerts_snapshot, key_field="call_log_id")
 
 
 @router.get("/doctor/stream-high-alerts")
 def stream_high_alerts(
     token: str = Query(default=""),
-    db: Session = Depends(get_db)
+    last_event_id: Optional[str] = Header(default=None)
 ):
     """
     SSE endpoint for real-time high alert notifications.
-    Streams new high-risk calls as they are created.
+    One shared watcher refreshes the feed when a call is scored or an alert is
+    actioned; every connected doctor receives the same upsert/delete events.
     """
-    import asyncio
-    import json
-    from datetime import datetime
-    
-    async def event_generator():
-        last_check = datetime.now(timezone.utc)
-        
-        while True:
-            # Check for new high alerts since last check
-            new_alerts = (
-                db.query(CallLog, Patient)
-                .join(Patient, CallLog.patient_id == Patient.id)
-                .filter(
-                    CallLog.risk_score >= 0.7,
-                    CallLog.created_at > last_check,
-                    Patient.active == True
-                )
-                .order_by(desc(CallLog.risk_score))
-                .all()
-            )
-            
-            for call_log, patient in new_alerts:
-                event_data = {
-                    "patient_id": patient.id,
-                    "patient_name": patient.name,
-                    "call_log_id": call_log.id,
-                    "risk_score": call_log.risk_score,
-                    "risk_level": call_log.risk_level,
-                    "call_time": call_log.created_at.isoformat()
-                }
-                yield f"data: {json.dumps(event_data)}\n\n"
-            
-            last_check = datetime.now(timezone.utc)
-            
-            # Send heartbeat
-            yield f": heartbeat\n\n"
-            await asyncio.sleep(10)
-    
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    user = stream_user(token)
+    if not user or user.role not in ["doctor", "admin"]:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return sse_response("high_alerts", last_event_id=last_event_id)
 
 
 @router.post("/doctor/confirm-alert")
@@ -369,6 +402,8 @@ def confirm_alert(
     })
     
     db.commit()
+    refresh_call_timeline(db, payload.call_log_id)
+    _notify_alert_changed(payload.patient_id)
     
     return {
         "success": True,
@@ -415,6 +450,8 @@ def clear_alert(
     })
     
     db.commit()
+    refresh_call_timeline(db, payload.call_log_id)
+    _notify_alert_changed(payload.patient_id)
     
     return {
         "success": True,
@@ -439,6 +476,8 @@ def override_risk_score(
         raise HTTPException(status_code=404, detail="Call log not found")
     
     original_score = call_log.risk_score
+    # Doctors enter 0.0-1.0; call logs and alert actions store 0-100.
+    new_score = round(payload.override_score * 100, 2)
     
     # Create alert action
     action = AlertAction(
@@ -446,33 +485,35 @@ def override_risk_score(
         patient_id=payload.patient_id,
         risk_score=original_score or 0.0,
         action="overridden",
-        override_score=payload.override_score,
+        override_score=new_score,
         doctor_note=payload.justification,
         doctor_id=user.id,
-        intervention_required=(payload.override_score >= 0.7)
+        intervention_required=(new_score >= HIGH_ALERT_SCORE)
     )
     db.add(action)
     
     # Update call log risk score
-    call_log.risk_score = payload.override_score
-    call_log.risk_level = _get_risk_level(payload.override_score)
+    call_log.risk_score = new_score
+    call_log.risk_level = _get_risk_level(new_score)
     
     # Log critical audit event for model override
     _log_audit(db, user.id, "risk_score_override", {
         "call_log_id": payload.call_log_id,
         "patient_id": payload.patient_id,
         "original_score": original_score,
-        "override_score": payload.override_score,
+        "override_score": new_score,
         "justification": payload.justification
     })
     
     db.commit()
+    refresh_call_timeline(db, payload.call_log_id)
+    _notify_alert_changed(payload.patient_id)
     
     return {
         "success": True,
         "action_id": action.id,
         "original_score": original_score,
-        "new_score": payload.override_score,
+        "new_score": new_score,
         "new_risk_level": call_log.risk_level,
         "message": "Risk score overridden successfully"
     }
@@ -2,24 +2,28 @@
 Production Monitoring and Health Check Endpoints for CarePulse
 Provides system health status, metrics, and observability
 """
-from fastapi import APIRouter, Depends, HTTPException
+import hmac
+
+from fastapi import APIRouter, Cookie, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from typing import Optional, Dict
 
-from app.api.auth import require_role
+from app.api.auth import get_current_user, require_role
+from app.config import METRICS_SCRAPE_TOKEN
 from app.db.models import (
     User,
     Patient,
-    CallLog,
     ReadmissionRisk,
-    AuditEvent,
     NurseCallAssignment,
     MedicationReminder,
 )
 from app.db.session import SessionLocal
+from app.utils.metrics import performance_summary, render_prometheus
+from app.reports import aggregates as reports
 
 router = APIRouter()
 
@@ -110,103 +114,66 @@ def get_system_metrics(
     Provides comprehensive statistics about system usage and performance.
     """
     now = datetime.now(timezone.utc)
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    hour_ago = now - timedelta(hours=1)
-    
-    # Patient metrics
-    total_patients = db.query(func.count(Patient.id)).scalar()
-    active_patients = db.query(func.count(Patient.id)).filter(Patient.active == True).scalar()
-    enrolled_today = db.query(func.count(Patient.id)).filter(
-        Patient.created_at >= today_start
-    ).scalar()
-    
-    # Call metrics
-    total_calls_today = db.query(func.count(CallLog.id)).filter(
-        CallLog.created_at >= today_start
-    ).scalar()
-    
-    answered_calls_today = db.query(func.count(CallLog.id)).filter(
-        CallLog.created_at >= today_start,
-        CallLog.answered == True
-    ).scalar()
-    
-    unanswered_calls_today = db.query(func.count(CallLog.id)).filter(
-        CallLog.created_at >= today_start,
-        CallLog.answered == False
-    ).scalar()
-    
-    # Risk distribution
-    high_risk = db.query(func.count(CallLog.id)).filter(
-        CallLog.risk_level == "high",
-        CallLog.created_at >= today_start
-    ).scalar() or 0
-    
-    medium_risk = db.query(func.count(CallLog.id)).filter(
-        CallLog.risk_level == "medium",
-        CallLog.created_at >= today_start
-    ).scalar() or 0
-    
-    low_risk = db.query(func.count(CallLog.id)).filter(
-        CallLog.risk_level == "low",
-        CallLog.created_at >= today_start
-    ).scalar() or 0
-    
-    # User metrics
-    total_users = db.query(func.count(User.id)).scalar()
-    active_users = db.query(func.count(User.id)).filter(User.active == True).scalar()
-    
-    users_by_role = {
-        "admin": db.query(func.count(User.id)).filter(User.role == "admin", User.active == True).scalar() or 0,
-        "doctor": db.query(func.count(User.id)).filter(User.role == "doctor", User.active == True).scalar() or 0,
-        "nurse": db.query(func.count(User.id)).filter(User.role == "nurse", User.active == True).scalar() or 0,
-        "staff": db.query(func.count(User.id)).filter(User.role == "staff", User.active == True).scalar() or 0,
-    }
-    
-    # Performance metrics (simplified - in production you'd use APM tools)
-    # For now, we'll just count errors and recent activity
-    errors_last_hour = db.query(func.count(AuditEvent.id)).filter(
-        AuditEvent.created_at >= hour_ago,
-        AuditEvent.action.like('%error%')
-    ).scalar() or 0
-    
-    actions_last_hour = db.query(func.count(AuditEvent.id)).filter(
-        AuditEvent.created_at >= hour_ago
-    ).scalar() or 0
-    
-    # Calculate average response time (mock - in production use actual metrics)
-    avg_response_time_ms = 150.0  # Placeholder
-    error_rate = (errors_last_hour / max(actions_last_hour, 1)) * 100
-    
+    counts = reports.system_metrics(db, now)
+    patients, calls, users, audit = counts["patients"], counts["calls"], counts["users"], counts["audit"]
+    error_rate = (audit["errors"] / max(audit["actions"], 1)) * 100
+
     return SystemMetrics(
         timestamp=now.isoformat(),
         patient_counts={
-            "total": total_patients or 0,
-            "active": active_patients or 0,
-            "enrolled_today": enrolled_today or 0,
+            "total": patients["total"],
+            "active": patients["active"],
+            "enrolled_today": patients["enrolled_today"],
         },
         call_stats={
-            "total_today": total_calls_today or 0,
-            "answered_today": answered_calls_today or 0,
-            "unanswered_today": unanswered_calls_today or 0,
+            "total_today": calls["total"],
+            "answered_today": calls["answered"],
+            "unanswered_today": calls["failed"],
         },
         risk_distribution={
-            "high": high_risk,
-            "medium": medium_risk,
-            "low": low_risk,
+            "high": calls["high_risk"],
+            "medium": calls["medium_risk"],
+            "low": calls["low_risk"],
         },
         user_counts={
-            "total": total_users or 0,
-            "active": active_users or 0,
-            **users_by_role
+            "total": users["total"],
+            "active": users["active"],
+            **{role: users[role] for role in reports.ROLES}
         },
         performance={
-            "avg_response_time_ms": avg_response_time_ms,
+            **performance_summary(),
             "error_rate_pct": round(error_rate, 2),
-            "actions_last_hour": actions_last_hour or 0,
+            "actions_last_hour": audit["actions"],
         }
     )
 
 
+def require_metrics_scraper(
+    authorization: str = Header(default=""),
+    auth_token: str | None = Cookie(default=None),
+    db: Session = Depends(get_db)
+):
+    """METRICS_SCRAPE_TOKEN as a bearer token (for Prometheus), otherwise an admin session."""
+    if METRICS_SCRAPE_TOKEN and authorization.startswith("Bearer "):
+        token = authorization.replace("Bearer ", "").strip()
+        if hmac.compare_digest(token.encode("utf-8"), METRICS_SCRAPE_TOKEN.encode("utf-8")):
+            return None
+    user = get_current_user(authorization=authorization, auth_token=auth_token, db=db)
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return user
+
+
+@router.get("/metrics/prometheus", response_class=PlainTextResponse)
+def prometheus_metrics(_: Optional[User] = Depends(require_metrics_scraper)):
+    """
+    Prometheus text exposition of in-process latency histograms and gauges
+    (HTTP, DB, TTS, Groq, Deepgram, audio send lag, call stages, active calls).
+    Needs METRICS_SCRAPE_TOKEN as a bearer token or an admin session.
+    """
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
 @router.get("/admin/system-status")
 def admin_system_status(
     db: Session = Depends(get_db),
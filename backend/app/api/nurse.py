@@ -11,7 +11,6 @@ from zoneinfo import ZoneInfo
 
 from app.api.auth import require_role
 from app.db.models import (
-    AgentResponse,
     AuditEvent,
     CallLog,
     CareAssignment,
@@ -22,8 +21,9 @@ from app.db.models import (
     User,
 )
 from app.db.session import SessionLocal
+from app.db.call_timeline import call_ivr_items
+from app.db import reminder_state
 from app.telephony.twilio_client import make_call
-from app.agent.intents import INTENTS
 
 router = APIRouter()
 
@@ -225,23 +225,93 @@ def _open_followup_exists(db: Session, patient_id: int) -> bool:
     return row is not None
 
 
+def _latest_per_patient(db: Session, model, patient_ids_query) -> dict:
+    """Latest row of `model` per patient (by created_at, then id) in one windowed query."""
+    ranked = (
+        db.query(
+            model.id.label("row_id"),
+            func.row_number().over(
+                partition_by=model.patient_id,
+                order_by=(model.created_at.desc(), model.id.desc()),
+            ).label("rn"),
+        )
+        .filter(model.patient_id.in_(patient_ids_query))
+        .subquery()
+    )
+    rows = db.query(model).join(ranked, model.id == ranked.c.row_id).filter(ranked.c.rn == 1).all()
+    return {row.patient_id: row for row in rows}
+
+
+def _latest_reminders_for_date(db: Session, patients: list[Patient], target_date: date, patient_ids_query) -> dict:
+    """Latest reminder per patient inside each patient's local day, from one range query."""
+    if not patients:
+        return {}
+    bounds = {p.id: _date_bounds_utc(p, target_date) for p in patients}
+    range_start = min(b[0] for b in bounds.values())
+    range_end = max(b[1] for b in bounds.values())
+    reminders = (
+        db.query(MedicationReminder)
+        .filter(
+            MedicationReminder.patient_id.in_(patient_ids_query),
+            MedicationReminder.scheduled_for >= range_start,
+            MedicationReminder.scheduled_for < range_end
+        )
+        .order_by(MedicationReminder.scheduled_for.desc())
+        .all()
+    )
+    out = {}
+    for reminder in reminders:
+        if reminder.patient_id in out or reminder.patient_id not in bounds:
+            continue
+        start, end = bounds[reminder.patient_id]
+        scheduled = reminder.scheduled_for
+        if scheduled.tzinfo is None:
+            scheduled = scheduled.replace(tzinfo=timezone.utc)
+        if start <= scheduled < end:
+            out[reminder.patient_id] = reminder
+    return out
+
+
+def _open_followup_patient_ids(db: Session, patient_ids_query) -> set[int]:
+    rows = (
+        db.query(Intervention.patient_id)
+        .filter(
+            Intervention.patient_id.in_(patient_ids_query),
+            Intervention.type == "nurse_followup_call",
+            Intervention.status.in_(["assigned", "planned"])
+        )
+        .distinct()
+        .all()
+    )
+    return {row[0] for row in rows}
+
+
 @router.get("/nurse/dashboard")
 def nurse_dashboard(
     db: Session = Depends(get_db),
     user: User = Depends(require_role(["nurse", "admin", "doctor"]))
 ):
+    # Five queries regardless of patient count: patients, latest risk, latest call log,
+    # today's reminders and open follow-ups. Per-patient joins happen in memory.
     patients = db.query(Patient).filter(Patient.active.is_(True)).all()
+    active_ids = db.query(Patient.id).filter(Patient.active.is_(True))
+    latest_risks = _latest_per_patient(db, ReadmissionRisk, active_ids)
+    latest_logs = _latest_per_patient(db, CallLog, active_ids)
+    reminders = _latest_reminders_for_date(db, patients, datetime.now(timezone.utc).date(), active_ids)
+    open_followups = _open_followup_patient_ids(db, active_ids)
+
     rows = []
     for patient in patients:
-        risk_score, risk_level = _last_risk(db, patient.id)
-        last_log = (
-            db.query(CallLog)
-            .filter(CallLog.patient_id == patient.id)
-            .order_by(CallLog.created_at.desc())
-            .first()
-        )
-        reminder = _latest_reminder_for_date(db, patient, datetime.now(timezone.utc).date())
-        open_followup = _open_followup_exists(db, patient.id)
+        risk = latest_risks.get(patient.id)
+        last_log = latest_logs.get(patient.id)
+        if risk:
+            risk_score, risk_level = risk.score, risk.level
+        elif last_log:
+            risk_score, risk_level = last_log.risk_score, last_log.risk_level
+        else:
+            risk_score, risk_level = None, None
+        reminder = reminders.get(patient.id)
+        open_followup = patient.id in open_followups
         followup = _follow_up_required(risk_score, last_log, reminder, open_followup)
         last_response = _last_response_state(last_log)
         priority_rank = 0
@@ -285,72 +355,10 @@ def nurse_dashboard(
     }
 
 
-def _response_severity(response: AgentResponse) -> str:
-    if response.red_flag:
-        return "critical"
-    confidence = float(response.confidence or 0)
-    if confidence < 60:
-        return "monitor"
-    return "stable"
-
-
-def _response_correction_map(db: Session, call_log_id: int) -> dict:
-    from app.db.models import ResponseCorrection
-    rows = (
-        db.query(ResponseCorrection)
-        .filter(ResponseCorrection.call_log_id == call_log_id)
-        .all()
-    )
-    out = {}
-    for row in rows:
-        # Get intent_id from the associated AgentResponse
-        agent_resp = db.query(AgentResponse).filter(AgentResponse.id == row.agent_response_id).first()
-        if not agent_resp:
-            continue
-        
-        intent_id = agent_resp.intent_id
-        if intent_id and intent_id not in out:
-            out[intent_id] = {
-                "corrected_text": row.corrected_text,
-                "reason": row.correction_reason or "",
-                "created_at": row.created_at.isoformat() if row.created_at else None
-            }
-    return out
-
-
 def _ivr_for_date(db: Session, patient: Patient, selected_date: date, day_log: Optional[CallLog]) -> dict:
-    if not day_log or not day_log.patient_call_id:
-        return {
-            "date": selected_date.isoformat(),
-            "items": [],
-            "empty_message": "No IVR responses recorded for this day"
-        }
-
-    responses = (
-        db.query(AgentResponse)
-        .filter(AgentResponse.call_id == day_log.patient_call_id)
-        .order_by(AgentResponse.created_at.asc())
-        .all()
-    )
-    corrections = _response_correction_map(db, day_log.id)
     items = []
-    for row in responses:
-        summary = row.raw_text or ""
-        if not summary and isinstance(row.structured_data, dict):
-            summary = str(row.structured_data.get("value") or row.structured_data.get("summary") or "")
-        intent_data = INTENTS.get(row.intent_id, {})
-        question = intent_data.get("allowed_phrases", [row.intent_id])[0]
-        
-        items.append({
-            "id": row.id,
-            "intent_id": row.intent_id,
-            "question": question,
-            "summary_answer": summary or "-",
-            "full_response": row.raw_text or "-",
-            "severity": _response_severity(row),
-            "speech_correction": corrections.get(row.intent_id),
-            "timestamp": row.created_at.isoformat() if row.created_at else None
-        })
+    if day_log and day_log.patient_call_id:
+        items = call_ivr_items(db, day_log)
     return {
         "date": selected_date.isoformat(),
         "items": items,
@@ -793,8 +801,9 @@ def nurse_mark_taken(
     patient = _patient_or_404(db, patient_id)
     effective_date, _, _ = _resolve_selected_date(patient, payload.selected_date)
     reminder = _ensure_date_reminder(db, patient, effective_date, payload.reminder_id)
-    reminder.status = "taken"
-    reminder.call_placed_at = datetime.now(timezone.utc)
+    reminder_state.transition(
+        db, reminder.id, reminder_state.TAKEN, force=True, call_placed_at=datetime.now(timezone.utc)
+    )
     db.commit()
 
     note = payload.note or f"Medication marked taken by nurse {user.name}"
@@ -824,8 +833,9 @@ def nurse_mark_not_taken(
     patient = _patient_or_404(db, patient_id)
     effective_date, _, _ = _resolve_selected_date(patient, payload.selected_date)
     reminder = _ensure_date_reminder(db, patient, effective_date, payload.reminder_id)
-    reminder.status = "missed"
-    reminder.call_placed_at = datetime.now(timezone.utc)
+    reminder_state.transition(
+        db, reminder.id, reminder_state.MISSED, force=True, call_placed_at=datetime.now(timezone.utc)
+    )
     db.commit()
     note = payload.note or f"Medication marked not taken by nurse {user.name}"
     db.add(Intervention(
@@ -854,8 +864,9 @@ def nurse_mark_no_response(
     patient = _patient_or_404(db, patient_id)
     effective_date, _, _ = _resolve_selected_date(patient, payload.selected_date)
     reminder = _ensure_date_reminder(db, patient, effective_date, payload.reminder_id)
-    reminder.status = "no_response"
-    reminder.call_placed_at = datetime.now(timezone.utc)
+    reminder_state.transition(
+        db, reminder.id, reminder_state.NO_RESPONSE, force=True, call_placed_at=datetime.now(timezone.utc)
+    )
     db.commit()
     note = payload.note or f"No response marked by nurse {user.name}"
     db.add(Intervention(
@@ -1,23 +1,116 @@
+import asyncio
 import hashlib
+import hmac
 import secrets
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
 
+from app.config import PASSWORD_HASH_ALGORITHM, PASSWORD_HASH_WORKERS, PASSWORD_PBKDF2_ITERATIONS, PASSWORD_SCRYPT_N
+
+# Stored formats:
+#   pbkdf2_sha256$<iterations>$<salt>$<hex digest>
+#   scrypt$<n>$<r>$<p>$<salt>$<hex digest>
+#   <salt>$<hex digest>   (legacy: pbkdf2_sha256, 100k iterations; rehashed on next login)
+LEGACY_PBKDF2_ITERATIONS = 100_000
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+
+def _pbkdf2(password: str, salt: str, iterations: int) -> str:
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("utf-8"), iterations).hex()
+
+
+def _scrypt(password: str, salt: str, n: int, r: int, p: int) -> str:
+    return hashlib.scrypt(
+        password.encode("utf-8"), salt=salt.encode("utf-8"), n=n, r=r, p=p, maxmem=256 * n * r
+    ).hex()
+
+
+def _current_params() -> tuple:
+    if PASSWORD_HASH_ALGORITHM == "scrypt":
+        return ("scrypt", PASSWORD_SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return ("pbkdf2_sha256", PASSWORD_PBKDF2_ITERATIONS)
+
+
+def _parse(password_hash: str) -> tuple[tuple, str, str]:
+    """Returns ((algorithm, *cost), salt, digest)."""
+    parts = password_hash.split("$")
+    if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+        return ("pbkdf2_sha256", int(parts[1])), parts[2], parts[3]
+    if parts[0] == "scrypt" and len(parts) == 6:
+        return ("scrypt", int(parts[1]), int(parts[2]), int(parts[3])), parts[4], parts[5]
+    if len(parts) == 2:
+        return ("pbkdf2_sha256", LEGACY_PBKDF2_ITERATIONS), parts[0], parts[1]
+    raise ValueError("Unknown password hash format")
+
+
+def _digest(password: str, params: tuple, salt: str) -> str:
+    if params[0] == "scrypt":
+        return _scrypt(password, salt, *params[1:])
+    return _pbkdf2(password, salt, params[1])
+
 
 def hash_password(password: str) -> str:
+    params = _current_params()
     salt = secrets.token_hex(16)
-    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("utf-8"), 100_000)
-    return f"{salt}${digest.hex()}"
+    digest = _digest(password, params, salt)
+    return "$".join([str(part) for part in params] + [salt, digest])
 
 
 def verify_password(password: str, password_hash: str) -> bool:
     try:
-        salt, hashed = password_hash.split("$", 1)
-        digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("utf-8"), 100_000)
-        return digest.hex() == hashed
+        params, salt, hashed = _parse(password_hash)
+        return hmac.compare_digest(_digest(password, params, salt), hashed)
     except Exception:
         return False
 
 
+def needs_rehash(password_hash: str) -> bool:
+    """True when the hash was made with a different algorithm, cost or format than configured now."""
+    try:
+        params, _, _ = _parse(password_hash)
+    except ValueError:
+        return True
+    return password_hash.count("$") == 1 or params != _current_params()
+
+
+# Hashing is CPU-bound and holds the GIL, so request handlers await it in a small
+# process pool instead of tying up the shared threadpool. PASSWORD_HASH_WORKERS=0
+# falls back to a thread (for environments that cannot fork).
+_pool: ProcessPoolExecutor | None = None
+
+
+def _executor() -> ProcessPoolExecutor | None:
+    global _pool
+    if PASSWORD_HASH_WORKERS <= 0:
+        return None
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+    return _pool
+
+
+async def _run(fn, *args):
+    executor = _executor()
+    if executor is None:
+        return await asyncio.to_thread(fn, *args)
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run(hash_password, password)
+
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    return await _run(verify_password, password, password_hash)
+
+
+def shutdown_hash_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
 def new_token() -> str:
     return secrets.token_urlsafe(32)
 
@@ -0,0 +1,95 @@
+"""
+Bounded in-process cache of token -> user for get_current_user.
+
+Every authenticated request used to run two queries (session token, then user).
+Entries are keyed on a SHA-256 of the token, so raw tokens never sit in memory
+longer than the request, and live for SESSION_CACHE_TTL_SECONDS or until the
+token expires, whichever comes first. Logout, user deletion, deactivation and
+role changes in this process invalidate immediately; changes made by another
+process (seed scripts, a second worker) are picked up once the TTL runs out.
+
+Callers get a fresh detached User per hit, never a shared instance.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from app.config import SESSION_CACHE_MAX_ENTRIES, SESSION_CACHE_TTL_SECONDS
+from app.db.models import User
+
+_USER_FIELDS = [column.key for column in User.__table__.columns]
+
+
+def token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes for timezone-aware columns; they are UTC.
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class SessionCache:
+    def __init__(self, ttl_seconds: float, maxsize: int = 10_000):
+        self.ttl = ttl_seconds
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, datetime, dict]] = OrderedDict()
+        self._by_user: dict[int, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> User | None:
+        if self.ttl <= 0:
+            return None
+        key = token_key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            fresh_until, expires_at, fields = entry
+            if fresh_until < time.monotonic() or expires_at < datetime.now(timezone.utc):
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+        return User(**fields)
+
+    def put(self, token: str, user: User, expires_at: datetime):
+        if self.ttl <= 0:
+            return
+        key = token_key(token)
+        fields = {name: getattr(user, name) for name in _USER_FIELDS}
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, _aware(expires_at), fields)
+            self._by_user.setdefault(user.id, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_token(self, token: str):
+        with self._lock:
+            self._drop(token_key(token))
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for key in list(self._by_user.get(user_id, ())):
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[2]["id"]
+        keys = self._by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user_id]
+
+
+session_cache = SessionCache(SESSION_CACHE_TTL_SECONDS, SESSION_CACHE_MAX_ENTRIES)
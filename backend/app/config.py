@@ -22,7 +22,20 @@ TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID", "")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN", "")
 TWILIO_FROM_NUMBER = os.getenv("TWILIO_FROM_NUMBER", "")
 BASE_URL = os.getenv("BASE_URL", "")
+# Point the Twilio REST client and Deepgram at a local simulator (see backend/simulator).
+TWILIO_API_BASE_URL = os.getenv("TWILIO_API_BASE_URL", "")
+DEEPGRAM_BASE_URL = os.getenv("DEEPGRAM_BASE_URL", "https://api.deepgram.com")
 DATABASE_URL = os.getenv("DATABASE_URL", "")
+# Engine tuning (app/db/session.py). Pool settings apply to Postgres; the SQLITE_* pragmas to SQLite.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_POOL_TIMEOUT_SECONDS = int(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# Optional; derived from DATABASE_URL (asyncpg / aiosqlite) when empty.
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", "")
 RISK_MODEL_PATH = os.getenv("RISK_MODEL_PATH", "C:/Users/Harshini/Projects/ivr_project/backend/app/risk/baseline_model.pkl")
 SAMPLE_DATASET_PATH = os.getenv("SAMPLE_DATASET_PATH", "C:/Users/Harshini/Projects/ivr_project/backend/app/risk/sample_readmission.csv")
 DEFAULT_COUNTRY_CODE = os.getenv("DEFAULT_COUNTRY_CODE", "+91")
@@ -31,4 +44,76 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
 GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
 
+# Access log (app/utils/access_log.py). Errors and slow requests are always logged;
+# other requests are sampled. Bodies are only logged for ACCESS_LOG_DEBUG_ROUTES path prefixes.
+ACCESS_LOG_ENABLED = os.getenv("ACCESS_LOG_ENABLED", "true").lower() in ("1", "true", "yes")
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "1.0"))
+ACCESS_LOG_SLOW_MS = float(os.getenv("ACCESS_LOG_SLOW_MS", "1000"))
+ACCESS_LOG_HEADERS = os.getenv("ACCESS_LOG_HEADERS", "user-agent,content-type,content-length")
+ACCESS_LOG_REDACT_HEADERS = os.getenv("ACCESS_LOG_REDACT_HEADERS", "authorization,cookie,set-cookie,x-twilio-signature")
+ACCESS_LOG_DEBUG_ROUTES = os.getenv("ACCESS_LOG_DEBUG_ROUTES", "")
+ACCESS_LOG_BODY_MAX_BYTES = int(os.getenv("ACCESS_LOG_BODY_MAX_BYTES", "2048"))
 
+
+
+# Doctor high-alert list cache (seconds); every high-alert write invalidates it (app/realtime/alerts.py).
+HIGH_ALERTS_CACHE_SECONDS = float(os.getenv("HIGH_ALERTS_CACHE_SECONDS", "10"))
+
+# Bearer token a Prometheus scraper sends to /metrics/prometheus. Empty: admin sessions only.
+METRICS_SCRAPE_TOKEN = os.getenv("METRICS_SCRAPE_TOKEN", "")
+
+# Token -> user cache for get_current_user (app/auth/session_cache.py). 0 disables it.
+SESSION_CACHE_TTL_SECONDS = float(os.getenv("SESSION_CACHE_TTL_SECONDS", "60"))
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "10000"))
+
+# Password hashing (app/auth/security.py). Existing hashes are upgraded on the next
+# successful login when these change. PASSWORD_HASH_WORKERS=0 hashes in a thread instead of processes.
+PASSWORD_HASH_ALGORITHM = os.getenv("PASSWORD_HASH_ALGORITHM", "pbkdf2_sha256").lower()  # pbkdf2_sha256 | scrypt
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", "100000"))
+PASSWORD_SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", "16384"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+
+# Expired session / password-reset token cleanup (app/db/token_gc.py).
+TOKEN_GC_INTERVAL_SECONDS = float(os.getenv("TOKEN_GC_INTERVAL_SECONDS", "3600"))
+TOKEN_GC_BATCH_SIZE = int(os.getenv("TOKEN_GC_BATCH_SIZE", "1000"))
+
+# Report / admin metric cache (app/reports/aggregates.py), per report and date.
+REPORTS_CACHE_SECONDS = float(os.getenv("REPORTS_CACHE_SECONDS", "15"))
+
+# How often the scheduler recomputes today's and yesterday's daily_rollups rows.
+ROLLUP_REFRESH_SECONDS = float(os.getenv("ROLLUP_REFRESH_SECONDS", "300"))
+
+# Patient offboarding (app/db/patient_archive.py): rows per delete transaction, and
+# whether deleted rows are copied to archived_rows first.
+PATIENT_DELETE_BATCH_SIZE = int(os.getenv("PATIENT_DELETE_BATCH_SIZE", "500"))
+PATIENT_ARCHIVE_ON_DELETE = os.getenv("PATIENT_ARCHIVE_ON_DELETE", "true").lower() in ("1", "true", "yes")
+
+# Data retention (app/db/retention.py): days of rows kept per table, 0 keeps them forever.
+# Every table is off by default; operators opt in per table.
+# Expired rows are copied to archived_rows first when RETENTION_ARCHIVE is on.
+RETENTION_CALL_LOG_DAYS = int(os.getenv("RETENTION_CALL_LOG_DAYS", "0"))
+RETENTION_AGENT_RESPONSE_DAYS = int(os.getenv("RETENTION_AGENT_RESPONSE_DAYS", "0"))
+RETENTION_MEDICATION_EVENT_DAYS = int(os.getenv("RETENTION_MEDICATION_EVENT_DAYS", "0"))
+RETENTION_AUDIT_EVENT_DAYS = int(os.getenv("RETENTION_AUDIT_EVENT_DAYS", "0"))
+RETENTION_NOTIFICATION_DAYS = int(os.getenv("RETENTION_NOTIFICATION_DAYS", "0"))
+RETENTION_ARCHIVE = os.getenv("RETENTION_ARCHIVE", "true").lower() in ("1", "true", "yes")
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "1000"))
+RETENTION_INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS", "86400"))  # 0 disables the background pass
+
+# Call flow logs older than FLOW_LOG_COMPACT_DAYS keep only their last FLOW_LOG_KEEP_EVENTS events. 0 days (the default) disables.
+FLOW_LOG_COMPACT_DAYS = int(os.getenv("FLOW_LOG_COMPACT_DAYS", "0"))
+FLOW_LOG_KEEP_EVENTS = int(os.getenv("FLOW_LOG_KEEP_EVENTS", "20"))
+
+# Columnar exports (app/reports/export.py): default output directory and rows per fetched chunk / row group.
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "exports"))
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "10000"))
+
+# Recurring medication schedules (app/db/medication_schedule.py): days of reminders kept materialized ahead.
+MEDICATION_SCHEDULE_HORIZON_DAYS = int(os.getenv("MEDICATION_SCHEDULE_HORIZON_DAYS", "3"))
+
+# Medication reminder flow (app/db/reminder_state.py): minutes between the SMS and the
+# confirmation call, minutes after which an unanswered call counts as no_response
+# (0 waits for Twilio callbacks only), and reminders handled per scheduler query.
+MEDICATION_CALL_DELAY_MINUTES = int(os.getenv("MEDICATION_CALL_DELAY_MINUTES", "2"))
+MEDICATION_CALL_TIMEOUT_MINUTES = int(os.getenv("MEDICATION_CALL_TIMEOUT_MINUTES", "30"))
+MEDICATION_DUE_BATCH = int(os.getenv("MEDICATION_DUE_BATCH", "200"))
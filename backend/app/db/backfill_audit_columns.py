@@ -0,0 +1,66 @@
+"""
+Fill the typed patient_id / call_log_id / intent_id columns of audit_events from
+meta. New rows get them from the AuditEvent before_insert listener; migration
+v0001 adds the columns and runs this once. Re-run by hand if needed:
+
+    python -m app.db.backfill_audit_columns --dry-run
+"""
+from __future__ import annotations
+
+import argparse
+import json
+
+from app.db.models import AuditEvent, audit_keys_from_meta
+from app.db.session import SessionLocal
+
+
+COLUMNS = {
+    "patient_id": "INTEGER",
+    "call_log_id": "INTEGER",
+    "intent_id": "VARCHAR",
+}
+
+
+def backfill_audit_columns(db, batch_size: int = 1000, dry_run: bool = False) -> dict:
+    scanned = 0
+    updated = 0
+    last_id = 0
+    while True:
+        rows = (
+            db.query(AuditEvent.id, AuditEvent.meta)
+            .filter(AuditEvent.id > last_id, AuditEvent.meta.isnot(None))
+            .order_by(AuditEvent.id.asc())
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        changes = []
+        for row in rows:
+            keys = audit_keys_from_meta(row.meta)
+            if any(value is not None for value in keys.values()):
+                changes.append({"id": row.id, **keys})
+        scanned += len(rows)
+        updated += len(changes)
+        last_id = rows[-1].id
+        if changes and not dry_run:
+            db.bulk_update_mappings(AuditEvent, changes)
+            db.commit()
+    return {"scanned": scanned, "updated": updated}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill typed audit_events columns from meta JSON.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change.")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        summary = backfill_audit_columns(db, dry_run=args.dry_run)
+    finally:
+        db.close()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
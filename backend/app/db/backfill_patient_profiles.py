@@ -0,0 +1,80 @@
+"""
+Move patient profile JSON out of Intervention(type="patient_profile") rows into
+the patient_profiles table. Safe to re-run; runs at startup from init_db.
+
+    python -m app.db.backfill_patient_profiles --dry-run
+"""
+from __future__ import annotations
+
+import argparse
+import json
+
+from app.db.models import Intervention, PatientProfile
+from app.db.session import SessionLocal
+
+
+def _parse(note: str | None) -> dict:
+    if not note:
+        return {}
+    try:
+        parsed = json.loads(note)
+        return parsed if isinstance(parsed, dict) else {}
+    except Exception:
+        return {}
+
+
+def backfill_patient_profiles(db, dry_run: bool = False) -> dict:
+    legacy = (
+        db.query(Intervention)
+        .filter(Intervention.type == "patient_profile")
+        .order_by(Intervention.patient_id.asc(), Intervention.created_at.desc(), Intervention.id.desc())
+        .all()
+    )
+    if not legacy:
+        return {"legacy_rows": 0, "profiles_created": 0}
+
+    existing = {
+        row[0]
+        for row in db.query(PatientProfile.patient_id)
+        .filter(PatientProfile.patient_id.in_({r.patient_id for r in legacy}))
+        .all()
+    }
+    created = 0
+    seen: set[int] = set()
+    for row in legacy:
+        # Rows are newest-first per patient; only the latest one counts.
+        if row.patient_id in seen:
+            continue
+        seen.add(row.patient_id)
+        if row.patient_id in existing:
+            continue
+        meta = _parse(row.note)
+        created += 1
+        if not dry_run:
+            db.add(PatientProfile(
+                patient_id=row.patient_id,
+                diagnosis=meta.get("diagnosis") or "",
+                medications_text=meta.get("medications_text") or "",
+            ))
+
+    if not dry_run:
+        db.query(Intervention).filter(Intervention.id.in_([r.id for r in legacy])).delete(synchronize_session=False)
+        db.commit()
+    return {"legacy_rows": len(legacy), "profiles_created": created}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill patient_profiles from legacy Intervention JSON rows.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report rows that would be moved.")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        summary = backfill_patient_profiles(db, dry_run=args.dry_run)
+    finally:
+        db.close()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
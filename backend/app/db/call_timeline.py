@@ -0,0 +1,285 @@
+"""
+Per-call timeline rows (call_timelines) behind /patients/{id}/all-logs and the
+nurse IVR panel.
+
+A row holds the fully assembled log entry (risk explanation, responses,
+reviews, corrections) so reading a patient's history is one range scan instead
+of several queries per call. Rows are written once a call is closed and
+rewritten by refresh_call_timeline() whenever a correction, review, override or
+note touches the call. Calls that are still open are assembled on the fly.
+
+    python -m app.db.call_timeline --rebuild
+"""
+from __future__ import annotations
+
+import argparse
+import json
+
+from app.agent.intents import INTENTS
+from app.db.models import AgentResponse, AuditEvent, CallLog, CallTimeline, ReadmissionRisk, ResponseCorrection
+from app.db.session import SessionLocal
+from app.reports.rollups import mark_dirty as mark_rollup_dirty
+
+
+OPEN_STATUSES = ("scheduled", "in_progress")
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _parse_explanation(risk: ReadmissionRisk | None) -> dict:
+    explanation = risk.explanation if risk else None
+    if isinstance(explanation, str):
+        try:
+            explanation = json.loads(explanation)
+        except Exception:
+            explanation = None
+    return explanation if explanation is not None else {"top_factors": []}
+
+
+def _review_maps(db, logs: list[CallLog]) -> tuple[dict, dict]:
+    """Latest response_review / response_correction audit meta per (call_log_id, intent_id)."""
+    rows = (
+        db.query(AuditEvent)
+        .filter(
+            AuditEvent.call_log_id.in_([log.id for log in logs]),
+            AuditEvent.intent_id.isnot(None),
+            AuditEvent.action.in_(["response_review", "response_correction"])
+        )
+        .order_by(AuditEvent.created_at.desc(), AuditEvent.id.desc())
+        .all()
+    )
+    reviews, corrections = {}, {}
+    for row in rows:
+        key = (row.call_log_id, row.intent_id)
+        if row.action == "response_review":
+            reviews.setdefault(key, row.meta or {})
+        else:
+            corrections.setdefault(key, row.meta or {})
+    return reviews, corrections
+
+
+def _speech_corrections(db, log_ids: list[int]) -> dict:
+    rows = (
+        db.query(ResponseCorrection, AgentResponse.intent_id)
+        .join(AgentResponse, AgentResponse.id == ResponseCorrection.agent_response_id)
+        .filter(ResponseCorrection.call_log_id.in_(log_ids))
+        .order_by(ResponseCorrection.id.asc())
+        .all()
+    )
+    out = {}
+    for row, intent_id in rows:
+        if intent_id:
+            out.setdefault((row.call_log_id, intent_id), {
+                "corrected_text": row.corrected_text,
+                "reason": row.correction_reason or "",
+                "created_at": _iso(row.created_at)
+            })
+    return out
+
+
+def _severity(response: AgentResponse) -> str:
+    if response.red_flag:
+        return "critical"
+    if float(response.confidence or 0) < 60:
+        return "monitor"
+    return "stable"
+
+
+def build_timelines(db, logs: list[CallLog]) -> dict[int, dict]:
+    """Assemble {"entry", "ivr_items"} for each log with a fixed number of queries."""
+    if not logs:
+        return {}
+    log_ids = [log.id for log in logs]
+    call_ids = [log.patient_call_id for log in logs if log.patient_call_id]
+
+    risks = {}
+    for risk in (
+        db.query(ReadmissionRisk)
+        .filter(ReadmissionRisk.call_log_id.in_(log_ids))
+        .order_by(ReadmissionRisk.created_at.asc(), ReadmissionRisk.id.asc())
+        .all()
+    ):
+        risks[risk.call_log_id] = risk  # ascending, so the newest wins
+
+    responses_by_call: dict[int, list[AgentResponse]] = {}
+    if call_ids:
+        for r in (
+            db.query(AgentResponse)
+            .filter(AgentResponse.call_id.in_(call_ids))
+            .order_by(AgentResponse.created_at.asc(), AgentResponse.id.asc())
+            .all()
+        ):
+            responses_by_call.setdefault(r.call_id, []).append(r)
+        reviews, corrections = _review_maps(db, logs)
+        speech = _speech_corrections(db, log_ids)
+    else:
+        reviews, corrections, speech = {}, {}, {}
+
+    out = {}
+    for log in logs:
+        risk = risks.get(log.id)
+        resp_rows = responses_by_call.get(log.patient_call_id, []) if log.patient_call_id else []
+        responses = []
+        ivr_items = []
+        for r in resp_rows:
+            intent = INTENTS.get(r.intent_id, {})
+            review = reviews.get((log.id, r.intent_id), {})
+            correction = corrections.get((log.id, r.intent_id), {})
+            responses.append({
+                "intent_id": r.intent_id,
+                "label": intent.get("clinical_meaning") or r.intent_id,
+                "question": (intent.get("allowed_phrases") or [None])[0],
+                "domain": intent.get("domain"),
+                "response_type": intent.get("response_type"),
+                "raw_text": r.raw_text,
+                "structured_data": r.structured_data,
+                "red_flag": r.red_flag,
+                "confidence": r.confidence,
+                "review_status": (
+                    "confirmed" if review.get("label") == 1
+                    else "cleared" if review.get("label") == 0
+                    else None
+                ),
+                "review_reason": (review.get("reason") or "") if review else None,
+                "corrected_answer": correction.get("answer"),
+                "corrected_trend": correction.get("trend"),
+                "corrected_reason": (correction.get("reason") or "") if correction else None
+            })
+            summary = r.raw_text or ""
+            if not summary and isinstance(r.structured_data, dict):
+                summary = str(r.structured_data.get("value") or r.structured_data.get("summary") or "")
+            ivr_items.append({
+                "id": r.id,
+                "intent_id": r.intent_id,
+                "question": intent.get("allowed_phrases", [r.intent_id])[0],
+                "summary_answer": summary or "-",
+                "full_response": r.raw_text or "-",
+                "severity": _severity(r),
+                "speech_correction": speech.get((log.id, r.intent_id)),
+                "timestamp": _iso(r.created_at)
+            })
+
+        out[log.id] = {
+            "entry": {
+                "id": log.id,
+                "patient_id": log.patient_id,
+                "created_at": _iso(log.created_at),
+                "risk_score": log.risk_score,
+                "risk_level": log.risk_level,
+                "explanation": _parse_explanation(risk),
+                "risk_source": (risk.model_version if risk else None) or "model",
+                "status": log.status,
+                "answered": log.answered,
+                "transcripts": [r.raw_text for r in resp_rows if r.raw_text],
+                "responses": responses,
+                "doctor_note": log.doctor_note,
+                "flow_log": log.flow_log,
+                "scheduled_for": _iso(log.scheduled_for),
+                "started_at": _iso(log.started_at),
+                "ended_at": _iso(log.ended_at)
+            },
+            "ivr_items": ivr_items,
+        }
+    return out
+
+
+def _store(db, logs: list[CallLog], built: dict[int, dict]):
+    for log in logs:
+        if log.status in OPEN_STATUSES:
+            continue
+        db.merge(CallTimeline(
+            call_log_id=log.id,
+            patient_id=log.patient_id,
+            log_created_at=log.created_at,
+            entry=built[log.id]["entry"],
+            ivr_items=built[log.id]["ivr_items"],
+        ))
+
+
+def refresh_call_timelines(db, call_log_ids) -> int:
+    """Rebuild the stored rows for these calls. Call after committing a change to them."""
+    ids = [int(i) for i in call_log_ids if i]
+    if not ids:
+        return 0
+    logs = db.query(CallLog).filter(CallLog.id.in_(ids)).all()
+    _store(db, logs, build_timelines(db, logs))
+    db.commit()
+    mark_rollup_dirty(*[log.created_at for log in logs])
+    return len(logs)
+
+
+def refresh_call_timeline(db, call_log_id) -> None:
+    refresh_call_timelines(db, [call_log_id])
+
+
+def patient_timeline(db, patient_id: int) -> list[dict]:
+    """All log entries for a patient, oldest first. Missing rows are built and stored."""
+    rows = (
+        db.query(CallLog.id, CallLog.status, CallTimeline.entry)
+        .outerjoin(CallTimeline, CallTimeline.call_log_id == CallLog.id)
+        .filter(CallLog.patient_id == patient_id)
+        .order_by(CallLog.created_at.asc(), CallLog.id.asc())
+        .all()
+    )
+    stale = [row.id for row in rows if row.entry is None or row.status in OPEN_STATUSES]
+    built = {}
+    if stale:
+        logs = db.query(CallLog).filter(CallLog.id.in_(stale)).all()
+        built = build_timelines(db, logs)
+        _store(db, logs, built)
+        db.commit()
+    return [built[row.id]["entry"] if row.id in built else row.entry for row in rows]
+
+
+def call_ivr_items(db, log: CallLog) -> list[dict]:
+    if log.status not in OPEN_STATUSES:
+        row = db.query(CallTimeline.ivr_items).filter(CallTimeline.call_log_id == log.id).first()
+        if row is not None:
+            return row.ivr_items
+    built = build_timelines(db, [log])
+    _store(db, [log], built)
+    db.commit()
+    return built[log.id]["ivr_items"]
+
+
+def rebuild_call_timelines(db, batch_size: int = 500) -> dict:
+    total = 0
+    last_id = 0
+    while True:
+        logs = (
+            db.query(CallLog)
+            .filter(CallLog.id > last_id)
+            .order_by(CallLog.id.asc())
+            .limit(batch_size)
+            .all()
+        )
+        if not logs:
+            break
+        _store(db, logs, build_timelines(db, logs))
+        db.commit()
+        total += len(logs)
+        last_id = logs[-1].id
+    return {"call_logs": total}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild call_timelines from call logs, responses and audit events.")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild every stored timeline row.")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.print_help()
+        return
+
+    db = SessionLocal()
+    try:
+        summary = rebuild_call_timelines(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
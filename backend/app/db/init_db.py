@@ -9,12 +9,31 @@ from app.db.models import (
     SessionToken,
     Call,
 )
-from app.db.session import engine
+from app.db.session import engine, SessionLocal
+from app.db.backfill_patient_profiles import backfill_patient_profiles
+from app.db.migrations import run_migrations
 
 
 def init_db():
     Base.metadata.create_all(bind=engine)
     print("Database tables created successfully.")
+    try:
+        for migration in run_migrations(engine):
+            print(f"Applied migration {migration['name']}: {migration['result'] or 'ok'}")
+    except Exception as e:
+        # Abort startup: the code expects the migrated schema, and a half-migrated
+        # one would only fail later, per request.
+        print(f"Schema migration failed: {e}")
+        raise
+    db = SessionLocal()
+    try:
+        summary = backfill_patient_profiles(db)
+        if summary["legacy_rows"]:
+            print(f"Patient profiles backfilled: {summary}")
+    except Exception as e:
+        print(f"Patient profile backfill failed: {e}")
+    finally:
+        db.close()
 
 
 if __name__ == "__main__":
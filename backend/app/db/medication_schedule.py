@@ -0,0 +1,167 @@
+"""
+Recurring medication schedules and set-based reminder inserts.
+
+A MedicationSchedule is a small RRULE-style rule: FREQ=DAILY with
+INTERVAL=interval_days, one reminder at each of its local `times`, from
+start_date through end_date (open-ended when null). Reminders are materialized
+only MEDICATION_SCHEDULE_HORIZON_DAYS ahead: creating a schedule writes the
+first few days, and the scheduler extends every active schedule as days pass,
+so stopping or changing a course never leaves weeks of rows to clean up.
+
+Reminders are written with one INSERT ... RETURNING and their "scheduled"
+events with one executemany, instead of a flush per reminder to learn its id.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import insert, or_
+from sqlalchemy.exc import IntegrityError
+
+from app.config import MEDICATION_SCHEDULE_HORIZON_DAYS
+from app.db.models import MedicationEvent, MedicationReminder, MedicationSchedule
+from app.db.reminder_state import SCHEDULED
+
+
+DEFAULT_TIMEZONE = "Asia/Kolkata"
+TIME_ALIASES = {
+    "morning": "09:00",
+    "afternoon": "14:00",
+    "evening": "20:00",
+}
+
+
+def parse_times(times: list[str]) -> list[dict]:
+    """["morning", "21:30"] -> [{"time": "09:00", "label": "morning"}, ...]; ValueError on a bad entry."""
+    parsed = []
+    for raw in times:
+        value = TIME_ALIASES.get(raw.strip().lower(), raw.strip())
+        try:
+            hour, minute = map(int, value.split(":"))
+        except ValueError:
+            raise ValueError(f"Invalid time {raw!r}; use HH:MM or one of {sorted(TIME_ALIASES)}")
+        if not (0 <= hour < 24 and 0 <= minute < 60):
+            raise ValueError(f"Invalid time {raw!r}")
+        parsed.append({"time": f"{hour:02d}:{minute:02d}", "label": raw})
+    return parsed
+
+
+def schedule_slots(schedule: MedicationSchedule, first_day: date, last_day: date, not_before: datetime) -> list[tuple]:
+    """[(scheduled_for UTC, label)] for the schedule's days in [first_day, last_day], skipping times before not_before."""
+    tz = ZoneInfo(schedule.timezone or DEFAULT_TIMEZONE)
+    interval = max(schedule.interval_days or 1, 1)
+    day = max(first_day, schedule.start_date)
+    if schedule.end_date is not None:
+        last_day = min(last_day, schedule.end_date)
+    slots = []
+    while day <= last_day:
+        if (day - schedule.start_date).days % interval == 0:
+            for entry in schedule.times or []:
+                hour, minute = map(int, entry["time"].split(":"))
+                scheduled = datetime.combine(day, time(hour, minute), tzinfo=tz).astimezone(timezone.utc)
+                if scheduled >= not_before:
+                    slots.append((scheduled, entry.get("label")))
+        day += timedelta(days=1)
+    return slots
+
+
+def insert_reminders(db, rows: list[dict]) -> list[int]:
+    """
+    Insert reminders (MedicationReminder column dicts, plus an optional "label"
+    for the event meta) and their "scheduled" events in two statements. Does not commit.
+    """
+    if not rows:
+        return []
+    ids = list(db.scalars(
+        insert(MedicationReminder).returning(MedicationReminder.id, sort_by_parameter_order=True),
+        [{key: value for key, value in row.items() if key != "label"} for row in rows],
+    ))
+    db.execute(insert(MedicationEvent), [
+        {
+            "reminder_id": reminder_id,
+            "event_type": "scheduled",
+            "meta": {"scheduled_for": row["scheduled_for"].isoformat(), **({"label": row["label"]} if row.get("label") else {})},
+        }
+        for reminder_id, row in zip(ids, rows)
+    ])
+    return ids
+
+
+def materialize_schedule(
+    db,
+    schedule: MedicationSchedule,
+    now: datetime,
+    horizon_days: int = MEDICATION_SCHEDULE_HORIZON_DAYS,
+) -> list[int]:
+    """Create the schedule's reminders up to `horizon_days` local days from today. Does not commit."""
+    local_today = now.astimezone(ZoneInfo(schedule.timezone or DEFAULT_TIMEZONE)).date()
+    through = local_today + timedelta(days=max(horizon_days, 1) - 1)
+    if schedule.end_date is not None:
+        through = min(through, schedule.end_date)
+    first = schedule.materialized_through + timedelta(days=1) if schedule.materialized_through else schedule.start_date
+    if first > through:
+        return []
+    ids = insert_reminders(db, [
+        {
+            "patient_id": schedule.patient_id,
+            "schedule_id": schedule.id,
+            "medication_name": schedule.medication_name,
+            "dose": schedule.dose,
+            "scheduled_for": scheduled_for,
+            "status": SCHEDULED,
+            # Bulk inserts skip the model's before_insert hook, so set it here.
+            "next_action_at": scheduled_for,
+            "label": label,
+        }
+        for scheduled_for, label in schedule_slots(schedule, first, through, now)
+    ])
+    schedule.materialized_through = through
+    return ids
+
+
+def materialize_schedules(db, now: datetime | None = None, horizon_days: int = MEDICATION_SCHEDULE_HORIZON_DAYS) -> int:
+    """Scheduler hook: extend every active schedule to the horizon. Commits per schedule; returns reminders created."""
+    now = now or datetime.now(timezone.utc)
+    # Compared with the UTC date, so schedules ahead of UTC are extended up to a
+    # day late; the horizon absorbs that.
+    horizon = now.date() + timedelta(days=max(horizon_days, 1) - 1)
+    due = (
+        db.query(MedicationSchedule)
+        .filter(MedicationSchedule.active.is_(True))
+        .filter(or_(MedicationSchedule.materialized_through.is_(None), MedicationSchedule.materialized_through < horizon))
+        .filter(or_(
+            MedicationSchedule.end_date.is_(None),
+            MedicationSchedule.materialized_through.is_(None),
+            MedicationSchedule.materialized_through < MedicationSchedule.end_date,
+        ))
+        .all()
+    )
+    created = 0
+    for schedule in due:
+        try:
+            created += len(materialize_schedule(db, schedule, now, horizon_days))
+            db.commit()
+        except IntegrityError:
+            # Another worker materialized the same slots first.
+            db.rollback()
+    return created
+
+
+def stop_schedule(db, schedule: MedicationSchedule, now: datetime | None = None) -> int:
+    """Deactivate the schedule and drop its reminders that have not gone out yet. Commits."""
+    now = now or datetime.now(timezone.utc)
+    schedule.active = False
+    pending = [
+        row.id
+        for row in db.query(MedicationReminder.id).filter(
+            MedicationReminder.schedule_id == schedule.id,
+            MedicationReminder.status == SCHEDULED,
+            MedicationReminder.scheduled_for > now,
+        )
+    ]
+    if pending:
+        db.query(MedicationEvent).filter(MedicationEvent.reminder_id.in_(pending)).delete(synchronize_session=False)
+        db.query(MedicationReminder).filter(MedicationReminder.id.in_(pending)).delete(synchronize_session=False)
+    db.commit()
+    return len(pending)
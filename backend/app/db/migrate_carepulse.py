@@ -3,8 +3,9 @@ Database migration script to add new CarePulse production models
 Run this to create the new tables and indexes
 """
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import inspect
 from app.db.models import Base
+from app.db.migrations import run_migrations
 from app.db.session import engine
 import logging
 
@@ -20,26 +21,26 @@ def run_migration():
         # Create all tables (will skip existing ones)
         Base.metadata.create_all(bind=engine)
         logger.info("✓ All tables created/verified")
-        
+
+        # Columns and indexes on existing tables
+        for migration in run_migrations(engine):
+            logger.info(f"✓ Applied migration {migration['name']}")
+
         # Verify new tables exist
-        with engine.connect() as conn:
-            # Check for new tables
-            new_tables = [
-                'pending_registrations',
-                'nurse_call_assignments',
-                'response_corrections',
-                'alert_actions',
-                'notifications'
-            ]
-            
-            for table_name in new_tables:
-                result = conn.execute(text(
-                    f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table_name}'"
-                ))
-                if result.fetchone():
-                    logger.info(f"✓ Table '{table_name}' exists")
-                else:
-                    logger.warning(f"✗ Table '{table_name}' not found")
+        inspector = inspect(engine)
+        new_tables = [
+            'pending_registrations',
+            'nurse_call_assignments',
+            'response_corrections',
+            'alert_actions',
+            'notifications'
+        ]
+
+        for table_name in new_tables:
+            if inspector.has_table(table_name):
+                logger.info(f"✓ Table '{table_name}' exists")
+            else:
+                logger.warning(f"✗ Table '{table_name}' not found")
         
         logger.info("Migration completed successfully!")
         return True
@@ -0,0 +1,2 @@
+# Versioned schema migrations; see runner.py
+from app.db.migrations.runner import migration_status, run_migrations
@@ -0,0 +1,24 @@
+import argparse
+import json
+
+from app.db.migrations.runner import migration_status, run_migrations
+from app.db.models import Base
+from app.db.session import engine
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.db.migrations", description="Apply versioned schema migrations.")
+    parser.add_argument("command", choices=["status", "upgrade"])
+    parser.add_argument("--dry-run", action="store_true", help="Print the SQL pending migrations would run.")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        print(json.dumps(migration_status(), indent=2))
+        return
+    if not args.dry_run:
+        Base.metadata.create_all(bind=engine)
+    print(json.dumps(run_migrations(dry_run=args.dry_run), indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Versioned schema migrations.
+
+create_all() only creates missing tables, so new columns and indexes on existing
+tables never reached deployed databases. Each module in versions/ named
+vNNNN_<slug>.py defines DESCRIPTION and upgrade(op); applied versions are
+recorded in schema_migrations and each runs once, in order. init_db runs the
+pending ones at startup; the CLI can run them ahead of a deploy:
+
+    python -m app.db.migrations status
+    python -m app.db.migrations upgrade [--dry-run]
+
+On Postgres, indexes are built with CREATE INDEX CONCURRENTLY so writers are not
+blocked, and concurrent app workers serialize on an advisory lock.
+"""
+from __future__ import annotations
+
+import importlib
+import pkgutil
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, text
+
+from app.db.migrations import versions
+from app.db.session import SessionLocal, engine
+
+
+ADVISORY_LOCK_ID = 727_001  # arbitrary, constant across releases
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", String, primary_key=True),
+    Column("description", String, nullable=False, default=""),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+class MigrationContext:
+    """The `op` handed to upgrade(): idempotent DDL helpers plus a session for data fixes."""
+
+    def __init__(self, bind, dry_run: bool = False):
+        self.bind = bind
+        self.dialect = bind.dialect.name
+        self.dry_run = dry_run
+        self.statements: list[str] = []
+
+    @property
+    def is_postgres(self) -> bool:
+        return self.dialect == "postgresql"
+
+    def has_table(self, table: str) -> bool:
+        return inspect(self.bind).has_table(table)
+
+    def has_column(self, table: str, column: str) -> bool:
+        return any(col["name"] == column for col in inspect(self.bind).get_columns(table))
+
+    def has_index(self, table: str, name: str) -> bool:
+        return any(index["name"] == name for index in inspect(self.bind).get_indexes(table))
+
+    def execute(self, sql: str, autocommit: bool = False, **params):
+        self.statements.append(sql)
+        if self.dry_run:
+            return None
+        if autocommit:
+            with self.bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                return conn.execute(text(sql), params)
+        with self.bind.begin() as conn:
+            return conn.execute(text(sql), params)
+
+    def execute_all(self, statements: list[str]):
+        """Run several statements in one transaction (SQLite DDL is transactional too)."""
+        self.statements.extend(statements)
+        if self.dry_run:
+            return
+        with self.bind.begin() as conn:
+            for sql in statements:
+                conn.execute(text(sql))
+
+    def column_type(self, table: str, column: str):
+        for col in inspect(self.bind).get_columns(table):
+            if col["name"] == column:
+                return col["type"]
+        return None
+
+    def add_column(self, table: str, column: str, sql_type: str) -> bool:
+        """Adds the column if it is missing; returns True when it was added."""
+        if self.has_column(table, column):
+            return False
+        self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {sql_type}")
+        return True
+
+    def create_index(self, name: str, table: str, columns: list[str], unique: bool = False):
+        unique_sql = "UNIQUE " if unique else ""
+        cols = ", ".join(columns)
+        if self.is_postgres:
+            # A failed CONCURRENTLY build leaves an INVALID index that IF NOT EXISTS would skip.
+            with self.bind.connect() as conn:
+                invalid = conn.execute(text(
+                    "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                    "WHERE c.relname = :name AND NOT i.indisvalid"
+                ), {"name": name}).first()
+            if invalid:
+                self.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}", autocommit=True)
+            self.execute(
+                f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({cols})",
+                autocommit=True,
+            )
+        else:
+            self.execute(f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({cols})")
+
+    def create_model_indexes(self, model):
+        """Create every Index declared in `model.__table_args__` that is not there yet."""
+        for index in model.__table__.indexes:
+            self.create_index(index.name, model.__tablename__, [col.name for col in index.columns], index.unique)
+
+    @contextmanager
+    def session(self):
+        db = SessionLocal(bind=self.bind)
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+def discover() -> list[tuple[str, str, object]]:
+    """[(version, name, module)] sorted by version."""
+    found = []
+    for info in pkgutil.iter_modules(versions.__path__):
+        if not info.name.startswith("v"):
+            continue
+        version = info.name[1:].split("_", 1)[0]
+        module = importlib.import_module(f"{versions.__name__}.{info.name}")
+        found.append((version, info.name, module))
+    return sorted(found, key=lambda item: item[0])
+
+
+def _applied(bind) -> dict[str, datetime]:
+    with bind.connect() as conn:
+        return {row.version: row.applied_at for row in conn.execute(schema_migrations.select())}
+
+
+@contextmanager
+def _migration_lock(bind):
+    if bind.dialect.name != "postgresql":
+        yield
+        return
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+
+
+def migration_status(bind=engine) -> list[dict]:
+    _metadata.create_all(bind=bind, checkfirst=True)
+    applied = _applied(bind)
+    return [
+        {
+            "version": version,
+            "name": name,
+            "description": getattr(module, "DESCRIPTION", ""),
+            "applied_at": applied[version].isoformat() if version in applied else None,
+        }
+        for version, name, module in discover()
+    ]
+
+
+def run_migrations(bind=engine, dry_run: bool = False) -> list[dict]:
+    """Apply pending migrations in order; returns what ran (or would run, with the SQL, on dry_run)."""
+    _metadata.create_all(bind=bind, checkfirst=True)
+    ran = []
+    with _migration_lock(bind):
+        applied = _applied(bind)  # read under the lock so a worker that just finished is seen
+        for version, name, module in discover():
+            if version in applied:
+                continue
+            op = MigrationContext(bind, dry_run=dry_run)
+            result = module.upgrade(op)
+            if not dry_run:
+                with bind.begin() as conn:
+                    conn.execute(schema_migrations.insert().values(
+                        version=version,
+                        description=getattr(module, "DESCRIPTION", ""),
+                        applied_at=datetime.now(timezone.utc),
+                    ))
+            ran.append({"version": version, "name": name, "statements": op.statements, "result": result})
+    return ran
@@ -0,0 +1 @@
+# Migration modules: vNNNN_<slug>.py, each with DESCRIPTION and upgrade(op)
@@ -0,0 +1,22 @@
+"""Typed patient_id / call_log_id / intent_id columns on audit_events, backfilled from meta."""
+from app.db.backfill_audit_columns import COLUMNS, backfill_audit_columns
+
+DESCRIPTION = "audit_events: typed key columns and indexes, backfilled from meta"
+
+INDEXES = [
+    ("idx_audit_action_created", ["action", "created_at"]),
+    ("idx_audit_created", ["created_at"]),
+    ("idx_audit_user_created", ["user_id", "created_at"]),
+    ("idx_audit_patient", ["patient_id", "created_at"]),
+    ("idx_audit_call_log", ["call_log_id", "intent_id"]),
+]
+
+
+def upgrade(op):
+    added = [name for name, sql_type in COLUMNS.items() if op.add_column("audit_events", name, sql_type)]
+    for name, columns in INDEXES:
+        op.create_index(name, "audit_events", columns)
+    if not added:
+        return {"columns_added": []}
+    with op.session() as db:
+        return {"columns_added": added, **backfill_audit_columns(db, dry_run=op.dry_run)}
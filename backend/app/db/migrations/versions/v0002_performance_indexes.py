@@ -0,0 +1,21 @@
+"""Indexes declared on the models after their tables already existed in deployed databases."""
+
+DESCRIPTION = "lookup indexes: call_logs.call_sid/patient_call_id, agent_responses.call_id, readmission_risks.call_log_id, interventions, token expiry"
+
+# Spelled out rather than read from the models, so later model changes cannot alter this migration.
+INDEXES = [
+    ("idx_call_log_call_sid", "call_logs", ["call_sid"]),
+    ("idx_call_log_patient_call", "call_logs", ["patient_call_id"]),
+    ("idx_agent_response_call", "agent_responses", ["call_id"]),
+    ("idx_readmission_call_log", "readmission_risks", ["call_log_id"]),
+    ("idx_intervention_patient_type", "interventions", ["patient_id", "type", "created_at"]),
+    ("idx_session_token_expires", "session_tokens", ["expires_at"]),
+    ("idx_session_token_user", "session_tokens", ["user_id"]),
+    ("idx_password_reset_expires", "password_resets", ["expires_at"]),
+    ("idx_password_reset_user", "password_resets", ["user_id"]),
+]
+
+
+def upgrade(op):
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
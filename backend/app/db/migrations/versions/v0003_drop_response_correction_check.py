@@ -0,0 +1,21 @@
+"""
+Older Postgres databases still carry a CHECK constraint on response_corrections
+that the model no longer declares (previously removed by hand with
+fix_db_constraint.py).
+"""
+from sqlalchemy import text
+
+DESCRIPTION = "response_corrections: drop stale CHECK constraint (Postgres)"
+
+
+def upgrade(op):
+    if not op.is_postgres or not op.has_table("response_corrections"):
+        return None
+    with op.bind.connect() as conn:
+        names = [row[0] for row in conn.execute(text(
+            "SELECT conname FROM pg_constraint "
+            "WHERE conrelid = 'response_corrections'::regclass AND contype = 'c'"
+        ))]
+    for name in names:
+        op.execute(f'ALTER TABLE response_corrections DROP CONSTRAINT IF EXISTS "{name}"')
+    return {"dropped": names}
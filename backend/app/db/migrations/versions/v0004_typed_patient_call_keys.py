@@ -0,0 +1,85 @@
+"""
+patient_calls.patient_id becomes an INTEGER foreign key to patients (it was a
+VARCHAR holding str(patient.id)); agent_responses gains patient_id and
+call_log_id so a patient's responses no longer need the patient_calls and
+call_logs hops. Rows whose patient_id matches no patient keep the call with
+patient_id NULL.
+"""
+from sqlalchemy import Integer, text
+
+DESCRIPTION = "patient_calls.patient_id -> integer FK; agent_responses.patient_id/call_log_id"
+
+BACKFILL_BATCH = 5000
+INDEXES = [
+    ("idx_patient_call_patient", "patient_calls", ["patient_id"]),
+    ("idx_agent_response_patient", "agent_responses", ["patient_id", "created_at"]),
+    ("idx_agent_response_call_log", "agent_responses", ["call_log_id"]),
+]
+
+
+def _convert_patient_calls(op) -> bool:
+    current = op.column_type("patient_calls", "patient_id")
+    if current is None or isinstance(current, Integer):
+        return False
+    if op.is_postgres:
+        op.execute("ALTER TABLE patient_calls ALTER COLUMN patient_id DROP NOT NULL")
+        op.execute(
+            "UPDATE patient_calls SET patient_id = NULL WHERE NOT EXISTS "
+            "(SELECT 1 FROM patients p WHERE p.id::text = patient_calls.patient_id)"
+        )
+        op.execute("ALTER TABLE patient_calls ALTER COLUMN patient_id TYPE INTEGER USING patient_id::integer")
+        op.execute(
+            "ALTER TABLE patient_calls ADD CONSTRAINT fk_patient_calls_patient "
+            "FOREIGN KEY (patient_id) REFERENCES patients (id) NOT VALID"
+        )
+        op.execute("ALTER TABLE patient_calls VALIDATE CONSTRAINT fk_patient_calls_patient")
+        return True
+
+    # SQLite cannot change a column type, so rebuild the table.
+    op.execute_all([
+        "CREATE TABLE patient_calls_new ("
+        "id INTEGER NOT NULL PRIMARY KEY, "
+        "patient_id INTEGER REFERENCES patients (id), "
+        "diagnosis VARCHAR, "
+        "language VARCHAR, "
+        "consent_given BOOLEAN, "
+        "created_at DATETIME DEFAULT CURRENT_TIMESTAMP)",
+        "INSERT INTO patient_calls_new (id, patient_id, diagnosis, language, consent_given, created_at) "
+        "SELECT pc.id, (SELECT p.id FROM patients p WHERE p.id = pc.patient_id), "
+        "pc.diagnosis, pc.language, pc.consent_given, pc.created_at FROM patient_calls pc",
+        "DROP TABLE patient_calls",
+        "ALTER TABLE patient_calls_new RENAME TO patient_calls",
+    ])
+    return True
+
+
+def _backfill_agent_responses(op) -> int:
+    with op.bind.connect() as conn:
+        max_id = conn.execute(text("SELECT MAX(id) FROM agent_responses")).scalar() or 0
+    batches = 0
+    for low in range(0, max_id, BACKFILL_BATCH):
+        op.execute(
+            "UPDATE agent_responses SET "
+            "patient_id = (SELECT pc.patient_id FROM patient_calls pc WHERE pc.id = agent_responses.call_id), "
+            "call_log_id = (SELECT MAX(cl.id) FROM call_logs cl WHERE cl.patient_call_id = agent_responses.call_id) "
+            f"WHERE id > {low} AND id <= {low + BACKFILL_BATCH} AND call_id IS NOT NULL"
+        )
+        batches += 1
+    return batches
+
+
+def upgrade(op):
+    converted = _convert_patient_calls(op)
+
+    added = [
+        column
+        for column, sql_type in (
+            ("patient_id", "INTEGER REFERENCES patients (id)"),
+            ("call_log_id", "INTEGER REFERENCES call_logs (id)"),
+        )
+        if op.add_column("agent_responses", column, sql_type)
+    ]
+    batches = _backfill_agent_responses(op) if added else 0
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+    return {"patient_calls_converted": converted, "agent_response_columns": added, "backfill_batches": batches}
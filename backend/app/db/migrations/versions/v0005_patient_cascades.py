@@ -0,0 +1,80 @@
+"""
+Foreign keys from patient-owned tables get ON DELETE CASCADE (call_logs ->
+patient_calls gets SET NULL), and the foreign-key columns the offboarding
+deletes filter on get indexes. archived_rows itself is created by create_all.
+
+On Postgres each constraint is re-added NOT VALID and validated separately, so
+the table is only briefly locked. SQLite cannot alter a constraint without
+rebuilding the table and does not enforce foreign keys on these connections
+anyway; there the explicit deletes in app/db/patient_archive.py do the work.
+"""
+from sqlalchemy import inspect
+
+DESCRIPTION = "ON DELETE CASCADE on patient-owned foreign keys; indexes for patient offboarding"
+
+# (table, column, referred table, ON DELETE action)
+FOREIGN_KEYS = [
+    ("patient_calls", "patient_id", "patients", "CASCADE"),
+    ("agent_responses", "call_id", "patient_calls", "CASCADE"),
+    ("agent_responses", "patient_id", "patients", "CASCADE"),
+    ("agent_responses", "call_log_id", "call_logs", "CASCADE"),
+    ("call_logs", "patient_id", "patients", "CASCADE"),
+    ("call_logs", "patient_call_id", "patient_calls", "SET NULL"),
+    ("readmission_risks", "patient_id", "patients", "CASCADE"),
+    ("readmission_risks", "call_log_id", "call_logs", "CASCADE"),
+    ("care_assignments", "patient_id", "patients", "CASCADE"),
+    ("interventions", "patient_id", "patients", "CASCADE"),
+    ("medication_reminders", "patient_id", "patients", "CASCADE"),
+    ("medication_events", "reminder_id", "medication_reminders", "CASCADE"),
+    ("nurse_call_assignments", "call_log_id", "call_logs", "CASCADE"),
+    ("response_corrections", "agent_response_id", "agent_responses", "CASCADE"),
+    ("response_corrections", "call_log_id", "call_logs", "CASCADE"),
+    ("response_corrections", "patient_id", "patients", "CASCADE"),
+    ("alert_actions", "call_log_id", "call_logs", "CASCADE"),
+    ("alert_actions", "patient_id", "patients", "CASCADE"),
+    ("notifications", "related_patient_id", "patients", "CASCADE"),
+    ("notifications", "related_assignment_id", "nurse_call_assignments", "CASCADE"),
+]
+
+INDEXES = [
+    ("idx_care_assignment_patient", "care_assignments", ["patient_id"]),
+    ("idx_medication_event_reminder", "medication_events", ["reminder_id", "created_at"]),
+    ("idx_nurse_assignment_call_log", "nurse_call_assignments", ["call_log_id"]),
+    ("idx_response_correction_patient", "response_corrections", ["patient_id"]),
+    ("idx_notification_patient", "notifications", ["related_patient_id"]),
+    ("idx_notification_assignment", "notifications", ["related_assignment_id"]),
+]
+
+
+def _existing_fk(op, table: str, column: str):
+    for fk in inspect(op.bind).get_foreign_keys(table):
+        if fk["constrained_columns"] == [column]:
+            return fk
+    return None
+
+
+def _cascade_foreign_keys(op) -> list[str]:
+    changed = []
+    for table, column, referred, action in FOREIGN_KEYS:
+        if not op.has_table(table) or not op.has_column(table, column):
+            continue
+        fk = _existing_fk(op, table, column)
+        if fk and (fk.get("options") or {}).get("ondelete", "").upper() == action:
+            continue
+        name = fk["name"] if fk and fk.get("name") else f"{table}_{column}_fkey"
+        op.execute(
+            f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}, "
+            f"ADD CONSTRAINT {name} FOREIGN KEY ({column}) REFERENCES {referred} (id) "
+            f"ON DELETE {action} NOT VALID"
+        )
+        op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
+        changed.append(f"{table}.{column}")
+    return changed
+
+
+def upgrade(op):
+    changed = _cascade_foreign_keys(op) if op.is_postgres else []
+    for name, table, columns in INDEXES:
+        if op.has_table(table):
+            op.create_index(name, table, columns)
+    return {"foreign_keys": changed}
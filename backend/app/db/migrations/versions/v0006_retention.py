@@ -0,0 +1,19 @@
+"""call_logs.flow_log_compacted_at, and created_at indexes for the retention sweeps."""
+
+DESCRIPTION = "retention: call_logs.flow_log_compacted_at; created_at indexes"
+
+INDEXES = [
+    ("idx_call_log_created", "call_logs", ["created_at"]),
+    ("idx_agent_response_created", "agent_responses", ["created_at"]),
+    ("idx_medication_event_created", "medication_events", ["created_at"]),
+    ("idx_notification_created", "notifications", ["created_at"]),
+]
+
+
+def upgrade(op):
+    sql_type = "TIMESTAMP WITH TIME ZONE" if op.is_postgres else "DATETIME"
+    added = op.add_column("call_logs", "flow_log_compacted_at", sql_type)
+    for name, table, columns in INDEXES:
+        if op.has_table(table):
+            op.create_index(name, table, columns)
+    return {"flow_log_compacted_at_added": added}
@@ -0,0 +1,21 @@
+"""medication_reminders.schedule_id, linking materialized reminders to their medication_schedules row."""
+
+DESCRIPTION = "medication_reminders.schedule_id and one-reminder-per-slot index"
+
+INDEXES = [
+    ("idx_medication_schedule_due", "medication_schedules", ["active", "materialized_through"], False),
+    ("idx_medication_schedule_patient", "medication_schedules", ["patient_id"], False),
+    ("uq_medication_reminder_schedule_slot", "medication_reminders", ["schedule_id", "scheduled_for"], True),
+]
+
+
+def upgrade(op):
+    added = op.add_column(
+        "medication_reminders",
+        "schedule_id",
+        "INTEGER REFERENCES medication_schedules (id) ON DELETE SET NULL",
+    )
+    for name, table, columns, unique in INDEXES:
+        if op.has_table(table):
+            op.create_index(name, table, columns, unique=unique)
+    return {"schedule_id_added": added}
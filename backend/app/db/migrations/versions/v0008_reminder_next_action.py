@@ -0,0 +1,27 @@
+"""
+medication_reminders.next_action_at, the indexed column the scheduler polls
+instead of status + scheduled_for / sms_sent_at (see app/db/reminder_state.py).
+
+Pending reminders are backfilled: scheduled ones are due at scheduled_for and
+sms_sent ones right away (their call delay is minutes). Calls already placed
+are left NULL, so they wait for their Twilio callbacks as before instead of
+timing out the moment this runs.
+"""
+
+DESCRIPTION = "medication_reminders.next_action_at for the reminder state machine"
+
+BACKFILL = [
+    "UPDATE medication_reminders SET next_action_at = scheduled_for "
+    "WHERE status = 'scheduled' AND next_action_at IS NULL",
+    "UPDATE medication_reminders SET next_action_at = sms_sent_at "
+    "WHERE status = 'sms_sent' AND sms_sent_at IS NOT NULL AND next_action_at IS NULL",
+]
+
+
+def upgrade(op):
+    sql_type = "TIMESTAMP WITH TIME ZONE" if op.is_postgres else "DATETIME"
+    added = op.add_column("medication_reminders", "next_action_at", sql_type)
+    for sql in BACKFILL:
+        op.execute(sql)
+    op.create_index("idx_medication_next_action", "medication_reminders", ["next_action_at"])
+    return {"next_action_at_added": added}
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, Float, String, Boolean, JSON, DateTime, ForeignKey, Index, CheckConstraint
-from sqlalchemy import Text
+from sqlalchemy import Column, Integer, Float, String, Boolean, JSON, Date, DateTime, ForeignKey, Index, CheckConstraint
+from sqlalchemy import Text, event
+from sqlalchemy.orm import validates
 from sqlalchemy.sql import func
 from app.db.base import Base
 
@@ -7,12 +8,25 @@ from app.db.base import Base
 class PatientCall(Base):
     __tablename__ = "patient_calls"
     id = Column(Integer, primary_key=True)
-    patient_id = Column(String, nullable=False)
+    # Was a String; migration v0004 converts it. Nullable because legacy rows
+    # whose patient no longer exists are kept with patient_id NULL.
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=True)
     diagnosis = Column(String)
     language = Column(String, default="en")
     consent_given = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index('idx_patient_call_patient', 'patient_id'),
+    )
+
+    @validates("patient_id")
+    def _coerce_patient_id(self, key, value):
+        # Callers used to pass str(patient.id); keep accepting numeric strings.
+        if isinstance(value, str):
+            return int(value) if value.strip().isdigit() else None
+        return value
+
 
 class Patient(Base):
     __tablename__ = "patients"
@@ -36,10 +50,22 @@ class Patient(Base):
     )
 
 
+class PatientProfile(Base):
+    """Clinical profile fields shown on the patient list (one row per patient)."""
+    __tablename__ = "patient_profiles"
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), primary_key=True)
+    diagnosis = Column(String)
+    medications_text = Column(Text)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
 class AgentResponse(Base):
     __tablename__ = "agent_responses"
     id = Column(Integer, primary_key=True)
-    call_id = Column(Integer, ForeignKey("patient_calls.id"))
+    call_id = Column(Integer, ForeignKey("patient_calls.id", ondelete="CASCADE"))
+    # Denormalized from the call so a patient's response history is one indexed lookup.
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=True)
+    call_log_id = Column(Integer, ForeignKey("call_logs.id", ondelete="CASCADE"), nullable=True)
     intent_id = Column(String, nullable=False)
     raw_text = Column(String)
     structured_data = Column(JSON)
@@ -47,12 +73,19 @@ class AgentResponse(Base):
     confidence = Column(Float, default=50)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index('idx_agent_response_call', 'call_id'),
+        Index('idx_agent_response_patient', 'patient_id', 'created_at'),
+        Index('idx_agent_response_call_log', 'call_log_id'),
+        Index('idx_agent_response_created', 'created_at'),
+    )
+
 
 class CallLog(Base):
     __tablename__ = "call_logs"
     id = Column(Integer, primary_key=True)
-    patient_id = Column(Integer, ForeignKey("patients.id"))
-    patient_call_id = Column(Integer, ForeignKey("patient_calls.id"), nullable=True)
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"))
+    patient_call_id = Column(Integer, ForeignKey("patient_calls.id", ondelete="SET NULL"), nullable=True)
     call_sid = Column(String)
     scheduled_for = Column(DateTime(timezone=True))
     started_at = Column(DateTime(timezone=True))
@@ -63,20 +96,44 @@ class CallLog(Base):
     risk_level = Column(String)
     doctor_note = Column(String)
     flow_log = Column(JSON)
+    # Set once retention has trimmed flow_log (app/db/retention.py).
+    flow_log_compacted_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     __table_args__ = (
         Index('idx_call_log_patient_date', 'patient_id', 'created_at'),
+        Index('idx_call_log_created', 'created_at'),
         Index('idx_call_log_risk_level', 'risk_level', 'created_at'),
         Index('idx_call_log_status', 'status'),
+        Index('idx_call_log_call_sid', 'call_sid'),
+        Index('idx_call_log_patient_call', 'patient_call_id'),
+    )
+
+
+class CallTimeline(Base):
+    """
+    Denormalized per-call view for the patient logs and nurse IVR screens.
+    Built when a call is finalized and patched on corrections, reviews and
+    overrides; see app/db/call_timeline.py.
+    """
+    __tablename__ = "call_timelines"
+    call_log_id = Column(Integer, ForeignKey("call_logs.id", ondelete="CASCADE"), primary_key=True)
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=False)
+    log_created_at = Column(DateTime(timezone=True))
+    entry = Column(JSON, nullable=False)
+    ivr_items = Column(JSON, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index('idx_call_timeline_patient', 'patient_id', 'log_created_at'),
     )
 
 
 class ReadmissionRisk(Base):
     __tablename__ = "readmission_risks"
     id = Column(Integer, primary_key=True)
-    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=True)
-    call_log_id = Column(Integer, ForeignKey("call_logs.id"), nullable=True)
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=True)
+    call_log_id = Column(Integer, ForeignKey("call_logs.id", ondelete="CASCADE"), nullable=True)
     score = Column(Float)
     level = Column(String)
     model_version = Column(String, default="baseline")
@@ -86,6 +143,7 @@ class ReadmissionRisk(Base):
     __table_args__ = (
         Index('idx_readmission_patient', 'patient_id', 'created_at'),
         Index('idx_readmission_level', 'level', 'created_at'),
+        Index('idx_readmission_call_log', 'call_log_id'),
     )
 
 
@@ -119,21 +177,30 @@ class SessionToken(Base):
     expires_at = Column(DateTime(timezone=True), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index('idx_session_token_expires', 'expires_at'),
+        Index('idx_session_token_user', 'user_id'),
+    )
+
 
 class CareAssignment(Base):
     __tablename__ = "care_assignments"
     id = Column(Integer, primary_key=True)
-    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=False)
     doctor_name = Column(String)
     nurse_name = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    __table_args__ = (
+        Index('idx_care_assignment_patient', 'patient_id'),
+    )
+
 
 class Intervention(Base):
     __tablename__ = "interventions"
     id = Column(Integer, primary_key=True)
-    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=False)
     type = Column(String, nullable=False)
     status = Column(String, default="planned")
     note = Column(String)
@@ -141,6 +208,10 @@ class Intervention(Base):
     risk_after = Column(Float)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index('idx_intervention_patient_type', 'patient_id', 'type', 'created_at'),
+    )
+
 
 class AuditEvent(Base):
     __tablename__ = "audit_events"
@@ -148,37 +219,140 @@ class AuditEvent(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     action = Column(String, nullable=False)
     meta = Column(JSON)
+    # Copied out of meta on insert (see _extract_audit_keys) so they can be indexed.
+    # No foreign keys: audit history outlives deleted patients and calls.
+    patient_id = Column(Integer)
+    call_log_id = Column(Integer)
+    intent_id = Column(String)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('idx_audit_action_created', 'action', 'created_at'),
+        Index('idx_audit_created', 'created_at'),
+        Index('idx_audit_user_created', 'user_id', 'created_at'),
+        Index('idx_audit_patient', 'patient_id', 'created_at'),
+        Index('idx_audit_call_log', 'call_log_id', 'intent_id'),
+    )
+
+
+def _meta_int(meta: dict, key: str):
+    value = meta.get(key)
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def audit_keys_from_meta(meta) -> dict:
+    """Typed AuditEvent columns derived from its meta JSON."""
+    meta = meta if isinstance(meta, dict) else {}
+    intent_id = meta.get("intent_id")
+    return {
+        "patient_id": _meta_int(meta, "patient_id"),
+        "call_log_id": _meta_int(meta, "call_log_id"),
+        "intent_id": str(intent_id) if intent_id not in (None, "") else None,
+    }
+
+
+@event.listens_for(AuditEvent, "before_insert")
+def _extract_audit_keys(mapper, connection, target):
+    for key, value in audit_keys_from_meta(target.meta).items():
+        if getattr(target, key) is None:
+            setattr(target, key, value)
+
+
+class MedicationSchedule(Base):
+    """
+    A recurring medication rule (daily, every `interval_days`, at each of `times`
+    in `timezone`, from start_date through end_date). Reminders are materialized
+    from it a few days ahead; see app/db/medication_schedule.py.
+    """
+    __tablename__ = "medication_schedules"
+    id = Column(Integer, primary_key=True)
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=False)
+    medication_name = Column(String, nullable=False)
+    dose = Column(String, nullable=True)
+    times = Column(JSON, nullable=False)  # [{"time": "HH:MM", "label": "morning"}, ...]
+    interval_days = Column(Integer, nullable=False, default=1)
+    timezone = Column(String, nullable=False, default="Asia/Kolkata")
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=True)  # null = until stopped
+    materialized_through = Column(Date, nullable=True)
+    active = Column(Boolean, nullable=False, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index('idx_medication_schedule_due', 'active', 'materialized_through'),
+        Index('idx_medication_schedule_patient', 'patient_id'),
+    )
+
 
 class MedicationReminder(Base):
     __tablename__ = "medication_reminders"
     id = Column(Integer, primary_key=True)
-    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=False)
+    schedule_id = Column(Integer, ForeignKey("medication_schedules.id", ondelete="SET NULL"), nullable=True)
     medication_name = Column(String, nullable=False)
     dose = Column(String, nullable=True)
     scheduled_for = Column(DateTime(timezone=True), nullable=False)
     sms_sent_at = Column(DateTime(timezone=True), nullable=True)
     call_placed_at = Column(DateTime(timezone=True), nullable=True)
     call_sid = Column(String, nullable=True)
-    status = Column(String, default="scheduled")  # scheduled, sms_sent, call_placed, taken, missed, no_response
+    status = Column(String, default="scheduled")  # see app/db/reminder_state.py
+    # When the scheduler next acts on this reminder; NULL once nothing is left to do.
+    next_action_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     __table_args__ = (
         Index('idx_medication_patient_date', 'patient_id', 'scheduled_for'),
         Index('idx_medication_status', 'status', 'scheduled_for'),
+        Index('idx_medication_next_action', 'next_action_at'),
+        Index('uq_medication_reminder_schedule_slot', 'schedule_id', 'scheduled_for', unique=True),
     )
 
 
+@event.listens_for(MedicationReminder, "before_insert")
+def _schedule_next_action(mapper, connection, target):
+    if target.next_action_at is None and target.status in (None, "scheduled"):
+        target.next_action_at = target.scheduled_for
+
+
 class MedicationEvent(Base):
     __tablename__ = "medication_events"
     id = Column(Integer, primary_key=True)
-    reminder_id = Column(Integer, ForeignKey("medication_reminders.id"), nullable=False)
+    reminder_id = Column(Integer, ForeignKey("medication_reminders.id", ondelete="CASCADE"), nullable=False)
     event_type = Column(String, nullable=False)
     meta = Column(JSON)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index('idx_medication_event_reminder', 'reminder_id', 'created_at'),
+        Index('idx_medication_event_created', 'created_at'),
+    )
+
+
+class DailyRollup(Base):
+    """
+    Per-day, per-protocol call and medication counts behind /reports/trends and
+    the historical /reports/daily. Days are UTC calendar days, matching the
+    report endpoints; see app/reports/rollups.py.
+    """
+    __tablename__ = "daily_rollups"
+    day = Column(Date, primary_key=True)
+    protocol = Column(String, primary_key=True)
+    calls = Column(Integer, nullable=False, default=0)
+    answered = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    high_risk = Column(Integer, nullable=False, default=0)
+    reminders_scheduled = Column(Integer, nullable=False, default=0)
+    reminders_sent = Column(Integer, nullable=False, default=0)
+    confirmation_calls = Column(Integer, nullable=False, default=0)
+    confirmations_taken = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 
 class PasswordReset(Base):
     __tablename__ = "password_resets"
@@ -189,6 +363,11 @@ class PasswordReset(Base):
     used = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index('idx_password_reset_expires', 'expires_at'),
+        Index('idx_password_reset_user', 'user_id'),
+    )
+
 
 # ============================================================================
 # NEW PRODUCTION MODELS FOR CAREPULSE DASHBOARD SYSTEM
@@ -223,7 +402,7 @@ class NurseCallAssignment(Base):
     
     id = Column(Integer, primary_key=True)
     patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=False)
-    call_log_id = Column(Integer, ForeignKey("call_logs.id"), nullable=True)
+    call_log_id = Column(Integer, ForeignKey("call_logs.id", ondelete="CASCADE"), nullable=True)
     assigned_by_doctor_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     assigned_to_nurse_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # null = any nurse
     status = Column(String, nullable=False, default="pending")
@@ -239,6 +418,7 @@ class NurseCallAssignment(Base):
         Index('idx_nurse_assignment_nurse', 'assigned_to_nurse_id', 'status'),
         Index('idx_nurse_assignment_patient', 'patient_id'),
         Index('idx_nurse_assignment_status', 'status', 'created_at'),
+        Index('idx_nurse_assignment_call_log', 'call_log_id'),
     )
 
 
@@ -247,9 +427,9 @@ class ResponseCorrection(Base):
     __tablename__ = "response_corrections"
     
     id = Column(Integer, primary_key=True)
-    agent_response_id = Column(Integer, ForeignKey("agent_responses.id"), nullable=False, unique=True)
-    call_log_id = Column(Integer, ForeignKey("call_logs.id"), nullable=False)
-    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
+    agent_response_id = Column(Integer, ForeignKey("agent_responses.id", ondelete="CASCADE"), nullable=False, unique=True)
+    call_log_id = Column(Integer, ForeignKey("call_logs.id", ondelete="CASCADE"), nullable=False)
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=False)
     original_text = Column(Text, nullable=False)
     corrected_text = Column(Text, nullable=False)
     corrected_by_nurse_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -258,6 +438,7 @@ class ResponseCorrection(Base):
     
     __table_args__ = (
         Index('idx_response_correction_call', 'call_log_id'),
+        Index('idx_response_correction_patient', 'patient_id'),
         Index('idx_response_correction_nurse', 'corrected_by_nurse_id', 'created_at'),
     )
 
@@ -267,8 +448,8 @@ class AlertAction(Base):
     __tablename__ = "alert_actions"
     
     id = Column(Integer, primary_key=True)
-    call_log_id = Column(Integer, ForeignKey("call_logs.id"), nullable=False)
-    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
+    call_log_id = Column(Integer, ForeignKey("call_logs.id", ondelete="CASCADE"), nullable=False)
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=False)
     risk_score = Column(Float, nullable=False)
     action = Column(String, nullable=False)
     override_score = Column(Float, nullable=True)
@@ -296,12 +477,35 @@ class Notification(Base):
     type = Column(String, nullable=False)
     title = Column(String, nullable=False)
     message = Column(Text, nullable=False)
-    related_patient_id = Column(Integer, ForeignKey("patients.id"), nullable=True)
-    related_assignment_id = Column(Integer, ForeignKey("nurse_call_assignments.id"), nullable=True)
+    related_patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=True)
+    related_assignment_id = Column(Integer, ForeignKey("nurse_call_assignments.id", ondelete="CASCADE"), nullable=True)
     read = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     __table_args__ = (
         CheckConstraint("type IN ('nurse_call_assignment', 'high_alert', 'system_notification')", name='check_notification_type'),
         Index('idx_notification_user_read', 'user_id', 'read', 'created_at'),
+        Index('idx_notification_patient', 'related_patient_id'),
+        Index('idx_notification_assignment', 'related_assignment_id'),
+        Index('idx_notification_created', 'created_at'),
+    )
+
+
+class ArchivedRow(Base):
+    """
+    A row removed by patient offboarding, kept as JSON so it can be inspected or
+    restored later; see app/db/patient_archive.py.
+    """
+    __tablename__ = "archived_rows"
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+    # No foreign key: the patient is gone once its rows are archived.
+    patient_id = Column(Integer, nullable=True)
+    payload = Column(JSON, nullable=False)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('idx_archived_row_patient', 'patient_id', 'table_name'),
+        Index('idx_archived_row_table', 'table_name', 'archived_at'),
     )
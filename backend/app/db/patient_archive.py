@@ -0,0 +1,215 @@
+"""
+Patient offboarding: delete a patient and everything that hangs off it.
+
+Rows are removed table by table, children before parents, in chunks of
+PATIENT_DELETE_BATCH_SIZE with a commit after each chunk, so deleting a patient
+with months of calls never holds row locks for more than one small transaction.
+With archive=True each chunk is first copied into archived_rows (same
+transaction as its delete). The patient is marked inactive before anything is
+deleted, so if a run fails part way the scheduler stops calling them and
+running it again picks up where it stopped. The foreign keys also carry
+ON DELETE CASCADE (migration v0005) as a backstop for deletes made elsewhere.
+
+    python -m app.db.patient_archive 12 57 [--no-archive] [--dry-run]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from datetime import date, datetime
+
+from sqlalchemy import Select, func, or_, select
+
+from app.config import PATIENT_ARCHIVE_ON_DELETE, PATIENT_DELETE_BATCH_SIZE
+from app.db.models import (
+    AgentResponse,
+    AlertAction,
+    ArchivedRow,
+    CallLog,
+    CallTimeline,
+    CareAssignment,
+    Intervention,
+    MedicationEvent,
+    MedicationReminder,
+    MedicationSchedule,
+    Notification,
+    NurseCallAssignment,
+    Patient,
+    PatientCall,
+    PatientProfile,
+    ReadmissionRisk,
+    ResponseCorrection,
+)
+from app.db.session import SessionLocal
+
+
+def deletion_plan(patient_ids, call_log_ids=(), patient_call_ids=()) -> list[tuple]:
+    """
+    [(model, condition, patient expression)] in delete order. `patient_ids` and
+    `call_log_ids` are lists or select()s of ids; `call_log_ids` /
+    `patient_call_ids` add calls that do not belong to those patients (stray
+    demo calls, or calls past retention).
+    """
+    if not isinstance(call_log_ids, Select):
+        call_log_ids = list(call_log_ids)
+    patient_call_ids = list(patient_call_ids)
+    logs = select(CallLog.id).where(or_(CallLog.patient_id.in_(patient_ids), CallLog.id.in_(call_log_ids)))
+    calls = or_(PatientCall.patient_id.in_(patient_ids), PatientCall.id.in_(patient_call_ids))
+    reminders = select(MedicationReminder.id).where(MedicationReminder.patient_id.in_(patient_ids))
+    assignments = or_(NurseCallAssignment.patient_id.in_(patient_ids), NurseCallAssignment.call_log_id.in_(logs))
+    responses = or_(
+        AgentResponse.patient_id.in_(patient_ids),
+        AgentResponse.call_id.in_(select(PatientCall.id).where(calls)),
+        AgentResponse.call_log_id.in_(logs),
+    )
+    reminder_patient = (
+        select(MedicationReminder.patient_id)
+        .where(MedicationReminder.id == MedicationEvent.reminder_id)
+        .scalar_subquery()
+    )
+    assignment_patient = (
+        select(NurseCallAssignment.patient_id)
+        .where(NurseCallAssignment.id == Notification.related_assignment_id)
+        .scalar_subquery()
+    )
+    return [
+        (MedicationEvent, MedicationEvent.reminder_id.in_(reminders), reminder_patient),
+        (MedicationReminder, MedicationReminder.patient_id.in_(patient_ids), MedicationReminder.patient_id),
+        (MedicationSchedule, MedicationSchedule.patient_id.in_(patient_ids), MedicationSchedule.patient_id),
+        (
+            Notification,
+            or_(
+                Notification.related_patient_id.in_(patient_ids),
+                Notification.related_assignment_id.in_(select(NurseCallAssignment.id).where(assignments)),
+            ),
+            func.coalesce(Notification.related_patient_id, assignment_patient),
+        ),
+        (NurseCallAssignment, assignments, NurseCallAssignment.patient_id),
+        (
+            ResponseCorrection,
+            or_(
+                ResponseCorrection.patient_id.in_(patient_ids),
+                ResponseCorrection.call_log_id.in_(logs),
+                ResponseCorrection.agent_response_id.in_(select(AgentResponse.id).where(responses)),
+            ),
+            ResponseCorrection.patient_id,
+        ),
+        (
+            AlertAction,
+            or_(AlertAction.patient_id.in_(patient_ids), AlertAction.call_log_id.in_(logs)),
+            AlertAction.patient_id,
+        ),
+        (
+            ReadmissionRisk,
+            or_(ReadmissionRisk.patient_id.in_(patient_ids), ReadmissionRisk.call_log_id.in_(logs)),
+            ReadmissionRisk.patient_id,
+        ),
+        (AgentResponse, responses, AgentResponse.patient_id),
+        (
+            CallTimeline,
+            or_(CallTimeline.patient_id.in_(patient_ids), CallTimeline.call_log_id.in_(logs)),
+            CallTimeline.patient_id,
+        ),
+        (CallLog, CallLog.id.in_(logs), CallLog.patient_id),
+        (PatientCall, calls, PatientCall.patient_id),
+        (CareAssignment, CareAssignment.patient_id.in_(patient_ids), CareAssignment.patient_id),
+        (Intervention, Intervention.patient_id.in_(patient_ids), Intervention.patient_id),
+        (PatientProfile, PatientProfile.patient_id.in_(patient_ids), PatientProfile.patient_id),
+        (Patient, Patient.id.in_(patient_ids), Patient.id),
+    ]
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def delete_in_batches(db, model, condition, patient_expr, batch_size: int, archive: bool) -> int:
+    """Delete rows matching `condition` batch_size at a time, archiving each batch first if asked. Commits per batch."""
+    table = model.__table__
+    pk = table.primary_key.columns.values()[0]
+    deleted = 0
+    while True:
+        if archive:
+            rows = db.execute(
+                select(*table.columns, patient_expr.label("archive_patient_id"))
+                .where(condition)
+                .order_by(pk)
+                .limit(batch_size)
+            ).mappings().all()
+            ids = [row[pk.name] for row in rows]
+            if rows:
+                db.execute(ArchivedRow.__table__.insert(), [
+                    {
+                        "table_name": table.name,
+                        "row_id": row[pk.name],
+                        "patient_id": row["archive_patient_id"],
+                        "payload": {col.name: _jsonable(row[col.name]) for col in table.columns},
+                    }
+                    for row in rows
+                ])
+        else:
+            ids = list(db.execute(select(pk).where(condition).order_by(pk).limit(batch_size)).scalars())
+        if not ids:
+            break
+        db.execute(table.delete().where(pk.in_(ids)))
+        db.commit()
+        deleted += len(ids)
+        if len(ids) < batch_size:
+            break
+    return deleted
+
+
+def delete_patients(
+    db,
+    patient_ids,
+    archive: bool = PATIENT_ARCHIVE_ON_DELETE,
+    batch_size: int = PATIENT_DELETE_BATCH_SIZE,
+    dry_run: bool = False,
+    call_log_ids=(),
+    patient_call_ids=(),
+) -> dict:
+    """Delete (optionally archiving) the patients and all their rows. Commits per chunk."""
+    plan = deletion_plan(patient_ids, call_log_ids, patient_call_ids)
+    summary = {"dry_run": dry_run, "archive": archive, "deleted": {}}
+    if dry_run:
+        for model, condition, _ in plan:
+            summary["deleted"][model.__tablename__] = db.query(func.count()).select_from(model).filter(condition).scalar()
+        return summary
+
+    try:
+        db.query(Patient).filter(Patient.id.in_(patient_ids)).update({Patient.active: False}, synchronize_session=False)
+        db.commit()
+        for model, condition, patient_expr in plan:
+            summary["deleted"][model.__tablename__] = delete_in_batches(db, model, condition, patient_expr, batch_size, archive)
+    except Exception:
+        db.rollback()
+        raise
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Delete patients and all of their records.")
+    parser.add_argument("patient_ids", type=int, nargs="+")
+    parser.add_argument("--no-archive", action="store_true", help="Delete without copying rows to archived_rows.")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the rows that would be removed.")
+    parser.add_argument("--batch-size", type=int, default=PATIENT_DELETE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        summary = delete_patients(
+            db,
+            args.patient_ids,
+            archive=not args.no_archive,
+            batch_size=args.batch_size,
+            dry_run=args.dry_run,
+        )
+    finally:
+        db.close()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
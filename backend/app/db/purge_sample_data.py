@@ -7,19 +7,15 @@ from typing import Iterable
 from sqlalchemy import or_
 
 from app.db.models import (
-    AgentResponse,
     AuditEvent,
     CallLog,
-    CareAssignment,
-    Intervention,
-    MedicationEvent,
     MedicationReminder,
     Patient,
     PatientCall,
-    ReadmissionRisk,
     SessionToken,
     User,
 )
+from app.db.patient_archive import delete_patients
 from app.db.session import SessionLocal
 
 
@@ -91,9 +87,8 @@ def collect_demo_ids(db) -> tuple[set[int], set[int], set[int], set[int], set[in
     )
 
     if patient_ids:
-        str_ids = [str(pid) for pid in patient_ids]
         patient_call_ids |= _to_int_set(
-            row.id for row in db.query(PatientCall.id).filter(PatientCall.patient_id.in_(str_ids))
+            row.id for row in db.query(PatientCall.id).filter(PatientCall.patient_id.in_(patient_ids))
         )
 
     reminder_ids = _to_int_set(
@@ -128,95 +123,15 @@ def purge_sample_data(dry_run: bool = False) -> dict:
         if dry_run:
             return summary
 
+        summary["deleted"] = delete_patients(
+            db,
+            sorted(patient_ids),
+            archive=False,
+            call_log_ids=sorted(call_log_ids),
+            patient_call_ids=sorted(patient_call_ids),
+        )["deleted"]
         deleted = summary["deleted"]
 
-        if reminder_ids:
-            deleted["medication_events"] = (
-                db.query(MedicationEvent)
-                .filter(MedicationEvent.reminder_id.in_(reminder_ids))
-                .delete(synchronize_session=False)
-            )
-            deleted["medication_reminders"] = (
-                db.query(MedicationReminder)
-                .filter(MedicationReminder.id.in_(reminder_ids))
-                .delete(synchronize_session=False)
-            )
-        else:
-            deleted["medication_events"] = 0
-            deleted["medication_reminders"] = 0
-
-        if patient_ids:
-            deleted["care_assignments"] = (
-                db.query(CareAssignment)
-                .filter(CareAssignment.patient_id.in_(patient_ids))
-                .delete(synchronize_session=False)
-            )
-            deleted["interventions"] = (
-                db.query(Intervention)
-                .filter(Intervention.patient_id.in_(patient_ids))
-                .delete(synchronize_session=False)
-            )
-        else:
-            deleted["care_assignments"] = 0
-            deleted["interventions"] = 0
-
-        if call_log_ids or patient_ids:
-            risk_filters = []
-            if call_log_ids:
-                risk_filters.append(ReadmissionRisk.call_log_id.in_(call_log_ids))
-            if patient_ids:
-                risk_filters.append(ReadmissionRisk.patient_id.in_(patient_ids))
-            deleted["readmission_risks"] = (
-                db.query(ReadmissionRisk)
-                .filter(or_(*risk_filters))
-                .delete(synchronize_session=False)
-            )
-        else:
-            deleted["readmission_risks"] = 0
-
-        if patient_call_ids:
-            deleted["agent_responses"] = (
-                db.query(AgentResponse)
-                .filter(AgentResponse.call_id.in_(patient_call_ids))
-                .delete(synchronize_session=False)
-            )
-        else:
-            deleted["agent_responses"] = 0
-
-        if call_log_ids:
-            deleted["call_logs"] = (
-                db.query(CallLog)
-                .filter(CallLog.id.in_(call_log_ids))
-                .delete(synchronize_session=False)
-            )
-        else:
-            deleted["call_logs"] = 0
-
-        if patient_call_ids:
-            deleted["patient_calls"] = (
-                db.query(PatientCall)
-                .filter(PatientCall.id.in_(patient_call_ids))
-                .delete(synchronize_session=False)
-            )
-        else:
-            deleted["patient_calls"] = 0
-
-        if patient_ids:
-            str_ids = [str(pid) for pid in patient_ids]
-            deleted["orphan_patient_calls"] = (
-                db.query(PatientCall)
-                .filter(PatientCall.patient_id.in_(str_ids))
-                .delete(synchronize_session=False)
-            )
-            deleted["patients"] = (
-                db.query(Patient)
-                .filter(Patient.id.in_(patient_ids))
-                .delete(synchronize_session=False)
-            )
-        else:
-            deleted["orphan_patient_calls"] = 0
-            deleted["patients"] = 0
-
         if demo_user_ids:
             deleted["session_tokens"] = (
                 db.query(SessionToken)
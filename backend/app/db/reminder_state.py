@@ -0,0 +1,131 @@
+"""
+Medication reminder state machine.
+
+    scheduled --(due: SMS sent)--> sms_sent --(call delay: IVR call)--> call_placed
+    call_placed --(keypad 1)--> taken     --(keypad 2)--> not_taken
+                --(no input, call timeout)--> no_response
+                --(busy / no-answer / failed)--> missed
+    scheduled <--> paused
+
+A reminder with a next automatic step carries next_action_at, the time the
+scheduler should act on it (NULL once nothing is left to do). The scheduler
+reads only rows with next_action_at <= now, from an index, with the patient's
+phone number joined in.
+
+Every transition is a compare-and-set UPDATE (... WHERE status IN <allowed
+sources>), so the scheduler, the IVR keypad callback and the Twilio status
+callback racing on one reminder cannot undo each other: whichever commits
+second matches no row and does nothing. Nurse and staff corrections pass
+force=True and apply from any state.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, update
+
+from app.config import MEDICATION_CALL_DELAY_MINUTES, MEDICATION_CALL_TIMEOUT_MINUTES, MEDICATION_DUE_BATCH
+from app.db.models import MedicationEvent, MedicationReminder, Patient
+
+
+SCHEDULED = "scheduled"
+PAUSED = "paused"
+SMS_SENT = "sms_sent"
+CALL_PLACED = "call_placed"
+TAKEN = "taken"
+NOT_TAKEN = "not_taken"
+MISSED = "missed"
+NO_RESPONSE = "no_response"
+
+PENDING = (SCHEDULED, SMS_SENT, CALL_PLACED)
+FINAL = (TAKEN, NOT_TAKEN, MISSED, NO_RESPONSE)
+STATUSES = (*PENDING, PAUSED, *FINAL)
+
+# target status -> statuses it may be reached from without force=True
+ALLOWED_FROM = {
+    SCHEDULED: {PAUSED},
+    PAUSED: {SCHEDULED},
+    SMS_SENT: {SCHEDULED},
+    CALL_PLACED: {SCHEDULED, SMS_SENT},
+    TAKEN: set(PENDING),
+    NOT_TAKEN: set(PENDING),
+    MISSED: set(PENDING),
+    NO_RESPONSE: set(PENDING),
+}
+
+
+def next_action_at(status: str, scheduled_for=None, sms_sent_at=None, call_placed_at=None):
+    """When the scheduler should next act on a reminder in `status` (None: never)."""
+    if status == SCHEDULED:
+        return scheduled_for
+    if status == SMS_SENT and sms_sent_at is not None:
+        return sms_sent_at + timedelta(minutes=MEDICATION_CALL_DELAY_MINUTES)
+    if status == CALL_PLACED and call_placed_at is not None and MEDICATION_CALL_TIMEOUT_MINUTES > 0:
+        return call_placed_at + timedelta(minutes=MEDICATION_CALL_TIMEOUT_MINUTES)
+    return None
+
+
+def advance(db, reminder_ids, to_status: str, now: datetime | None = None, force: bool = False, **values) -> list[int]:
+    """
+    Move reminders to `to_status` in one compare-and-set UPDATE ... RETURNING and
+    return the ids that moved; the others were already elsewhere. Extra column
+    values (sms_sent_at, call_placed_at, call_sid) are written with the status.
+    Does not commit.
+    """
+    if to_status not in STATUSES:
+        raise ValueError(f"Unknown reminder status {to_status!r}")
+    reminder_ids = list(reminder_ids)
+    if not reminder_ids:
+        return []
+    now = now or datetime.now(timezone.utc)
+    if to_status == SMS_SENT:
+        values.setdefault("sms_sent_at", now)
+    if to_status == CALL_PLACED:
+        values.setdefault("call_placed_at", now)
+    if to_status == SCHEDULED:
+        # Back from paused: due again at its own time.
+        values["next_action_at"] = MedicationReminder.scheduled_for
+    else:
+        values["next_action_at"] = next_action_at(
+            to_status, sms_sent_at=values.get("sms_sent_at"), call_placed_at=values.get("call_placed_at")
+        )
+
+    stmt = update(MedicationReminder).where(MedicationReminder.id.in_(reminder_ids))
+    if not force:
+        stmt = stmt.where(MedicationReminder.status.in_(ALLOWED_FROM[to_status]))
+    stmt = stmt.values(status=to_status, **values).returning(MedicationReminder.id)
+    return list(db.scalars(stmt, execution_options={"synchronize_session": "fetch"}))
+
+
+def transition(db, reminder_id: int, to_status: str, now: datetime | None = None, force: bool = False, **values) -> bool:
+    """advance() for one reminder; True when it moved. Does not commit."""
+    return bool(advance(db, [reminder_id], to_status, now=now, force=force, **values))
+
+
+def due_reminders(db, status: str, now: datetime, limit: int = MEDICATION_DUE_BATCH) -> list:
+    """
+    Rows (id, medication_name, dose, phone_number) of reminders in `status` whose
+    next step is due, oldest first; phone_number is None for a missing patient.
+    Plain columns rather than ORM instances, so nothing is lazily reloaded after
+    the claim commits.
+    """
+    return (
+        db.query(
+            MedicationReminder.id,
+            MedicationReminder.medication_name,
+            MedicationReminder.dose,
+            Patient.phone_number,
+        )
+        .outerjoin(Patient, Patient.id == MedicationReminder.patient_id)
+        .filter(MedicationReminder.next_action_at <= now)
+        .filter(MedicationReminder.status == status)
+        .order_by(MedicationReminder.next_action_at.asc(), MedicationReminder.id.asc())
+        .limit(limit)
+        .all()
+    )
+
+
+def add_events(db, events: list[dict]) -> None:
+    """Insert MedicationEvent rows (column dicts) in one executemany. Does not commit."""
+    if events:
+        db.execute(insert(MedicationEvent), events)
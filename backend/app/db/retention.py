@@ -0,0 +1,256 @@
+"""
+Retention for the tables that grow with every call.
+
+Each policy keeps RETENTION_<TABLE>_DAYS of rows; 0, the default, keeps them
+forever, so every table is opt-in. Older rows are deleted oldest first in
+batches of RETENTION_BATCH_SIZE, one commit per batch, after being copied to
+archived_rows when RETENTION_ARCHIVE is on. An
+expired call log takes its responses, timeline, risks, corrections, alert
+actions and nurse assignments with it (same plan as patient offboarding, see
+app/db/patient_archive.py). Calls still scheduled or in progress are never
+touched.
+
+flow_log is the bulk of a call_logs row and is only read while a call is
+reviewed, so when FLOW_LOG_COMPACT_DAYS is set, older calls keep just their
+last FLOW_LOG_KEEP_EVENTS events, in call_logs and in the call's timeline
+entry; the full log is archived first.
+
+Historical report days come from daily_rollups, so run
+`python -m app.reports.rollups --backfill` once before enabling call log
+retention. retention_loop() runs a pass every RETENTION_INTERVAL_SECONDS, the
+first one an interval after app startup; the CLI runs one on demand:
+
+    python -m app.db.retention [--dry-run] [--only audit_events notifications]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, or_, select
+
+from app.config import (
+    FLOW_LOG_COMPACT_DAYS,
+    FLOW_LOG_KEEP_EVENTS,
+    RETENTION_AGENT_RESPONSE_DAYS,
+    RETENTION_ARCHIVE,
+    RETENTION_AUDIT_EVENT_DAYS,
+    RETENTION_BATCH_SIZE,
+    RETENTION_CALL_LOG_DAYS,
+    RETENTION_INTERVAL_SECONDS,
+    RETENTION_MEDICATION_EVENT_DAYS,
+    RETENTION_NOTIFICATION_DAYS,
+)
+from app.db.call_timeline import OPEN_STATUSES
+from app.db.models import (
+    AgentResponse,
+    AlertAction,
+    ArchivedRow,
+    AuditEvent,
+    CallLog,
+    CallTimeline,
+    MedicationEvent,
+    MedicationReminder,
+    Notification,
+    NurseCallAssignment,
+    ReadmissionRisk,
+    ResponseCorrection,
+)
+from app.db.patient_archive import deletion_plan, delete_in_batches
+from app.db.session import SessionLocal
+
+
+CALL_LOG_TABLES = {
+    Notification, NurseCallAssignment, ResponseCorrection, AlertAction,
+    ReadmissionRisk, AgentResponse, CallTimeline, CallLog,
+}
+FLOW_LOG_ARCHIVE_TABLE = "call_logs.flow_log"
+
+
+def _closed_call():
+    return or_(CallLog.status.is_(None), CallLog.status.notin_(OPEN_STATUSES))
+
+
+def _call_log_plan(cutoff: datetime) -> list[tuple]:
+    expired = select(CallLog.id).where(CallLog.created_at < cutoff, _closed_call())
+    return [step for step in deletion_plan([], call_log_ids=expired) if step[0] in CALL_LOG_TABLES]
+
+
+def _agent_response_plan(cutoff: datetime) -> list[tuple]:
+    expired = select(AgentResponse.id).where(AgentResponse.created_at < cutoff)
+    return [
+        (ResponseCorrection, ResponseCorrection.agent_response_id.in_(expired), ResponseCorrection.patient_id),
+        (AgentResponse, AgentResponse.created_at < cutoff, AgentResponse.patient_id),
+    ]
+
+
+def _medication_event_plan(cutoff: datetime) -> list[tuple]:
+    reminder_patient = (
+        select(MedicationReminder.patient_id)
+        .where(MedicationReminder.id == MedicationEvent.reminder_id)
+        .scalar_subquery()
+    )
+    return [(MedicationEvent, MedicationEvent.created_at < cutoff, reminder_patient)]
+
+
+def _audit_event_plan(cutoff: datetime) -> list[tuple]:
+    return [(AuditEvent, AuditEvent.created_at < cutoff, AuditEvent.patient_id)]
+
+
+def _notification_plan(cutoff: datetime) -> list[tuple]:
+    return [(Notification, Notification.created_at < cutoff, Notification.related_patient_id)]
+
+
+# name -> (days kept, plan builder)
+POLICIES = {
+    "call_logs": (RETENTION_CALL_LOG_DAYS, _call_log_plan),
+    "agent_responses": (RETENTION_AGENT_RESPONSE_DAYS, _agent_response_plan),
+    "medication_events": (RETENTION_MEDICATION_EVENT_DAYS, _medication_event_plan),
+    "audit_events": (RETENTION_AUDIT_EVENT_DAYS, _audit_event_plan),
+    "notifications": (RETENTION_NOTIFICATION_DAYS, _notification_plan),
+}
+
+
+def compact_flow_log(events: list, keep: int) -> list:
+    """The last `keep` events, behind a marker saying how many were dropped."""
+    dropped = len(events) - keep
+    marker = {"ts": events[0].get("ts") if isinstance(events[0], dict) else None,
+              "message": f"[{dropped} earlier events removed by retention]"}
+    return [marker] + (events[-keep:] if keep else [])
+
+
+def compact_flow_logs(
+    db,
+    now: datetime,
+    days: int = FLOW_LOG_COMPACT_DAYS,
+    keep: int = FLOW_LOG_KEEP_EVENTS,
+    batch_size: int = RETENTION_BATCH_SIZE,
+    archive: bool = RETENTION_ARCHIVE,
+    dry_run: bool = False,
+) -> dict:
+    if days <= 0:
+        return {"days": 0, "calls": 0, "compacted": 0}
+    pending = (
+        (CallLog.created_at < now - timedelta(days=days))
+        & CallLog.flow_log_compacted_at.is_(None)
+        & _closed_call()
+    )
+    if dry_run:
+        return {"days": days, "calls": db.query(func.count(CallLog.id)).filter(pending).scalar(), "compacted": 0}
+
+    calls = compacted = 0
+    while True:
+        logs = db.query(CallLog).filter(pending).order_by(CallLog.id.asc()).limit(batch_size).all()
+        if not logs:
+            break
+        timelines = {
+            row.call_log_id: row
+            for row in db.query(CallTimeline).filter(CallTimeline.call_log_id.in_([log.id for log in logs]))
+        }
+        archived = []
+        for log in logs:
+            events = log.flow_log
+            if isinstance(events, list) and len(events) > keep + 1:
+                if archive:
+                    archived.append({
+                        "table_name": FLOW_LOG_ARCHIVE_TABLE,
+                        "row_id": log.id,
+                        "patient_id": log.patient_id,
+                        "payload": {"flow_log": events},
+                    })
+                log.flow_log = compact_flow_log(events, keep)
+                timeline = timelines.get(log.id)
+                if timeline is not None and isinstance(timeline.entry, dict):
+                    timeline.entry = {**timeline.entry, "flow_log": log.flow_log}
+                compacted += 1
+            log.flow_log_compacted_at = now
+        if archived:
+            db.execute(ArchivedRow.__table__.insert(), archived)
+        db.commit()
+        db.expunge_all()
+        calls += len(logs)
+        if len(logs) < batch_size:
+            break
+    return {"days": days, "calls": calls, "compacted": compacted}
+
+
+def run_retention(
+    db,
+    now: datetime | None = None,
+    only: list[str] | None = None,
+    batch_size: int = RETENTION_BATCH_SIZE,
+    archive: bool = RETENTION_ARCHIVE,
+    dry_run: bool = False,
+) -> dict:
+    now = now or datetime.now(timezone.utc)
+    summary = {"dry_run": dry_run, "archive": archive, "policies": {}}
+    for name, (days, build_plan) in POLICIES.items():
+        if only and name not in only:
+            continue
+        if days <= 0:
+            summary["policies"][name] = {"days": 0, "deleted": {}}
+            continue
+        cutoff = now - timedelta(days=days)
+        deleted = {}
+        for model, condition, patient_expr in build_plan(cutoff):
+            if dry_run:
+                count = db.query(func.count()).select_from(model).filter(condition).scalar()
+            else:
+                count = delete_in_batches(db, model, condition, patient_expr, batch_size, archive)
+            if count:
+                deleted[model.__tablename__] = count
+        summary["policies"][name] = {"days": days, "cutoff": cutoff.isoformat(), "deleted": deleted}
+    if not only or "flow_log" in only:
+        summary["flow_log"] = compact_flow_logs(db, now, batch_size=batch_size, archive=archive, dry_run=dry_run)
+    return summary
+
+
+def _run_once() -> dict:
+    db = SessionLocal()
+    try:
+        return run_retention(db)
+    finally:
+        db.close()
+
+
+async def retention_loop():
+    if RETENTION_INTERVAL_SECONDS <= 0:
+        return
+    while True:
+        # Sleep first: a deploy or restart never deletes anything at boot.
+        await asyncio.sleep(RETENTION_INTERVAL_SECONDS)
+        try:
+            summary = await asyncio.to_thread(_run_once)
+            removed = {name: policy["deleted"] for name, policy in summary["policies"].items() if policy["deleted"]}
+            if removed or summary["flow_log"]["compacted"]:
+                print(f"[retention] deleted {removed}; compacted {summary['flow_log']['compacted']} flow logs")
+        except Exception as e:
+            print(f"[retention] failed: {e}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archive and delete rows past their retention period; compact old flow logs.")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the rows that would be removed.")
+    parser.add_argument("--only", nargs="+", choices=[*POLICIES, "flow_log"], default=None)
+    parser.add_argument("--no-archive", action="store_true", help="Delete without copying rows to archived_rows.")
+    parser.add_argument("--batch-size", type=int, default=RETENTION_BATCH_SIZE)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        summary = run_retention(
+            db,
+            only=args.only,
+            batch_size=args.batch_size,
+            archive=RETENTION_ARCHIVE and not args.no_archive,
+            dry_run=args.dry_run,
+        )
+    finally:
+        db.close()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -128,7 +128,7 @@ def seed_dummy_data(days: int = 15, patients: int = 10, seed: int = 42) -> dict:
                     ended_at = started_at + timedelta(minutes=rng.randint(2, 6))
 
                     patient_call = PatientCall(
-                        patient_id=str(patient.id),
+                        patient_id=patient.id,
                         diagnosis=patient.disease_track,
                         language="en",
                         consent_given=True,
@@ -146,6 +146,7 @@ def seed_dummy_data(days: int = 15, patients: int = 10, seed: int = 42) -> dict:
                         responses.append(
                             AgentResponse(
                                 call_id=patient_call.id,
+                                patient_id=patient.id,
                                 intent_id=intent_id,
                                 raw_text=raw_text,
                                 structured_data=structured,
@@ -181,6 +182,8 @@ def seed_dummy_data(days: int = 15, patients: int = 10, seed: int = 42) -> dict:
                     )
                     db.add(log)
                     db.flush()
+                    for response in responses:
+                        response.call_log_id = log.id
 
                     if answered:
                         risk = ReadmissionRisk(
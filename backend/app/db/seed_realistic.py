@@ -3,7 +3,7 @@ from datetime import datetime, timedelta, timezone
 from sqlalchemy.orm import Session
 from app.db.session import SessionLocal
 from app.db.models import (
-    Patient, CallLog, ReadmissionRisk, PatientCall, AgentResponse,
+    Patient, CallLog, CallTimeline, ReadmissionRisk, PatientCall, AgentResponse,
     User, AuditEvent, MedicationReminder, MedicationEvent, Intervention, AlertAction,
     ResponseCorrection, NurseCallAssignment, Notification
 )
@@ -22,6 +22,7 @@ def seed_realistic_data():
         db.query(MedicationReminder).delete()
         db.query(ReadmissionRisk).delete()
         db.query(NurseCallAssignment).delete()
+        db.query(CallTimeline).delete()
         db.query(CallLog).delete() # Delete child first
         db.query(AgentResponse).delete()
         db.query(PatientCall).delete() # Parent of CallLog (via patient_call_id) and AgentResponse
@@ -185,7 +186,7 @@ def seed_realistic_data():
 
                 # Create Patient Call and Agent Responses
                 pcall = PatientCall(
-                    patient_id=str(patient.id),
+                    patient_id=patient.id,
                     diagnosis=s["disease"],
                     created_at=log.started_at
                 )
@@ -211,6 +212,8 @@ def seed_realistic_data():
 
                     resp = AgentResponse(
                         call_id=pcall.id,
+                        patient_id=patient.id,
+                        call_log_id=log.id,
                         intent_id=intent,
                         raw_text=text,
                         structured_data={"trend": "worse" if risk_score > 0.7 else "same"},
@@ -1,11 +1,127 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
-from app.config import DATABASE_URL
+from app.config import (
+    DATABASE_URL,
+    ASYNC_DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE_SECONDS,
+    DB_POOL_TIMEOUT_SECONDS,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_SYNCHRONOUS,
+    SQLITE_BUSY_TIMEOUT_MS,
+)
+from app.utils.metrics import instrument_engine
 
 
-connect_args = {}
-if DATABASE_URL.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args, pool_pre_ping=True)
+
+def _is_memory_sqlite(url: str) -> bool:
+    return make_url(url).database in (None, "", ":memory:")
+
+
+def _sqlite_pragmas(dbapi_conn, url: str):
+    # WAL lets the scheduler, media sockets and request threads read while one of
+    # them writes; busy_timeout makes writers wait for the lock instead of failing
+    # with "database is locked".
+    cursor = dbapi_conn.cursor()
+    try:
+        if SQLITE_JOURNAL_MODE and not _is_memory_sqlite(url):
+            cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT_MS)}")
+        if SQLITE_SYNCHRONOUS:
+            cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    finally:
+        cursor.close()
+
+
+def engine_options(url: str) -> dict:
+    """create_engine() keyword arguments for `url` (shared by the sync and async engines)."""
+    if _is_sqlite(url):
+        # SQLite pools one file handle per thread/connection; the pool size knobs do not apply.
+        return {
+            "connect_args": {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+            "pool_pre_ping": True,
+        }
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_recycle": DB_POOL_RECYCLE_SECONDS,
+        "pool_timeout": DB_POOL_TIMEOUT_SECONDS,
+        "pool_pre_ping": True,
+    }
+
+
+def make_engine(url: str = DATABASE_URL, **overrides):
+    options = {**engine_options(url), **overrides}
+    new_engine = create_engine(url, **options)
+    if _is_sqlite(url):
+        event.listen(new_engine, "connect", lambda dbapi_conn, record: _sqlite_pragmas(dbapi_conn, url))
+    instrument_engine(new_engine)
+    return new_engine
+
+
+engine = make_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+# Optional async engine for async routes. Needs an async driver (asyncpg for
+# Postgres, aiosqlite for SQLite); it is only created on first use, so the sync
+# app runs without them.
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+_async_engine = None
+_async_sessionmaker = None
+
+
+def async_database_url(url: str = DATABASE_URL) -> str:
+    if ASYNC_DATABASE_URL:
+        return ASYNC_DATABASE_URL
+    parsed = make_url(url)
+    driver = _ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise RuntimeError(f"No async driver known for {parsed.drivername}; set ASYNC_DATABASE_URL")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def get_async_engine():
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        try:
+            from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        except ImportError as e:
+            raise RuntimeError(f"Async database support unavailable: {e}")
+        url = async_database_url()
+        options = engine_options(url)
+        if _is_sqlite(url):
+            options["connect_args"] = {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+        _async_engine = create_async_engine(url, **options)
+        if _is_sqlite(url):
+            event.listen(
+                _async_engine.sync_engine, "connect",
+                lambda dbapi_conn, record: _sqlite_pragmas(dbapi_conn, url)
+            )
+        instrument_engine(_async_engine.sync_engine)
+        _async_sessionmaker = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+
+async def get_async_db():
+    """FastAPI dependency yielding an AsyncSession."""
+    get_async_engine()
+    async with _async_sessionmaker() as db:
+        yield db
+
+
+async def dispose_async_engine():
+    global _async_engine, _async_sessionmaker
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_sessionmaker = None
@@ -0,0 +1,85 @@
+"""
+Delete expired session tokens and password-reset tokens.
+
+Only logout ever removed a session row, so session_tokens grew with every login.
+token_gc_loop() runs from app startup every TOKEN_GC_INTERVAL_SECONDS and deletes
+expired rows in batches of TOKEN_GC_BATCH_SIZE, committing between batches so a
+large first run never holds a long lock on the auth tables.
+
+    python -m app.db.token_gc --dry-run
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+from datetime import datetime, timezone
+
+from app.config import TOKEN_GC_BATCH_SIZE, TOKEN_GC_INTERVAL_SECONDS
+from app.db.models import PasswordReset, SessionToken
+from app.db.session import SessionLocal
+
+
+TOKEN_MODELS = (SessionToken, PasswordReset)
+
+
+def _purge(db, model, now: datetime, batch_size: int, dry_run: bool) -> int:
+    expired = model.expires_at < now
+    if dry_run:
+        return db.query(model).filter(expired).count()
+    deleted = 0
+    while True:
+        ids = [row.id for row in db.query(model.id).filter(expired).order_by(model.id.asc()).limit(batch_size)]
+        if not ids:
+            break
+        db.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        deleted += len(ids)
+        if len(ids) < batch_size:
+            break
+    return deleted
+
+
+def purge_expired_tokens(db, batch_size: int = TOKEN_GC_BATCH_SIZE, dry_run: bool = False) -> dict:
+    now = datetime.now(timezone.utc)
+    return {
+        model.__tablename__: _purge(db, model, now, batch_size, dry_run)
+        for model in TOKEN_MODELS
+    }
+
+
+def _run_once() -> dict:
+    db = SessionLocal()
+    try:
+        return purge_expired_tokens(db)
+    finally:
+        db.close()
+
+
+async def token_gc_loop():
+    while True:
+        try:
+            summary = await asyncio.to_thread(_run_once)
+            if any(summary.values()):
+                print(f"[token_gc] deleted expired tokens: {summary}")
+        except Exception as e:
+            print(f"[token_gc] failed: {e}")
+        await asyncio.sleep(TOKEN_GC_INTERVAL_SECONDS)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Delete expired session and password-reset tokens.")
+    parser.add_argument("--dry-run", action="store_true", help="Only count expired rows.")
+    parser.add_argument("--batch-size", type=int, default=TOKEN_GC_BATCH_SIZE)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        summary = purge_expired_tokens(db, batch_size=args.batch_size, dry_run=args.dry_run)
+    finally:
+        db.close()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
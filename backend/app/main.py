@@ -15,8 +15,15 @@ from app.api.nurse import router as nurse_router
 from app.api.doctor import router as doctor_router
 from app.api.monitoring import router as monitoring_router
 from app.db.init_db import init_db
+from app.db.session import dispose_async_engine
 from app.telephony.scheduler_async import scheduler_loop
+from app.db.token_gc import token_gc_loop
+from app.db.retention import retention_loop
+from app.utils.metrics import HTTP_LATENCY
+from app.utils import access_log
+from app.auth.security import shutdown_hash_pool
 import asyncio
+import time
 
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
@@ -35,14 +42,21 @@ PROJECT_ROOT = Path(__file__).resolve().parents[2]
 FRONTEND_DIR = PROJECT_ROOT / "frontend"
 
 @app.middleware("http")
-async def log_requests(request: Request, call_next):
-    body = await request.body()
-    print(f"DEBUG: Request {request.method} {request.url}")
-    print(f"DEBUG: Headers: {request.headers}")
-    print(f"DEBUG: Body: {body.decode('utf-8', errors='ignore')}")
-    response = await call_next(request)
-    print(f"DEBUG: Response status: {response.status_code}")
-    return response
+async def observe_request(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    body = await access_log.debug_body(request)
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        # Label by route template (/patients/{patient_id}) to keep series bounded.
+        route = request.scope.get("route")
+        path = getattr(route, "path", None) or "unmatched"
+        HTTP_LATENCY.observe(elapsed, request.method, path, status)
+        access_log.log_request(request, status, elapsed * 1000, path, body)
 
 app.add_middleware(
     CORSMiddleware,
@@ -122,4 +136,14 @@ def on_startup():
     import sys
     print("DEBUG: sys.path =", sys.path)
     init_db()
+    access_log.start()
     asyncio.get_event_loop().create_task(scheduler_loop())
+    asyncio.get_event_loop().create_task(token_gc_loop())
+    asyncio.get_event_loop().create_task(retention_loop())
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    access_log.stop()
+    shutdown_hash_pool()
+    await dispose_async_engine()
@@ -0,0 +1 @@
+# Realtime (SSE) package
@@ -0,0 +1,18 @@
+"""
+Doctor high-alert views: the cached REST list (/doctor/high-alerts) and the
+"high_alerts" stream. Anything that can change which calls are high alerts
+(a new risk score, a missed call flagged high, an override, a doctor action,
+a patient deletion) calls notify_high_alerts(), so the two never disagree for
+longer than a stream refresh.
+"""
+from app.config import HIGH_ALERTS_CACHE_SECONDS
+from app.realtime.hub import hub
+from app.utils.cache import TTLCache
+
+HIGH_ALERTS_CACHE = TTLCache(HIGH_ALERTS_CACHE_SECONDS)
+
+
+def notify_high_alerts():
+    """Drop cached high-alert lists and wake the high_alerts stream. Thread-safe."""
+    HIGH_ALERTS_CACHE.invalidate()
+    hub.notify("high_alerts")
@@ -0,0 +1,235 @@
+"""
+In-process pub/sub hub for the dashboard SSE streams.
+
+Write paths call hub.notify(topic, key) (safe from request threads, the
+scheduler and the media socket). Each (topic, key) with at least one viewer has
+a single producer task: on notification it runs the registered snapshot query
+once in a worker thread, diffs it against the previous snapshot and fans the
+resulting upsert/delete events out to every subscriber queue. DB load therefore
+scales with writes, not with the number of open dashboards.
+
+Events carry monotonically increasing ids and the last few are kept per topic,
+so a client reconnecting with Last-Event-ID only receives what it missed.
+"""
+import asyncio
+import itertools
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Hashable
+
+from app.db.session import SessionLocal
+
+
+DEBOUNCE_SECONDS = 0.25       # coalesce bursts of writes into one refresh
+FALLBACK_REFRESH_SECONDS = 60  # catch writes made outside this process
+KEEPALIVE_SECONDS = 15
+SUBSCRIBER_QUEUE_SIZE = 100
+EVENT_BUFFER_SIZE = 256        # events kept per topic for Last-Event-ID resume
+RESUME_WINDOW_SECONDS = 120    # keep an idle topic around for reconnecting clients
+
+SNAPSHOT = "snapshot"
+UPSERT = "upsert"
+DELETE = "delete"
+
+Producer = Callable[[Any, Hashable], list[dict]]
+Event = tuple[int, str, list]  # (event_id, kind, rows or deleted keys)
+
+# Seeded from the clock so ids keep increasing across restarts; a client holding
+# an id from a previous process simply gets a fresh snapshot.
+_event_ids = itertools.count(int(time.time() * 1000))
+_RESYNC = object()
+
+
+class _Topic:
+    def __init__(self, hub: "Hub", name: str, key: Hashable):
+        self.hub = hub
+        self.name = name
+        self.key = key
+        self.key_field = hub.key_fields[name]
+        self.subscribers: set[asyncio.Queue] = set()
+        self.snapshot: list[dict] | None = None
+        self.last_event_id = 0
+        self.events: deque[Event] = deque(maxlen=EVENT_BUFFER_SIZE)
+        self.evicted_upto = 0         # ids at or below this are no longer replayable
+        self.dirty = asyncio.Event()
+        self.lock = asyncio.Lock()
+        self.task: asyncio.Task | None = None
+        self.expiry: asyncio.TimerHandle | None = None
+
+    def _produce(self) -> list[dict]:
+        producer = self.hub.producers[self.name]
+        db = SessionLocal()
+        try:
+            return producer(db, self.key)
+        finally:
+            db.close()
+
+    def _diff(self, rows: list[dict]) -> tuple[list[dict], list]:
+        before = {row[self.key_field]: row for row in self.snapshot or []}
+        after_keys = set()
+        upserts = []
+        for row in rows:
+            row_key = row[self.key_field]
+            after_keys.add(row_key)
+            if before.get(row_key) != row:
+                upserts.append(row)
+        deletes = [row_key for row_key in before if row_key not in after_keys]
+        return upserts, deletes
+
+    def _append(self, kind: str, payload: list) -> Event:
+        if len(self.events) == self.events.maxlen:
+            self.evicted_upto = self.events[0][0]
+        event = (next(_event_ids), kind, payload)
+        self.events.append(event)
+        self.last_event_id = event[0]
+        return event
+
+    async def refresh(self) -> bool:
+        async with self.lock:
+            try:
+                rows = await asyncio.to_thread(self._produce)
+            except Exception as e:
+                print(f"[hub] {self.name}:{self.key} refresh failed: {e}")
+                return False
+            if self.snapshot is None:
+                self.snapshot = rows
+                self.last_event_id = self.evicted_upto = next(_event_ids)
+                return True
+            upserts, deletes = self._diff(rows)
+            self.snapshot = rows
+            events = []
+            if upserts:
+                events.append(self._append(UPSERT, upserts))
+            if deletes:
+                events.append(self._append(DELETE, deletes))
+        for event in events:
+            self.hub._publish(self, event)
+        return bool(events)
+
+    def can_resume(self, last_event_id: int) -> bool:
+        if self.snapshot is None:
+            return False
+        return self.evicted_upto <= last_event_id <= self.last_event_id
+
+    def backlog(self, last_event_id: int) -> list[Event]:
+        return [event for event in self.events if event[0] > last_event_id]
+
+    async def run(self):
+        while self.subscribers:
+            try:
+                await asyncio.wait_for(self.dirty.wait(), timeout=FALLBACK_REFRESH_SECONDS)
+                await asyncio.sleep(DEBOUNCE_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self.dirty.clear()
+            await self.refresh()
+
+
+class Hub:
+    def __init__(self):
+        self.producers: dict[str, Producer] = {}
+        self.key_fields: dict[str, str] = {}
+        self._topics: dict[tuple[str, Hashable], _Topic] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def register(self, name: str, producer: Producer, key_field: str = "id"):
+        """`producer(db, key)` returns the full row list; rows are diffed by `key_field`."""
+        self.producers[name] = producer
+        self.key_fields[name] = key_field
+
+    def notify(self, name: str, key: Hashable = None):
+        """Mark `name` (one key, or every key when None) as changed. Thread-safe."""
+        loop = self._loop
+        if loop is None or loop.is_closed() or not self._topics:
+            return
+        try:
+            loop.call_soon_threadsafe(self._mark, name, key)
+        except RuntimeError:
+            pass
+
+    def _mark(self, name: str, key: Hashable):
+        for (topic_name, topic_key), topic in self._topics.items():
+            if topic_name != name:
+                continue
+            if key is None or topic_key is None or topic_key == key:
+                topic.dirty.set()
+
+    def _publish(self, topic: _Topic, event: Event):
+        for queue in list(topic.subscribers):
+            _offer(queue, event)
+
+    def _expire(self, topic: _Topic):
+        if not topic.subscribers and self._topics.get((topic.name, topic.key)) is topic:
+            del self._topics[(topic.name, topic.key)]
+
+    async def subscribe(
+        self, name: str, key: Hashable = None, last_event_id: int | None = None
+    ) -> AsyncIterator[Event | None]:
+        """
+        Yields (event_id, kind, payload) tuples: a snapshot first (or, when
+        `last_event_id` is still buffered, only the events after it), then
+        upsert/delete events as the data changes. Yields None every
+        KEEPALIVE_SECONDS of silence so callers can send a heartbeat.
+        """
+        if name not in self.producers:
+            raise KeyError(f"Unknown topic: {name}")
+        self._loop = asyncio.get_running_loop()
+        topic = self._topics.get((name, key))
+        if topic is None:
+            topic = _Topic(self, name, key)
+            self._topics[(name, key)] = topic
+        if topic.expiry is not None:
+            topic.expiry.cancel()
+            topic.expiry = None
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        topic.subscribers.add(queue)
+        try:
+            if topic.task is None or topic.task.done():
+                # Nobody was watching, so the cached snapshot may be stale.
+                topic.task = asyncio.create_task(topic.run())
+                await topic.refresh()
+            else:
+                async with topic.lock:  # let an in-flight first refresh finish
+                    pass
+
+            if last_event_id is not None and topic.can_resume(last_event_id):
+                pending = topic.backlog(last_event_id)
+            elif topic.snapshot is not None:
+                pending = [(topic.last_event_id, SNAPSHOT, topic.snapshot)]
+            else:
+                pending = []
+            # Anything published while we were refreshing is already covered above.
+            while not queue.empty():
+                queue.get_nowait()
+            for event in pending:
+                _offer(queue, event)
+
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if message is _RESYNC:
+                    message = (topic.last_event_id, SNAPSHOT, topic.snapshot or [])
+                yield message
+        finally:
+            topic.subscribers.discard(queue)
+            if not topic.subscribers:
+                if topic.task and not topic.task.done():
+                    topic.task.cancel()
+                topic.task = None
+                topic.expiry = self._loop.call_later(RESUME_WINDOW_SECONDS, self._expire, topic)
+
+
+def _offer(queue: asyncio.Queue, event):
+    # A viewer that fell this far behind gets a fresh snapshot instead of the backlog.
+    if queue.full():
+        while not queue.empty():
+            queue.get_nowait()
+        event = _RESYNC
+    queue.put_nowait(event)
+
+
+hub = Hub()
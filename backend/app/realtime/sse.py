@@ -0,0 +1,41 @@
+"""
+Server-Sent Events framing for hub topics.
+"""
+import json
+from typing import Callable, Hashable, Optional
+
+from fastapi.responses import StreamingResponse
+
+from app.realtime.hub import hub, DELETE
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def sse_response(
+    topic: str,
+    key: Hashable = None,
+    last_event_id: Optional[str] = None,
+    transform: Callable[[list], list] | None = None,
+) -> StreamingResponse:
+    """
+    Stream `<topic>.snapshot` once, then `<topic>.upsert` (changed rows) and
+    `<topic>.delete` (removed ids). Every event has an `id:` so browsers resume
+    with Last-Event-ID and only receive what they missed.
+    """
+    async def event_generator():
+        yield "retry: 3000\n\n"
+        async for event in hub.subscribe(topic, key, parse_last_event_id(last_event_id)):
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            event_id, kind, payload = event
+            if transform and kind != DELETE:
+                payload = transform(payload)
+            yield f"id: {event_id}\nevent: {topic}.{kind}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
@@ -0,0 +1 @@
+# Reporting aggregates package
@@ -0,0 +1,209 @@
+"""
+Report and admin-metric counts computed with conditional aggregation.
+
+Each table is scanned once per report: the individual COUNT(*) filters of the
+old endpoints became COUNT(CASE WHEN ... THEN 1 END) columns of a single query.
+Results are cached for REPORTS_CACHE_SECONDS per report and date, since the
+admin dashboards poll these every few seconds. Past days are read from
+daily_rollups (app/reports/rollups.py) when they have been rolled up.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, func, or_, select
+
+from app.config import REPORTS_CACHE_SECONDS
+from app.db.models import AuditEvent, CallLog, MedicationReminder, Patient, User
+from app.utils.cache import TTLCache
+
+
+REPORTS_CACHE = TTLCache(REPORTS_CACHE_SECONDS)
+INCIDENT_ACTIONS = ["api_failure", "twilio_webhook_error", "ivr_service_restart"]
+ROLES = ["admin", "doctor", "nurse", "staff"]
+
+
+def count_if(condition):
+    return func.count(case((condition, 1)))
+
+
+def _cached(key, compute):
+    key = key + (REPORTS_CACHE.version,)
+    value = REPORTS_CACHE.get(key)
+    if value is None:
+        value = compute()
+        REPORTS_CACHE.set(key, value)
+    return value
+
+
+def day_bounds(day: date) -> tuple[datetime, datetime]:
+    return datetime.combine(day, datetime.min.time()), datetime.combine(day, datetime.max.time())
+
+
+def call_counts(db, start: datetime, end: datetime | None = None) -> dict:
+    window = CallLog.created_at.between(start, end) if end is not None else CallLog.created_at >= start
+    row = (
+        db.query(
+            func.count(CallLog.id).label("total"),
+            count_if(CallLog.answered.is_(True)).label("answered"),
+            count_if(CallLog.answered.is_(False)).label("failed"),
+            count_if(CallLog.risk_level == "high").label("high_risk"),
+            count_if(CallLog.risk_level == "medium").label("medium_risk"),
+            count_if(CallLog.risk_level == "low").label("low_risk"),
+        )
+        .filter(window)
+        .one()
+    )
+    return dict(row._mapping)
+
+
+def reminder_counts(db, start: datetime, end: datetime) -> dict:
+    scheduled = MedicationReminder.scheduled_for.between(start, end)
+    sms_sent = MedicationReminder.sms_sent_at.between(start, end)
+    call_placed = MedicationReminder.call_placed_at.between(start, end)
+    row = (
+        db.query(
+            count_if(scheduled).label("scheduled"),
+            count_if(sms_sent).label("sms_sent"),
+            count_if(call_placed).label("confirmation_calls"),
+            count_if(call_placed & (MedicationReminder.status == "taken")).label("confirmation_success"),
+        )
+        .filter(or_(scheduled, sms_sent, call_placed))
+        .one()
+    )
+    return dict(row._mapping)
+
+
+def day_counts(db, day: date) -> dict:
+    """{"calls": call_counts, "reminders": reminder_counts} for one calendar day."""
+    def compute():
+        if day < datetime.utcnow().date():
+            from app.reports.rollups import stored_day_counts  # rollups imports this module
+            stored = stored_day_counts(db, day)
+            if stored is not None:
+                return stored
+        start, end = day_bounds(day)
+        return {"calls": call_counts(db, start, end), "reminders": reminder_counts(db, start, end)}
+    return _cached(("day", day), compute)
+
+
+def daily_report(db, day: date) -> dict:
+    counts = day_counts(db, day)
+    calls, reminders = counts["calls"], counts["reminders"]
+    success_rate = 0
+    if reminders["confirmation_calls"]:
+        success_rate = round((reminders["confirmation_success"] / reminders["confirmation_calls"]) * 100)
+    return {
+        "date": str(day),
+        "total_calls": calls["total"],
+        "answered_calls": calls["answered"],
+        "high_risk_calls": calls["high_risk"],
+        "ivr_calls_day": calls["total"],
+        "failed_calls": calls["failed"],
+        "reminders_scheduled": reminders["scheduled"],
+        "reminder_sms_sent": reminders["sms_sent"],
+        "confirmation_calls": reminders["confirmation_calls"],
+        "confirmation_success_rate": success_rate
+    }
+
+
+def overview_report(db, day: date) -> dict:
+    counts = day_counts(db, day)
+    return {
+        "date": str(day),
+        "monitoring_calls": counts["calls"]["total"],
+        "medication_sms": counts["reminders"]["sms_sent"],
+        "confirmation_calls": counts["reminders"]["confirmation_calls"]
+    }
+
+
+def call_queue_counts(db, now: datetime) -> dict:
+    """Scheduler/queue numbers for /reports/system in one pass over open and recent calls."""
+    minute_ago = now - timedelta(minutes=1)
+    scheduled = CallLog.status == "scheduled"
+    due = CallLog.scheduled_for.isnot(None) & (CallLog.scheduled_for <= now)
+    future = CallLog.scheduled_for.isnot(None) & (CallLog.scheduled_for > now)
+    last_success = select(func.max(CallLog.ended_at)).scalar_subquery()
+    row = (
+        db.query(
+            count_if(CallLog.created_at >= minute_ago).label("calls_per_minute"),
+            count_if(scheduled & due).label("queue"),
+            count_if(CallLog.status == "in_progress").label("in_progress"),
+            count_if(scheduled & future).label("scheduled_future"),
+            last_success.label("last_success"),
+        )
+        .filter(or_(CallLog.status.in_(["scheduled", "in_progress"]), CallLog.created_at >= minute_ago))
+        .one()
+    )
+    return dict(row._mapping)
+
+
+def system_report(db, now: datetime) -> dict:
+    def compute():
+        counts = call_queue_counts(db, now)
+        incident = (
+            db.query(func.max(AuditEvent.created_at))
+            .filter(AuditEvent.action.in_(INCIDENT_ACTIONS))
+            .scalar()
+        )
+        return counts, incident
+
+    counts, incident = _cached(("system",), compute)
+    queue = counts["queue"]
+    last_success = counts["last_success"]
+    system_status = "operational"
+    if queue >= 20:
+        system_status = "degraded"
+    if incident and (now - incident) < timedelta(hours=6):
+        system_status = "incident"
+
+    return {
+        "timestamp": now.isoformat(),
+        "ivr_calls_per_minute": counts["calls_per_minute"],
+        "queue_size": queue,
+        "active_calls": counts["in_progress"],
+        "retry_queue_size": queue,
+        "twilio_status": "Operational",
+        "twilio_checked_at": now.isoformat(),
+        "scheduler_running": counts["in_progress"] + counts["scheduled_future"],
+        "scheduler_delayed": queue,
+        "scheduler_last_success": last_success.isoformat() if last_success else None,
+        "system_status": system_status,
+        "last_incident": incident.isoformat() if incident else None
+    }
+
+
+def system_metrics(db, now: datetime) -> dict:
+    """Counts behind /metrics: one query each for patients, today's calls, users and audit events."""
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    hour_ago = now - timedelta(hours=1)
+
+    def compute():
+        patients = db.query(
+            func.count(Patient.id).label("total"),
+            count_if(Patient.active.is_(True)).label("active"),
+            count_if(Patient.created_at >= today_start).label("enrolled_today"),
+        ).one()
+        calls = call_counts(db, today_start)
+        active_user = User.active.is_(True)
+        users = db.query(
+            func.count(User.id).label("total"),
+            count_if(active_user).label("active"),
+            *[count_if(active_user & (User.role == role)).label(role) for role in ROLES],
+        ).one()
+        audit = (
+            db.query(
+                func.count(AuditEvent.id).label("actions"),
+                count_if(AuditEvent.action.like("%error%")).label("errors"),
+            )
+            .filter(AuditEvent.created_at >= hour_ago)
+            .one()
+        )
+        return {
+            "patients": dict(patients._mapping),
+            "calls": calls,
+            "users": dict(users._mapping),
+            "audit": dict(audit._mapping),
+        }
+
+    return _cached(("metrics", today_start.date()), compute)
@@ -0,0 +1,253 @@
+"""
+Columnar export of call outcomes for offline analytics and model training.
+
+Rows are read with a server-side cursor (stream_results) EXPORT_CHUNK_ROWS at a
+time and written as Parquet row groups or Arrow IPC record batches, so an
+export never holds a whole table in memory or keeps an ORM session busy per
+row. Each run writes one file per table under <out>/<table>/ and records the
+newest exported created_at per table in <out>/manifest.json; --incremental
+starts from there, inclusive, because created_at is only second-precise on
+SQLite and rows can share the watermark's timestamp. Calls still scheduled or
+in progress are left for a later run, and rows are keyed by id (a later file
+supersedes an earlier one, so the rows re-read at the boundary are harmless).
+
+Needs pyarrow (pip install pyarrow); the rest of the app runs without it.
+
+    python -m app.reports.export --out exports [--format arrow] [--since 2025-06-01] [--incremental]
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import JSON, Boolean, Date, DateTime, Float, Integer, func, select
+
+from app.config import EXPORT_CHUNK_ROWS, EXPORT_DIR
+from app.db.call_timeline import OPEN_STATUSES
+from app.db.models import AgentResponse, CallLog, ReadmissionRisk, ResponseCorrection
+from app.db.session import SessionLocal
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed for exports
+    pa = None
+    pq = None
+
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+# table -> (model, exported columns). flow_log is left out: it is large, trimmed
+# by retention after a month, and the per-intent responses carry the answers.
+DATASETS = {
+    "call_logs": (CallLog, [
+        "id", "patient_id", "patient_call_id", "call_sid", "scheduled_for", "started_at", "ended_at",
+        "status", "answered", "risk_score", "risk_level", "doctor_note", "created_at",
+    ]),
+    "agent_responses": (AgentResponse, [
+        "id", "call_id", "patient_id", "call_log_id", "intent_id", "raw_text", "structured_data",
+        "red_flag", "confidence", "created_at",
+    ]),
+    "readmission_risks": (ReadmissionRisk, [
+        "id", "patient_id", "call_log_id", "score", "level", "model_version", "explanation", "created_at",
+    ]),
+    "response_corrections": (ResponseCorrection, [
+        "id", "agent_response_id", "call_log_id", "patient_id", "original_text", "corrected_text",
+        "corrected_by_nurse_id", "correction_reason", "created_at",
+    ]),
+}
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Columnar export needs pyarrow: pip install pyarrow")
+
+
+def _arrow_type(sql_type):
+    if isinstance(sql_type, Boolean):
+        return pa.bool_()
+    if isinstance(sql_type, Integer):
+        return pa.int64()
+    if isinstance(sql_type, Float):
+        return pa.float64()
+    if isinstance(sql_type, DateTime):
+        return pa.timestamp("us", tz="UTC")
+    if isinstance(sql_type, Date):
+        return pa.date32()
+    return pa.string()  # String, Text, and JSON (serialized)
+
+
+@contextmanager
+def _writer(fmt: str, path: str, schema):
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(path, schema)
+    else:
+        writer = pa.ipc.new_file(path, schema)
+    try:
+        yield writer
+    finally:
+        writer.close()
+
+
+def _at_or_after(column, since: datetime):
+    # Inclusive lower bound. SQLite keeps server_default timestamps as
+    # "YYYY-MM-DD HH:MM:SS" text, which sorts below the same instant bound as
+    # "...:SS.000000", so compare against the microsecond before.
+    return column > since - timedelta(microseconds=1)
+
+
+def _since_filter(stmt, model, since: datetime | None):
+    if since is not None:
+        stmt = stmt.where(_at_or_after(model.created_at, since))
+    if model is CallLog:
+        stmt = stmt.where(CallLog.status.is_(None) | CallLog.status.notin_(OPEN_STATUSES))
+    return stmt
+
+
+def _open_call_floor(db, since: datetime | None):
+    """created_at of the oldest call still open, which the next incremental run must not skip."""
+    query = db.query(func.min(CallLog.created_at)).filter(CallLog.status.in_(OPEN_STATUSES))
+    if since is not None:
+        query = query.filter(_at_or_after(CallLog.created_at, since))
+    return query.scalar()
+
+
+def export_table(
+    db,
+    name: str,
+    out_dir: str,
+    fmt: str = "parquet",
+    since: datetime | None = None,
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+    keep_empty: bool = False,
+) -> dict:
+    """Write one table's rows created at or after `since` to <out_dir>/<name>/. Returns rows, path and new watermark."""
+    _require_pyarrow()
+    model, names = DATASETS[name]
+    columns = [model.__table__.c[column] for column in names]
+    schema = pa.schema([(column.name, _arrow_type(column.type)) for column in columns])
+    json_columns = {column.name for column in columns if isinstance(column.type, JSON)}
+    stmt = _since_filter(select(*columns), model, since).order_by(model.created_at, model.id)
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    os.makedirs(os.path.join(out_dir, name), exist_ok=True)
+    path = os.path.join(out_dir, name, f"{name}-{stamp}{FORMATS[fmt]}")
+    partial = path + ".part"
+
+    rows = 0
+    watermark = since
+    result = db.execute(stmt, execution_options={"stream_results": True, "yield_per": chunk_rows})
+    with _writer(fmt, partial, schema) as writer:
+        for chunk in result.partitions():
+            data = {
+                column: [
+                    json.dumps(row[i]) if column in json_columns and row[i] is not None else row[i]
+                    for row in chunk
+                ]
+                for i, column in enumerate(names)
+            }
+            writer.write_batch(pa.RecordBatch.from_pydict(data, schema=schema))
+            rows += len(chunk)
+            watermark = chunk[-1].created_at or watermark
+
+    if model is CallLog and watermark is not None:
+        floor = _open_call_floor(db, since)
+        if floor is not None and floor <= watermark:
+            watermark = floor
+
+    if rows or keep_empty:
+        os.replace(partial, path)
+    else:
+        os.remove(partial)
+        path = None
+    return {"rows": rows, "path": path, "watermark": watermark.isoformat() if watermark else None}
+
+
+def _manifest_path(out_dir: str) -> str:
+    return os.path.join(out_dir, "manifest.json")
+
+
+def load_manifest(out_dir: str) -> dict:
+    try:
+        with open(_manifest_path(out_dir), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"tables": {}}
+
+
+def run_export(
+    db,
+    out_dir: str = EXPORT_DIR,
+    tables: list[str] | None = None,
+    fmt: str = "parquet",
+    since: datetime | None = None,
+    incremental: bool = False,
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+) -> dict:
+    manifest = load_manifest(out_dir)
+    summary = {}
+    for name in tables or list(DATASETS):
+        table_since = since
+        previous = manifest["tables"].get(name, {})
+        if incremental and since is None and previous.get("watermark"):
+            table_since = datetime.fromisoformat(previous["watermark"])
+        result = export_table(db, name, out_dir, fmt=fmt, since=table_since, chunk_rows=chunk_rows)
+        summary[name] = {"since": table_since.isoformat() if table_since else None, **result}
+        if result["rows"]:
+            manifest["tables"][name] = {
+                "watermark": result["watermark"],
+                "files": previous.get("files", []) + [os.path.relpath(result["path"], out_dir)],
+            }
+    os.makedirs(out_dir, exist_ok=True)
+    with open(_manifest_path(out_dir), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return summary
+
+
+def read_export(out_dir: str, name: str):
+    """All exported files of one table as a DataFrame, latest copy of each id."""
+    import pandas as pd
+
+    frames = []
+    for path in sorted(glob.glob(os.path.join(out_dir, name, f"{name}-*"))):
+        if path.endswith(".parquet"):
+            frames.append(pd.read_parquet(path))
+        elif path.endswith(".arrow"):
+            frames.append(pd.read_feather(path))
+    if not frames:
+        return pd.DataFrame(columns=DATASETS[name][1])
+    return pd.concat(frames, ignore_index=True).drop_duplicates("id", keep="last")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export call outcomes to Parquet or Arrow files.")
+    parser.add_argument("--out", default=EXPORT_DIR, help="Output directory (default: EXPORT_DIR).")
+    parser.add_argument("--format", choices=list(FORMATS), default="parquet")
+    parser.add_argument("--tables", nargs="+", choices=list(DATASETS), default=None)
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None, help="Only rows created at or after this time.")
+    parser.add_argument("--incremental", action="store_true", help="Continue from the watermarks in manifest.json.")
+    parser.add_argument("--chunk-rows", type=int, default=EXPORT_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        summary = run_export(
+            db,
+            out_dir=args.out,
+            tables=args.tables,
+            fmt=args.format,
+            since=args.since,
+            incremental=args.incremental,
+            chunk_rows=args.chunk_rows,
+        )
+    finally:
+        db.close()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+daily_rollups: per-day, per-protocol counts for historical reporting.
+
+A day's rows are recomputed from call_logs and medication_reminders (two grouped
+queries over that day's index range) rather than incremented, so a late risk
+override or a reminder confirmed after midnight can never leave a counter off
+by one. Days are recomputed when:
+
+- a call's derived views are refreshed (finalize, missed-call sweep, overrides,
+  corrections) or a reminder is confirmed; those paths call mark_dirty() and
+  the scheduler picks the day up on its next tick;
+- the scheduler's periodic pass runs (today and yesterday, every
+  ROLLUP_REFRESH_SECONDS);
+- the backfill command runs:
+
+    python -m app.reports.rollups --backfill [--start 2025-01-01] [--end 2025-06-30]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import func, or_
+
+from app.config import ROLLUP_REFRESH_SECONDS
+from app.db.models import CallLog, DailyRollup, MedicationReminder, Patient
+from app.db.session import SessionLocal
+from app.reports.aggregates import count_if, day_bounds
+
+
+CALL_FIELDS = ["calls", "answered", "failed", "high_risk"]
+REMINDER_FIELDS = ["reminders_scheduled", "reminders_sent", "confirmation_calls", "confirmations_taken"]
+FIELDS = CALL_FIELDS + REMINDER_FIELDS
+UNKNOWN_PROTOCOL = "unknown"
+TRENDS_MAX_DAYS = 731
+
+_dirty: set[date] = set()
+_dirty_lock = threading.Lock()
+_last_periodic = 0.0
+
+
+def _utc_day(value) -> date | None:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.date()
+    return value
+
+
+def mark_dirty(*moments):
+    """Queue the UTC days of these datetimes for recomputation on the next scheduler tick."""
+    days = {day for day in map(_utc_day, moments) if day is not None}
+    if days:
+        with _dirty_lock:
+            _dirty.update(days)
+
+
+def compute_day(db, day: date) -> dict[str, dict]:
+    start, end = day_bounds(day)
+    out: dict[str, dict] = {}
+
+    protocol = func.coalesce(Patient.protocol, UNKNOWN_PROTOCOL)
+    for row in (
+        db.query(
+            protocol.label("protocol"),
+            func.count(CallLog.id).label("calls"),
+            count_if(CallLog.answered.is_(True)).label("answered"),
+            count_if(CallLog.answered.is_(False)).label("failed"),
+            count_if(CallLog.risk_level == "high").label("high_risk"),
+        )
+        .outerjoin(Patient, Patient.id == CallLog.patient_id)
+        .filter(CallLog.created_at.between(start, end))
+        .group_by(protocol)
+    ):
+        out.setdefault(row.protocol, dict.fromkeys(FIELDS, 0)).update(
+            {field: getattr(row, field) for field in CALL_FIELDS}
+        )
+
+    scheduled = MedicationReminder.scheduled_for.between(start, end)
+    sms_sent = MedicationReminder.sms_sent_at.between(start, end)
+    call_placed = MedicationReminder.call_placed_at.between(start, end)
+    for row in (
+        db.query(
+            protocol.label("protocol"),
+            count_if(scheduled).label("reminders_scheduled"),
+            count_if(sms_sent).label("reminders_sent"),
+            count_if(call_placed).label("confirmation_calls"),
+            count_if(call_placed & (MedicationReminder.status == "taken")).label("confirmations_taken"),
+        )
+        .outerjoin(Patient, Patient.id == MedicationReminder.patient_id)
+        .filter(or_(scheduled, sms_sent, call_placed))
+        .group_by(protocol)
+    ):
+        out.setdefault(row.protocol, dict.fromkeys(FIELDS, 0)).update(
+            {field: getattr(row, field) for field in REMINDER_FIELDS}
+        )
+    return out
+
+
+def refresh_rollups(db, days) -> int:
+    """Recompute and replace the rows for these days. Commits."""
+    days = sorted({day for day in days if day is not None})
+    for day in days:
+        rows = compute_day(db, day)
+        db.query(DailyRollup).filter(DailyRollup.day == day).delete(synchronize_session=False)
+        db.add_all(DailyRollup(day=day, protocol=protocol, **counts) for protocol, counts in rows.items())
+    if days:
+        db.commit()
+    return len(days)
+
+
+def maintain_rollups(db, now: datetime | None = None) -> int:
+    """Scheduler hook: recompute dirty days, plus today and yesterday every ROLLUP_REFRESH_SECONDS."""
+    global _last_periodic
+    with _dirty_lock:
+        days = set(_dirty)
+        _dirty.clear()
+    if time.monotonic() - _last_periodic >= ROLLUP_REFRESH_SECONDS:
+        today = (now or datetime.now(timezone.utc)).date()
+        days.update({today, today - timedelta(days=1)})
+        _last_periodic = time.monotonic()
+    try:
+        return refresh_rollups(db, days)
+    except Exception:
+        mark_dirty(*days)  # retry on the next tick
+        raise
+
+
+def stored_day_counts(db, day: date) -> dict | None:
+    """The rolled-up day in the shape of aggregates.day_counts(), or None if the day was never rolled up."""
+    row = (
+        db.query(
+            func.count().label("rows"),
+            *[func.coalesce(func.sum(getattr(DailyRollup, field)), 0).label(field) for field in FIELDS],
+        )
+        .filter(DailyRollup.day == day)
+        .one()
+    )
+    if not row.rows:
+        return None
+    return {
+        "calls": {
+            "total": row.calls,
+            "answered": row.answered,
+            "failed": row.failed,
+            "high_risk": row.high_risk,
+        },
+        "reminders": {
+            "scheduled": row.reminders_scheduled,
+            "sms_sent": row.reminders_sent,
+            "confirmation_calls": row.confirmation_calls,
+            "confirmation_success": row.confirmations_taken,
+        },
+    }
+
+
+def trends(db, start: date, end: date, protocol: str | None = None) -> list[dict]:
+    """One entry per day in [start, end], zero-filled, summed over protocols unless one is given."""
+    query = (
+        db.query(DailyRollup.day, *[func.sum(getattr(DailyRollup, field)).label(field) for field in FIELDS])
+        .filter(DailyRollup.day.between(start, end))
+    )
+    if protocol:
+        query = query.filter(DailyRollup.protocol == protocol)
+    by_day = {row.day: row for row in query.group_by(DailyRollup.day)}
+
+    out = []
+    day = start
+    while day <= end:
+        row = by_day.get(day)
+        counts = {field: int(getattr(row, field) or 0) if row else 0 for field in FIELDS}
+        out.append({
+            "date": str(day),
+            **counts,
+            "answer_rate": round((counts["answered"] / counts["calls"]) * 100) if counts["calls"] else 0,
+            "confirmation_success_rate": (
+                round((counts["confirmations_taken"] / counts["confirmation_calls"]) * 100)
+                if counts["confirmation_calls"] else 0
+            ),
+        })
+        day += timedelta(days=1)
+    return out
+
+
+def backfill_rollups(db, start: date | None = None, end: date | None = None) -> dict:
+    if start is None:
+        first = [
+            db.query(func.min(CallLog.created_at)).scalar(),
+            db.query(func.min(MedicationReminder.scheduled_for)).scalar(),
+        ]
+        first = [_utc_day(value) for value in first if value is not None]
+        if not first:
+            return {"days": 0}
+        start = min(first)
+    end = end or datetime.now(timezone.utc).date()
+    days = 0
+    day = start
+    while day <= end:
+        days += refresh_rollups(db, [day])
+        day += timedelta(days=1)
+    return {"start": str(start), "end": str(end), "days": days}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild daily_rollups from call logs and medication reminders.")
+    parser.add_argument("--backfill", action="store_true", help="Recompute every day in the range.")
+    parser.add_argument("--start", type=date.fromisoformat, default=None, help="First day (default: earliest data).")
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="Last day (default: today, UTC).")
+    args = parser.parse_args()
+    if not args.backfill:
+        parser.print_help()
+        return
+
+    db = SessionLocal()
+    try:
+        summary = backfill_rollups(db, start=args.start, end=args.end)
+    finally:
+        db.close()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
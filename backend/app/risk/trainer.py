@@ -1,3 +1,4 @@
+import json
 import os
 import joblib
 import pandas as pd
@@ -23,17 +24,19 @@ def train_from_db(db: Session) -> bool:
     response_overrides = {}
     audit_rows = (
         db.query(AuditEvent)
-        .filter(AuditEvent.action.in_(["model_feedback", "risk_override", "response_review"]))
+        .filter(
+            AuditEvent.action.in_(["model_feedback", "risk_override", "response_review"]),
+            AuditEvent.call_log_id.isnot(None)
+        )
         .order_by(AuditEvent.created_at.desc())
         .all()
     )
     for row in audit_rows:
-        meta = row.meta or {}
-        call_log_id = meta.get("call_log_id")
-        label = meta.get("label")
+        call_log_id = row.call_log_id
+        label = (row.meta or {}).get("label")
         if row.action == "response_review":
-            intent_id = meta.get("intent_id")
-            if call_log_id is None or intent_id is None or label is None:
+            intent_id = row.intent_id
+            if intent_id is None or label is None:
                 continue
             response_overrides.setdefault(call_log_id, {})[intent_id] = int(label)
             continue
@@ -87,14 +90,53 @@ def train_from_db(db: Session) -> bool:
     return True
 
 
+def _dataset_from_export(directory: str) -> pd.DataFrame:
+    """
+    Call-level training rows from an app.reports.export directory. Labels use the
+    red-flag proxy (audit overrides are not exported).
+    """
+    from app.reports.export import read_export
+
+    responses = read_export(directory, "agent_responses")
+    if responses.empty:
+        return pd.DataFrame()
+    call_key = responses["call_log_id"].fillna(-responses["call_id"].fillna(0))
+    call_rows = []
+    for _, group in responses.groupby(call_key):
+        rows = [
+            {
+                "intent_id": r.intent_id,
+                "structured_data": json.loads(r.structured_data) if isinstance(r.structured_data, str) else None,
+                "red_flag": bool(r.red_flag),
+            }
+            for r in group.itertuples()
+        ]
+        call_rows.append({"responses": rows, "label": 1 if any(r["red_flag"] for r in rows) else 0})
+    return build_dataset_from_calls(call_rows).rename(columns={"label": "readmitted_30d"})
+
+
+def _read_training_table(path: str) -> pd.DataFrame:
+    if os.path.isdir(path):
+        return _dataset_from_export(path)
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        return pd.read_parquet(path)
+    if ext in (".arrow", ".feather"):
+        return pd.read_feather(path)
+    return pd.read_csv(path)
+
+
 def train_from_csv(path: str | None = None) -> bool:
+    """Train from a CSV, Parquet or Arrow file, or from a directory written by app.reports.export."""
     path = path or SAMPLE_DATASET_PATH
     if not os.path.exists(path):
         return False
 
-    df = pd.read_csv(path)
+    df = _read_training_table(path)
     if "readmitted_30d" not in df.columns:
         return False
+    if os.path.isdir(path) and len(df) < MIN_TRAIN_SAMPLES:
+        return False
 
     y = df["readmitted_30d"]
     X = df.drop(columns=["readmitted_30d"])
@@ -0,0 +1,49 @@
+"""
+Per-stage timing hooks for the media socket call pipeline.
+
+media_ws records how long each stage of a call takes; observers (benchmarks,
+metrics) subscribe with add_observer. With no observers, record() is a no-op.
+"""
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+
+START_TO_INTRO = "start_to_intro"        # start event -> first intro audio sent
+TRANSCRIPT_TO_PARSE = "transcript_to_parse"  # rule-based extraction of a final transcript
+LLM_EXTRACT = "llm_extract"              # Groq fallback when rules could not parse the answer
+ACK_SYNTHESIS = "ack_synthesis"          # Groq acknowledgement + TTS of the ack
+AUDIO_SEND = "audio_send"                # time spent sending audio beyond its real-time length
+FINALIZE = "finalize"                    # risk scoring + CallLog write at the end of the call
+TURN = "turn"                            # final transcript -> first agent audio of the reply
+
+STAGES = [START_TO_INTRO, TRANSCRIPT_TO_PARSE, LLM_EXTRACT, ACK_SYNTHESIS, AUDIO_SEND, FINALIZE, TURN]
+
+_observers: list[Callable[[str, str, float], None]] = []
+
+
+def add_observer(fn: Callable[[str, str, float], None]):
+    if fn not in _observers:
+        _observers.append(fn)
+
+
+def remove_observer(fn: Callable[[str, str, float], None]):
+    if fn in _observers:
+        _observers.remove(fn)
+
+
+def record(call_id: str, stage: str, seconds: float):
+    for fn in list(_observers):
+        try:
+            fn(call_id, stage, seconds)
+        except Exception as e:
+            print(f"call stage observer failed: {e}")
+
+
+@contextmanager
+def timed(call_id: str, stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(call_id, stage, time.perf_counter() - started)
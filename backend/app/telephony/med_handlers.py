@@ -5,8 +5,10 @@ from datetime import datetime, timezone
 import traceback
 
 from app.db.session import SessionLocal
-from app.db.models import MedicationReminder, MedicationEvent
+from app.db.models import MedicationReminder
+from app.db import reminder_state
 from app.config import BASE_URL
+from app.reports.rollups import mark_dirty as mark_rollup_dirty
 
 
 def _twiml(text: str) -> Response:
@@ -60,21 +62,19 @@ async def med_ivr_handle(request: Request):
             reminder = db.query(MedicationReminder).filter(MedicationReminder.id == int(reminder_id)).first()
             if not reminder:
                 return _twiml("We could not record your response. Goodbye.")
-            
-            if digits == "1":
-                reminder.status = "taken"
-                db.add(MedicationEvent(reminder_id=reminder.id, event_type="taken", meta={"digits": digits}))
+
+            outcome = {"1": reminder_state.TAKEN, "2": reminder_state.NOT_TAKEN}.get(digits, reminder_state.NO_RESPONSE)
+            # Compare-and-set: a reminder a nurse or a status callback already closed is left alone.
+            if reminder_state.transition(db, reminder.id, outcome):
+                reminder_state.add_events(db, [{"reminder_id": reminder.id, "event_type": outcome, "meta": {"digits": digits}}])
                 db.commit()
+                if outcome == reminder_state.TAKEN:
+                    mark_rollup_dirty(reminder.call_placed_at)
+
+            if outcome == reminder_state.TAKEN:
                 return _twiml("Thank you. Your medication has been marked as taken.")
-            if digits == "2":
-                reminder.status = "not_taken"
-                db.add(MedicationEvent(reminder_id=reminder.id, event_type="not_taken", meta={"digits": digits}))
-                db.commit()
+            if outcome == reminder_state.NOT_TAKEN:
                 return _twiml("Thank you. We have recorded that you have not taken your medication.")
-            
-            reminder.status = "no_response"
-            db.add(MedicationEvent(reminder_id=reminder.id, event_type="no_response", meta={"digits": digits}))
-            db.commit()
             return _twiml("We did not receive your input. We will follow up.")
         finally:
             db.close()
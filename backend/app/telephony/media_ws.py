@@ -1,6 +1,7 @@
 import json
 import base64
 import asyncio
+import time
 import traceback
 from datetime import datetime, timedelta
 
@@ -10,6 +11,11 @@ from starlette.websockets import WebSocketState, WebSocketDisconnect
 from app.db.session import SessionLocal
 from app.db.models import CallLog, Patient, ReadmissionRisk, PatientCall, AgentResponse
 from app.telephony.call_context import CallContext
+from app.telephony import call_stages
+from app.utils.metrics import ACTIVE_CALLS
+from app.realtime.hub import hub
+from app.realtime.alerts import notify_high_alerts
+from app.db.call_timeline import refresh_call_timeline
 from app.agent.session import AgentSession
 from app.agent.protocols import normalize_protocol
 from app.agent.extracter import extract
@@ -92,7 +98,7 @@ async def _handle_start(ctx: CallContext, db, data):
         ctx.patient_call_id = log.patient_call_id
     elif ctx.patient_id:
         patient_call = PatientCall(
-            patient_id=str(ctx.patient_id),
+            patient_id=ctx.patient_id,
             diagnosis=ctx.protocol,
             consent_given=False
         )
@@ -102,9 +108,10 @@ async def _handle_start(ctx: CallContext, db, data):
         ctx.patient_call_id = patient_call.id
         log.patient_call_id = patient_call.id
         db.commit()
+    hub.notify("logs", ctx.patient_id)
 
 
-async def _send_audio(ws: WebSocket, stream_sid: str, ulaw: bytes) -> bool:
+async def _send_audio(ws: WebSocket, stream_sid: str, ulaw: bytes, call_id: str = "") -> bool:
     if not ulaw:
         print(f"[send_audio] Empty ulaw. Skipping.")
         return False
@@ -113,6 +120,7 @@ async def _send_audio(ws: WebSocket, stream_sid: str, ulaw: bytes) -> bool:
         return False
 
     chunk_size = 160  # 20ms @ 8kHz mulaw (Twilio-friendly)
+    started = time.perf_counter()
     for i in range(0, len(ulaw), chunk_size):
         chunk = ulaw[i:i + chunk_size]
         payload = base64.b64encode(chunk).decode("utf-8")
@@ -126,6 +134,9 @@ async def _send_audio(ws: WebSocket, stream_sid: str, ulaw: bytes) -> bool:
             print(f"[send_audio] send failed: {e}")
             return False
         await asyncio.sleep(0.02)
+    # Audio plays in real time at 8000 bytes/s; anything above that is send lag.
+    lag = (time.perf_counter() - started) - len(ulaw) / 8000
+    call_stages.record(call_id, call_stages.AUDIO_SEND, max(0.0, lag))
     return True
 
 
@@ -134,6 +145,7 @@ async def media_socket(ws: WebSocket):
     print(f"[media_socket] WebSocket connection attempt from client")
     await ws.accept()
     print(f"[media_socket] WebSocket accepted")
+    ACTIVE_CALLS.inc()
     db = SessionLocal()
 
     params = dict(ws.query_params)
@@ -162,16 +174,15 @@ async def media_socket(ws: WebSocket):
     completed = False
     spoken_question_cache: dict[str, str] = {}
     clarify_counts: dict[str, int] = {}
+    # (stage, perf_counter start) closed by the next agent audio: start_to_intro or turn.
+    awaiting_audio: tuple[str, float] | None = None
 
     def _log_flow(message: str):
         ts = datetime.utcnow().isoformat()
         flow_events.append({"ts": ts, "message": message})
         print(f"[{ctx.call_id}] {message}")
 
-    async def _speak_text(text: str):
-        nonlocal speaking, last_speak_end
-        _log_flow(f"_speak_text request: {text[:20]}...")
-        speaking = True
+    async def _synthesize(text: str) -> bytes:
         ulaw = TTS_CACHE.get(text)
         if ulaw is None:
             _log_flow("_speak_text: Cache miss. Synthesizing...")
@@ -181,6 +192,13 @@ async def media_socket(ws: WebSocket):
                 _log_flow(f"_speak_text: Synthesis complete. {len(ulaw)} bytes.")
         else:
                 _log_flow("_speak_text: Cache hit.")
+        return ulaw
+
+    async def _speak_text(text: str):
+        nonlocal speaking, last_speak_end, awaiting_audio
+        _log_flow(f"_speak_text request: {text[:20]}...")
+        speaking = True
+        ulaw = await _synthesize(text)
 
         if not ulaw:
             _log_flow("TTS produced no audio (empty payload).")
@@ -189,7 +207,11 @@ async def media_socket(ws: WebSocket):
         
         if stream_sid:
             _log_flow(f"_speak_text: Sending to stream {stream_sid}")
-            sent = await _send_audio(ws, stream_sid, ulaw)
+            if awaiting_audio and ulaw:
+                stage, stage_started = awaiting_audio
+                awaiting_audio = None
+                call_stages.record(ctx.call_id, stage, time.perf_counter() - stage_started)
+            sent = await _send_audio(ws, stream_sid, ulaw, ctx.call_id)
             if not sent:
                 _log_flow("_speak_text: internal send failed")
                 speaking = False
@@ -364,6 +386,10 @@ async def media_socket(ws: WebSocket):
         if completed:
             return
         completed = True
+        with call_stages.timed(ctx.call_id, call_stages.FINALIZE):
+            _write_final_log(reason, compute_risk)
+
+    def _write_final_log(reason: str, compute_risk: bool):
         log = None
         if ctx.call_log_id:
             log = db.query(CallLog).filter(CallLog.id == ctx.call_log_id).first()
@@ -402,9 +428,14 @@ async def media_socket(ws: WebSocket):
                     explanation=explanation
                 ))
             db.commit()
+            refresh_call_timeline(db, log.id)
+            hub.notify("logs", log.patient_id)
+            hub.notify("patients")
+            hub.notify("alerts")
+            notify_high_alerts()
         _log_flow(f"Call finalized: {reason}")
     async def on_transcript(text: str):
-        nonlocal stream_sid, no_response_count, pending_question_ts, last_transcript_ts
+        nonlocal stream_sid, no_response_count, pending_question_ts, last_transcript_ts, awaiting_audio
         if not text:
             return
         _log_flow(f"[STT] Transcript received: '{text}'")
@@ -424,6 +455,7 @@ async def media_socket(ws: WebSocket):
             return
 
         last_transcript_ts = datetime.utcnow()
+        awaiting_audio = (call_stages.TURN, time.perf_counter())
         if ctx.call_log_id:
             log = db.query(CallLog).filter(CallLog.id == ctx.call_log_id).first()
             if log and not log.answered:
@@ -434,17 +466,19 @@ async def media_socket(ws: WebSocket):
             return
         response_type = current_q.get("response_type", "yes_no")
         options = current_q.get("options") or []
-        parsed = extract(
-            current_q["intent_id"],
-            response_type,
-            text,
-            question=current_q.get("question", ""),
-            clinical_meaning="",
-            options=options
-        )
-        parsed = _normalize_parsed(parsed, response_type, options)
+        with call_stages.timed(ctx.call_id, call_stages.TRANSCRIPT_TO_PARSE):
+            parsed = extract(
+                current_q["intent_id"],
+                response_type,
+                text,
+                question=current_q.get("question", ""),
+                clinical_meaning="",
+                options=options
+            )
+            parsed = _normalize_parsed(parsed, response_type, options)
         if _is_unknown(parsed, response_type, options):
-            llm_answer = await llm_extract_answer(groq, current_q.get("question", ""), response_type, text, options)
+            with call_stages.timed(ctx.call_id, call_stages.LLM_EXTRACT):
+                llm_answer = await llm_extract_answer(groq, current_q.get("question", ""), response_type, text, options)
             if response_type == "yes_no":
                 parsed["answer"] = llm_answer
                 parsed["present"] = llm_answer == "yes"
@@ -476,14 +510,19 @@ async def media_socket(ws: WebSocket):
         if ctx.patient_call_id:
             db.add(AgentResponse(
                 call_id=ctx.patient_call_id,
+                patient_id=ctx.patient_id,
+                call_log_id=ctx.call_log_id,
                 intent_id=current_q["intent_id"],
                 raw_text=text,
                 structured_data=structured,
                 red_flag=response.get("red_flag", False)
             ))
             db.commit()
+            hub.notify("logs", ctx.patient_id)
             _log_flow(f"Stored response for {current_q['intent_id']}")
-            ack_text = await llm_acknowledge(groq, ctx.patient_name, _ack_summary(response_type, structured))
+            with call_stages.timed(ctx.call_id, call_stages.ACK_SYNTHESIS):
+                ack_text = await llm_acknowledge(groq, ctx.patient_name, _ack_summary(response_type, structured))
+                await _synthesize(ack_text)
             await _speak_text(ack_text)
 
         next_q = session.advance()
@@ -538,6 +577,7 @@ async def media_socket(ws: WebSocket):
 
 
             if event == "start":
+                awaiting_audio = (call_stages.START_TO_INTRO, time.perf_counter())
                 try:
                     stream_sid = data.get("start", {}).get("streamSid")
                     
@@ -668,7 +708,9 @@ async def media_socket(ws: WebSocket):
         _log_flow(f"media socket error: {traceback.format_exc().strip()}")
     finally:
         _finalize_call("socket closed", compute_risk=True)
+        await stt.close()
         db.close()
+        ACTIVE_CALLS.dec()
         try:
             await ws.close()
         except Exception:
@@ -3,9 +3,17 @@ from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 import uuid
 
+from sqlalchemy import update
+
 from app.db.session import SessionLocal
-from app.db.models import Patient, CallLog, MedicationReminder, MedicationEvent
+from app.db.models import Patient, CallLog, MedicationReminder
 from app.telephony.twilio_client import make_call, make_medication_call, send_sms
+from app.realtime.hub import hub
+from app.realtime.alerts import notify_high_alerts
+from app.db.call_timeline import refresh_call_timelines
+from app.reports.rollups import maintain_rollups
+from app.db.medication_schedule import materialize_schedules
+from app.db import reminder_state
 
 
 def _naive(dt: datetime | None) -> datetime | None:
@@ -45,6 +53,89 @@ def _already_called_today(db, patient_id: int, now_ist: datetime) -> bool:
     return existing is not None
 
 
+def _medication_sms_body(row) -> str:
+    return (
+        "CarePulse Reminder\n"
+        f"It\u2019s time to take your {row.medication_name}"
+        f"{' ' + row.dose if row.dose else ''}.\n"
+        "You will receive a confirmation call shortly."
+    )
+
+
+def _claim_due(db, status: str, to_status: str, now: datetime, **values) -> list[tuple]:
+    """
+    One batch of due reminders in `status`, moved to `to_status` by compare-and-set
+    and committed before any SMS or call goes out. Returns the due_reminders() rows
+    this worker claimed; reminders of missing patients become no_response.
+    """
+    due = reminder_state.due_reminders(db, status, now)
+    if not due:
+        return []
+    reminder_state.advance(db, [row.id for row in due if not row.phone_number], reminder_state.NO_RESPONSE, now)
+    claimed = set(reminder_state.advance(db, [row.id for row in due if row.phone_number], to_status, now, **values))
+    db.commit()
+    return [row for row in due if row.id in claimed]
+
+
+def run_medication_reminders(db, now: datetime) -> dict:
+    """Send due SMS, place due confirmation calls and time out unanswered ones. Returns counts."""
+    counts = {"sms_sent": 0, "call_placed": 0, "timed_out": 0}
+
+    while True:
+        claimed = _claim_due(db, reminder_state.SCHEDULED, reminder_state.SMS_SENT, now, sms_sent_at=now)
+        if not claimed:
+            break
+        for row in claimed:
+            send_sms(row.phone_number, _medication_sms_body(row))
+        reminder_state.add_events(db, [
+            {"reminder_id": row.id, "event_type": "sms_sent", "meta": {"phone": row.phone_number}}
+            for row in claimed
+        ])
+        db.commit()
+        counts["sms_sent"] += len(claimed)
+
+    while True:
+        claimed = _claim_due(db, reminder_state.SMS_SENT, reminder_state.CALL_PLACED, now, call_placed_at=now)
+        if not claimed:
+            break
+        call_sids = []
+        for row in claimed:
+            call = make_medication_call(row.phone_number, row.id)
+            if call:
+                call_sids.append({"id": row.id, "call_sid": call.sid})
+        if call_sids:
+            # ORM bulk UPDATE by primary key: one executemany.
+            db.execute(update(MedicationReminder), call_sids)
+        reminder_state.add_events(db, [
+            {"reminder_id": row.id, "event_type": "call_placed", "meta": {"phone": row.phone_number}}
+            for row in claimed
+        ])
+        db.commit()
+        counts["call_placed"] += len(claimed)
+
+    while True:
+        claimed = _claim_due(db, reminder_state.CALL_PLACED, reminder_state.NO_RESPONSE, now)
+        if not claimed:
+            break
+        reminder_state.add_events(db, [
+            {"reminder_id": row.id, "event_type": "no_response", "meta": {"reason": "call_timeout"}}
+            for row in claimed
+        ])
+        db.commit()
+        counts["timed_out"] += len(claimed)
+
+    return counts
+
+
+def _run_in_session(fn, now: datetime):
+    """Run one scheduler pass in a worker thread with its own short-lived session."""
+    db = SessionLocal()
+    try:
+        return fn(db, now)
+    finally:
+        db.close()
+
+
 async def scheduler_loop():
     ist = ZoneInfo("Asia/Kolkata")
     while True:
@@ -83,6 +174,8 @@ async def scheduler_loop():
                 )
                 db.add(log)
                 db.commit()
+                hub.notify("logs", patient.id)
+                hub.notify("scheduler")
 
             cutoff = now_utc - timedelta(hours=2)
             missed = (
@@ -100,61 +193,23 @@ async def scheduler_loop():
                 log.risk_score = 90.0
             if missed:
                 db.commit()
+                refresh_call_timelines(db, [log.id for log in missed])
+                for patient_id in {log.patient_id for log in missed}:
+                    hub.notify("logs", patient_id)
+                hub.notify("alerts")
+                notify_high_alerts()
 
-            # Medication reminder flow: SMS at time, IVR call after 10 minutes.
-            due_sms = (
-                db.query(MedicationReminder)
-                .filter(MedicationReminder.status == "scheduled")
-                .filter(MedicationReminder.scheduled_for <= now_utc)
-                .all()
-            )
-            for reminder in due_sms:
-                patient = db.query(Patient).filter(Patient.id == reminder.patient_id).first()
-                if not patient:
-                    reminder.status = "no_response"
-                    continue
-                sms_body = (
-                    "CarePulse Reminder\n"
-                    f"It\u2019s time to take your {reminder.medication_name}"
-                    f"{' ' + reminder.dose if reminder.dose else ''}.\n"
-                    "You will receive a confirmation call shortly."
-                )
-                send_sms(patient.phone_number, sms_body)
-                reminder.sms_sent_at = now_utc
-                reminder.status = "sms_sent"
-                db.add(MedicationEvent(
-                    reminder_id=reminder.id,
-                    event_type="sms_sent",
-                    meta={"phone": patient.phone_number}
-                ))
-            if due_sms:
-                db.commit()
+            db.close()
 
-            due_call = (
-                db.query(MedicationReminder)
-                .filter(MedicationReminder.status == "sms_sent")
-                .filter(MedicationReminder.sms_sent_at != None)
-                .filter(MedicationReminder.sms_sent_at <= (now_utc - timedelta(minutes=2)))
-                .all()
-            )
-            for reminder in due_call:
-                patient = db.query(Patient).filter(Patient.id == reminder.patient_id).first()
-                if not patient:
-                    reminder.status = "no_response"
-                    continue
-                call = make_medication_call(patient.phone_number, reminder.id)
-                reminder.call_placed_at = now_utc
-                reminder.call_sid = call.sid if call else None
-                reminder.status = "call_placed"
-                db.add(MedicationEvent(
-                    reminder_id=reminder.id,
-                    event_type="call_placed",
-                    meta={"phone": patient.phone_number}
-                ))
-            if due_call:
-                db.commit()
+            # Keep recurring medication schedules materialized a few days ahead.
+            await asyncio.to_thread(_run_in_session, materialize_schedules, now_utc)
 
-            db.close()
+            # Medication reminder flow: SMS at time, IVR call after the call delay.
+            # CAS claims, Twilio requests and event inserts all block, so run in a thread.
+            await asyncio.to_thread(_run_in_session, run_medication_reminders, now_utc)
+
+            # Grouped aggregates over two days: keep them off the event loop.
+            await asyncio.to_thread(_run_in_session, maintain_rollups, now_utc)
         except Exception as e:
             print(f"[scheduler] error: {e}")
 
@@ -1,6 +1,6 @@
 from fastapi import Request, BackgroundTasks
 from app.db.session import SessionLocal
-from app.db.models import MedicationReminder, MedicationEvent
+from app.db import reminder_state
 import traceback
 
 async def med_call_status(request: Request, background_tasks: BackgroundTasks):
@@ -32,23 +32,11 @@ async def med_call_status(request: Request, background_tasks: BackgroundTasks):
 def _update_missed_status(reminder_id: int, status_reason: str):
     db = SessionLocal()
     try:
-        reminder = db.query(MedicationReminder).filter(MedicationReminder.id == reminder_id).first()
-        if not reminder:
-            print(f"Reminder {reminder_id} not found for status update.")
-            return
-
-        # Only update if it's still in a 'pending' state
-        # If the user answered and hung up without input, it might be 'no_response' (handled by IVR gather timeout if reached)
-        # But if CallStatus is busy/no-answer, they clearly didn't answer.
-        # We check if it's already final to avoid overwriting a concurrent 'taken' update (race condition unlikely but safer)
-        if reminder.status in ["scheduled", "call_placed", "sms_sent"]:
+        # Compare-and-set from the pending states only: busy/no-answer means the patient
+        # never answered, but a concurrent 'taken' (or a nurse's correction) must win.
+        if reminder_state.transition(db, reminder_id, reminder_state.MISSED):
             print(f"Marking reminder {reminder_id} as MISSED due to {status_reason}")
-            reminder.status = "missed"
-            db.add(MedicationEvent(
-                reminder_id=reminder.id, 
-                event_type="missed", 
-                meta={"reason": status_reason}
-            ))
+            reminder_state.add_events(db, [{"reminder_id": reminder_id, "event_type": "missed", "meta": {"reason": status_reason}}])
             db.commit()
     except Exception as e:
         print(f"Error updating missed status: {e}")
@@ -1,10 +1,7 @@
-from app.config import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_FROM_NUMBER, BASE_URL
+from app.config import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_FROM_NUMBER, BASE_URL, TWILIO_API_BASE_URL
 
 
-def make_call(phone_number, call_id, patient_id=None, protocol="POST_MI"):
-    if not TWILIO_ACCOUNT_SID or not TWILIO_AUTH_TOKEN or not TWILIO_FROM_NUMBER or not BASE_URL:
-        print("Twilio config missing. Set TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_FROM_NUMBER, BASE_URL in .env.")
-        return None
+def _client():
     try:
         from twilio.rest import Client
     except Exception:
@@ -12,6 +9,20 @@ def make_call(phone_number, call_id, patient_id=None, protocol="POST_MI"):
         return None
 
     client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+    if TWILIO_API_BASE_URL:
+        # Route REST calls to a local fake (backend/simulator) instead of api.twilio.com.
+        client.api.base_url = TWILIO_API_BASE_URL.rstrip("/")
+    return client
+
+
+def make_call(phone_number, call_id, patient_id=None, protocol="POST_MI"):
+    if not TWILIO_ACCOUNT_SID or not TWILIO_AUTH_TOKEN or not TWILIO_FROM_NUMBER or not BASE_URL:
+        print("Twilio config missing. Set TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_FROM_NUMBER, BASE_URL in .env.")
+        return None
+    client = _client()
+    if client is None:
+        return None
+
     params = f"call_id={call_id}&protocol={protocol}"
     if patient_id:
         params += f"&patient_id={patient_id}"
@@ -31,13 +42,10 @@ def make_medication_call(phone_number, reminder_id: int):
     if not TWILIO_ACCOUNT_SID or not TWILIO_AUTH_TOKEN or not TWILIO_FROM_NUMBER or not BASE_URL:
         print("Twilio config missing. Set TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_FROM_NUMBER, BASE_URL in .env.")
         return None
-    try:
-        from twilio.rest import Client
-    except Exception:
-        print("Twilio client not installed.")
+    client = _client()
+    if client is None:
         return None
 
-    client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
     url = f"{BASE_URL}/telephony/med-ivr?reminder_id={reminder_id}"
     try:
         return client.calls.create(
@@ -57,12 +65,9 @@ def send_sms(phone_number: str, body: str):
     if not TWILIO_ACCOUNT_SID or not TWILIO_AUTH_TOKEN or not TWILIO_FROM_NUMBER:
         print("Twilio config missing. Set TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_FROM_NUMBER in .env.")
         return None
-    try:
-        from twilio.rest import Client
-    except Exception:
-        print("Twilio client not installed.")
+    client = _client()
+    if client is None:
         return None
-    client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
     try:
         return client.messages.create(
             to=phone_number,
@@ -75,13 +80,10 @@ def send_sms(phone_number: str, body: str):
 
 
 def hangup_call(call_sid: str):
-    try:
-        from twilio.rest import Client
-    except Exception:
-        print("Twilio client not installed.")
+    client = _client()
+    if client is None:
         return None
 
-    client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
     try:
         return client.calls(call_sid).update(status="completed")
     except Exception as e:
@@ -0,0 +1,126 @@
+"""
+Structured, non-blocking HTTP access log.
+
+Records are JSON lines handed to a QueueHandler; a QueueListener thread does the
+actual write, so request handlers never block on stdout. Request bodies are not
+read unless the path matches ACCESS_LOG_DEBUG_ROUTES.
+"""
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from fastapi import Request
+
+from app.config import (
+    ACCESS_LOG_ENABLED,
+    ACCESS_LOG_SAMPLE_RATE,
+    ACCESS_LOG_SLOW_MS,
+    ACCESS_LOG_HEADERS,
+    ACCESS_LOG_REDACT_HEADERS,
+    ACCESS_LOG_DEBUG_ROUTES,
+    ACCESS_LOG_BODY_MAX_BYTES,
+)
+
+
+def _csv(value: str) -> list[str]:
+    return [v.strip().lower() for v in (value or "").split(",") if v.strip()]
+
+
+LOGGED_HEADERS = _csv(ACCESS_LOG_HEADERS)
+REDACTED_HEADERS = set(_csv(ACCESS_LOG_REDACT_HEADERS))
+DEBUG_ROUTES = [r.strip() for r in (ACCESS_LOG_DEBUG_ROUTES or "").split(",") if r.strip()]
+
+logger = logging.getLogger("carepulse.access")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+
+_queue: queue.Queue = queue.Queue(maxsize=10000)
+_listener: QueueListener | None = None
+
+
+class _DropWhenFullQueueHandler(QueueHandler):
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Never stall a request on logging; drop the line instead.
+            pass
+
+    def prepare(self, record):
+        # The message is already a JSON string; skip QueueHandler's formatting copy.
+        return record
+
+
+def start():
+    global _listener
+    if _listener is not None or not ACCESS_LOG_ENABLED:
+        return
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(logging.Formatter("%(message)s"))
+    _listener = QueueListener(_queue, stream, respect_handler_level=False)
+    logger.addHandler(_DropWhenFullQueueHandler(_queue))
+    _listener.start()
+
+
+def stop():
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+
+
+def is_debug_route(path: str) -> bool:
+    return any(path.startswith(prefix) for prefix in DEBUG_ROUTES)
+
+
+def _headers(request: Request) -> dict:
+    include_all = "*" in LOGGED_HEADERS
+    out = {}
+    for name, value in request.headers.items():
+        name = name.lower()
+        if not include_all and name not in LOGGED_HEADERS:
+            continue
+        out[name] = "[redacted]" if name in REDACTED_HEADERS else value
+    return out
+
+
+def _should_log(status: int, duration_ms: float, debug: bool) -> bool:
+    if debug or status >= 400 or duration_ms >= ACCESS_LOG_SLOW_MS:
+        return True
+    return ACCESS_LOG_SAMPLE_RATE >= 1.0 or random.random() < ACCESS_LOG_SAMPLE_RATE
+
+
+async def debug_body(request: Request) -> str | None:
+    """Read (and cache) the body for debug routes only."""
+    if not DEBUG_ROUTES or not is_debug_route(request.url.path):
+        return None
+    body = await request.body()
+    return body[:ACCESS_LOG_BODY_MAX_BYTES].decode("utf-8", errors="ignore")
+
+
+def log_request(request: Request, status: int, duration_ms: float, route: str, body: str | None = None):
+    if _listener is None:
+        return
+    debug = body is not None
+    if not _should_log(status, duration_ms, debug):
+        return
+    entry = {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "method": request.method,
+        "path": request.url.path,
+        "route": route,
+        "status": status,
+        "duration_ms": round(duration_ms, 2),
+        "client": request.client.host if request.client else None,
+    }
+    if LOGGED_HEADERS:
+        entry["headers"] = _headers(request)
+    if debug:
+        entry["query"] = request.url.query
+        entry["body"] = body
+    logger.info(json.dumps(entry, default=str))
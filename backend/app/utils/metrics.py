@@ -0,0 +1,220 @@
+"""
+In-process latency histograms and gauges for CarePulse.
+
+Everything lives in this process (no prometheus_client dependency); /metrics
+reads summaries from here and /metrics/prometheus renders the text format.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from app.telephony import call_stages
+
+
+# Seconds. Covers fast DB queries up to slow TTS / LLM calls.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *label_values):
+        key = tuple(str(v) for v in label_values)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [bucket counts..., +Inf count, sum]
+                series = [0] * (len(self.buckets) + 1) + [0.0]
+                self._series[key] = series
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += seconds
+
+    @contextmanager
+    def time(self, *label_values):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def _merged(self, label_filter: dict | None = None) -> list:
+        merged = [0] * (len(self.buckets) + 1) + [0.0]
+        with self._lock:
+            for key, series in self._series.items():
+                if label_filter and any(key[self.labels.index(k)] != str(v) for k, v in label_filter.items()):
+                    continue
+                for i, value in enumerate(series):
+                    merged[i] += value
+        return merged
+
+    def summary(self, **label_filter) -> dict:
+        """count / mean / p50 / p95 in ms, quantiles estimated from the buckets."""
+        merged = self._merged(label_filter)
+        counts = merged[:-1]
+        total = sum(counts)
+        if not total:
+            return {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0}
+        return {
+            "count": total,
+            "mean_ms": round(merged[-1] / total * 1000, 2),
+            "p50_ms": round(self._quantile(counts, total, 0.50) * 1000, 2),
+            "p95_ms": round(self._quantile(counts, total, 0.95) * 1000, 2),
+        }
+
+    def _quantile(self, counts: list, total: int, q: float) -> float:
+        rank = q * total
+        seen = 0
+        lower = 0.0
+        for i, bound in enumerate(self.buckets):
+            if counts[i] and seen + counts[i] >= rank:
+                return lower + (bound - lower) * ((rank - seen) / counts[i])
+            seen += counts[i]
+            lower = bound
+        return self.buckets[-1]
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+        for key, series in items:
+            base = [f'{name}="{_escape(value)}"' for name, value in zip(self.labels, key)]
+            cumulative = 0
+            for i, bound in enumerate(self.buckets):
+                cumulative += series[i]
+                lines.append(f"{self.name}_bucket{_labels(base, bound)} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_labels(base, '+Inf')} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(base)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(base)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float):
+        with self._lock:
+            self._value = value
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {self._value}"]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(base: list[str], le=None) -> str:
+    parts = list(base)
+    if le is not None:
+        parts.append(f'le="{le}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+HTTP_LATENCY = Histogram("carepulse_http_request_seconds", "HTTP handler latency.", ("method", "route", "status"))
+DB_QUERY = Histogram("carepulse_db_query_seconds", "Database statement execution time.", ("operation",))
+TTS_SYNTHESIS = Histogram("carepulse_tts_synthesis_seconds", "Edge TTS synthesis time (cache misses only).")
+GROQ_LATENCY = Histogram("carepulse_groq_request_seconds", "Groq chat completion latency.", ("outcome",))
+DEEPGRAM_TIME_TO_FINAL = Histogram("carepulse_deepgram_time_to_final_seconds", "First interim to final transcript.")
+AUDIO_SEND_LAG = Histogram("carepulse_audio_send_lag_seconds", "Outbound audio send time beyond real-time playback.")
+CALL_STAGE = Histogram("carepulse_call_stage_seconds", "Media socket call pipeline stages.", ("stage",))
+ACTIVE_CALLS = Gauge("carepulse_active_calls", "Media stream calls currently connected.")
+ACTIVE_STT_SESSIONS = Gauge("carepulse_active_stt_sessions", "Deepgram streaming sessions currently open.")
+
+METRICS = [
+    HTTP_LATENCY,
+    DB_QUERY,
+    TTS_SYNTHESIS,
+    GROQ_LATENCY,
+    DEEPGRAM_TIME_TO_FINAL,
+    AUDIO_SEND_LAG,
+    CALL_STAGE,
+    ACTIVE_CALLS,
+    ACTIVE_STT_SESSIONS,
+]
+
+
+def _record_call_stage(call_id: str, stage: str, seconds: float):
+    CALL_STAGE.observe(seconds, stage)
+    if stage == call_stages.AUDIO_SEND:
+        AUDIO_SEND_LAG.observe(seconds)
+
+
+call_stages.add_observer(_record_call_stage)
+
+
+def instrument_engine(engine):
+    """Time every statement on `engine` into DB_QUERY, labelled by SQL verb."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("query_started")
+        if not stack:
+            return
+        operation = (statement.lstrip().split(None, 1) or ["OTHER"])[0].upper()
+        DB_QUERY.observe(time.perf_counter() - stack.pop(), operation)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        conn = context.connection
+        stack = conn.info.get("query_started") if conn is not None else None
+        if stack:
+            stack.pop()
+
+
+def render_prometheus() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def performance_summary() -> dict[str, float]:
+    http = HTTP_LATENCY.summary()
+    db = DB_QUERY.summary()
+    turn = CALL_STAGE.summary(stage=call_stages.TURN)
+    return {
+        "avg_response_time_ms": http["mean_ms"],
+        "p95_response_time_ms": http["p95_ms"],
+        "requests_observed": float(http["count"]),
+        "db_query_avg_ms": db["mean_ms"],
+        "db_query_p95_ms": db["p95_ms"],
+        "tts_p95_ms": TTS_SYNTHESIS.summary()["p95_ms"],
+        "groq_p95_ms": GROQ_LATENCY.summary()["p95_ms"],
+        "deepgram_time_to_final_p95_ms": DEEPGRAM_TIME_TO_FINAL.summary()["p95_ms"],
+        "audio_send_lag_p95_ms": AUDIO_SEND_LAG.summary()["p95_ms"],
+        "call_turn_p95_ms": turn["p95_ms"],
+        "active_calls": ACTIVE_CALLS.value,
+    }
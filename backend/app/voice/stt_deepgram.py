@@ -1,12 +1,17 @@
 import asyncio
 import json
+import time
 import urllib.request
 import urllib.error
 
+from app.config import DEEPGRAM_BASE_URL
+from app.utils.metrics import ACTIVE_STT_SESSIONS, DEEPGRAM_TIME_TO_FINAL
+
 
 class DeepgramStreamingSTT:
-    def __init__(self, api_key: str, on_transcript=None, on_activity=None):
+    def __init__(self, api_key: str, on_transcript=None, on_activity=None, base_url: str | None = None):
         self.api_key = api_key
+        self.base_url = (base_url or DEEPGRAM_BASE_URL).rstrip("/")
         self.enabled = bool(api_key)
         self.on_transcript = on_transcript
         self.on_activity = on_activity
@@ -16,6 +21,8 @@ class DeepgramStreamingSTT:
         self._closed = False
         self._lock = asyncio.Lock()
         self._last_interim_log = 0.0
+        self._utterance_started: float | None = None
+        self._counted = False
 
     async def start(self):
         if not self.enabled:
@@ -32,8 +39,9 @@ class DeepgramStreamingSTT:
         if not await self._rest_check():
             print("[Deepgram] REST check failed - but attempting WebSocket anyway...")
 
+        ws_base = self.base_url.replace("https://", "wss://", 1).replace("http://", "ws://", 1)
         url = (
-            "wss://api.deepgram.com/v1/listen"
+            f"{ws_base}/v1/listen"
             "?encoding=mulaw&sample_rate=8000&channels=1"
             "&model=nova-2&language=en&smart_format=true"
             "&interim_results=true&utterance_end_ms=1000"
@@ -57,6 +65,9 @@ class DeepgramStreamingSTT:
                 self.enabled = False
                 return
             print(f"[Deepgram] WebSocket connected OK. Starting receiver...")
+            if not self._counted:
+                self._counted = True
+                ACTIVE_STT_SESSIONS.inc()
 
 
             self._receiver_task = asyncio.create_task(self._receiver())
@@ -72,6 +83,11 @@ class DeepgramStreamingSTT:
                     transcript = data["channel"]["alternatives"][0].get("transcript", "") if data.get("channel") else ""
                     
                     if transcript:
+                        if self._utterance_started is None:
+                            self._utterance_started = time.perf_counter()
+                        if is_final:
+                            DEEPGRAM_TIME_TO_FINAL.observe(time.perf_counter() - self._utterance_started)
+                            self._utterance_started = None
                         print(f"[Deepgram] Got result. is_final={is_final} transcript='{transcript}'")
                         if self.on_activity:
                             asyncio.create_task(self.on_activity())
@@ -117,6 +133,9 @@ class DeepgramStreamingSTT:
             self._closed = True
 
     async def close(self):
+        if self._counted:
+            self._counted = False
+            ACTIVE_STT_SESSIONS.dec()
         try:
             if self._receiver_task:
                 self._receiver_task.cancel()
@@ -131,7 +150,7 @@ class DeepgramStreamingSTT:
     async def _rest_check(self) -> bool:
         def _check():
             req = urllib.request.Request(
-                "https://api.deepgram.com/v1/projects",
+                f"{self.base_url}/v1/projects",
                 headers={"Authorization": f"Token {self.api_key}"}
             )
             try:
@@ -3,12 +3,18 @@ import os
 import tempfile
 import subprocess
 
+from app.utils.metrics import TTS_SYNTHESIS
+
 
 class EdgeTTS:
     def __init__(self, voice: str = "en-US-AriaNeural"):
         self.voice = voice
 
     async def synthesize_ulaw(self, text: str) -> bytes:
+        with TTS_SYNTHESIS.time():
+            return await self._synthesize_ulaw(text)
+
+    async def _synthesize_ulaw(self, text: str) -> bytes:
         try:
             import edge_tts
         except Exception:
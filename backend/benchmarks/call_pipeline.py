@@ -0,0 +1,391 @@
+"""
+Call pipeline benchmark.
+
+Replays recorded calls (benchmarks/recordings/*.json) through
+app.telephony.media_ws.media_socket with stubbed STT, TTS and LLM backends and
+an in-memory SQLite database, then reports per-stage timings from
+app.telephony.call_stages.
+
+Usage (from the backend directory):
+    python -m benchmarks.call_pipeline
+    python -m benchmarks.call_pipeline --iterations 20 --concurrency 4 --llm-latency 0.3 --check
+    python -m benchmarks.call_pipeline --export-from-db 20   # write recordings from real AgentResponse rows
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+# app.db.session builds its engine at import time; give it something valid.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from starlette.websockets import WebSocketDisconnect, WebSocketState  # noqa: E402
+
+from simulator.audio import decode_tag, tagged_frames  # noqa: E402
+from simulator.stats import summarize  # noqa: E402
+
+
+BENCH_DIR = Path(__file__).resolve().parent
+RECORDINGS_DIR = BENCH_DIR / "recordings"
+THRESHOLDS_PATH = BENCH_DIR / "thresholds.json"
+
+
+class StubTTS:
+    def __init__(self, latency: float, ms_per_char: float):
+        self.latency = latency
+        self.bytes_per_char = max(1, int(ms_per_char * 8))  # 8 bytes per ms @ 8kHz mulaw
+
+    async def synthesize_ulaw(self, text: str) -> bytes:
+        await asyncio.sleep(self.latency)
+        return b"\xff" * (len(text or "") * self.bytes_per_char)
+
+
+class StubGroq:
+    """Answers the three prompts media_ws sends without touching the network."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.enabled = True
+
+    async def chat(self, messages: list[dict], temperature: float = 0.2, max_tokens: int = 64):
+        await asyncio.sleep(self.latency)
+        system = messages[0]["content"]
+        user = messages[-1]["content"]
+        if system.startswith("Extract"):
+            allowed = re.search(r"Output only one word: ([^\\]+)", user)
+            words = [w.strip() for w in allowed.group(1).split(",")] if allowed else []
+            transcript = user.rsplit("Patient response:", 1)[-1].lower()
+            for word in words:
+                if word != "unknown" and re.search(rf"\b{re.escape(word)}\b", transcript):
+                    return word
+            return "unknown"
+        if system.startswith("Acknowledge"):
+            return "Thank you for letting me know."
+        question = user.rsplit("Question:", 1)[-1].strip()
+        return question
+
+
+class StubSTT:
+    """Decodes simulator-tagged frames and delivers a final transcript after `latency`."""
+
+    latency = 0.15
+
+    def __init__(self, api_key: str, on_transcript=None, on_activity=None, base_url: str | None = None):
+        self.on_transcript = on_transcript
+        self.on_activity = on_activity
+        self.enabled = True
+        self._ws = True
+        self._tasks: set[asyncio.Task] = set()
+
+    async def start(self):
+        return None
+
+    async def send_audio(self, pcm: bytes):
+        text = decode_tag(pcm)
+        if text and self.on_transcript:
+            task = asyncio.create_task(self._deliver(text))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _deliver(self, text: str):
+        await asyncio.sleep(self.latency)
+        if self.on_activity:
+            await self.on_activity()
+        await self.on_transcript(text)
+
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+
+
+class BenchWebSocket:
+    """Just enough of starlette's WebSocket for media_socket."""
+
+    def __init__(self, query_params: dict):
+        self.query_params = query_params
+        self.client_state = WebSocketState.CONNECTED
+        self.inbound: asyncio.Queue = asyncio.Queue()
+        self.last_outbound: float | None = None
+        self.outbound_frames = 0
+
+    async def accept(self):
+        return None
+
+    async def receive_text(self) -> str:
+        message = await self.inbound.get()
+        if message is None:
+            raise WebSocketDisconnect(code=1000)
+        return message
+
+    async def send_text(self, message: str):
+        self.outbound_frames += 1
+        self.last_outbound = time.monotonic()
+
+    async def close(self):
+        self.client_state = WebSocketState.DISCONNECTED
+
+
+class StageCollector:
+    def __init__(self):
+        self.samples: dict[str, list[float]] = {}
+        self.finalized: dict[str, asyncio.Event] = {}
+
+    def __call__(self, call_id: str, stage: str, seconds: float):
+        self.samples.setdefault(stage, []).append(seconds)
+        if stage == "finalize" and call_id in self.finalized:
+            self.finalized[call_id].set()
+
+
+def _install_stubs(args):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.db.models import Base
+    from app.telephony import media_ws
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    StubSTT.latency = args.stt_latency
+    media_ws.SessionLocal = session_factory
+    media_ws.EdgeTTS = lambda: StubTTS(args.tts_latency, args.audio_ms_per_char)
+    media_ws.GroqClient = lambda **kwargs: StubGroq(args.llm_latency)
+    media_ws.DeepgramStreamingSTT = StubSTT
+    media_ws.hangup_call = lambda call_sid: None
+    media_ws.train_from_db = lambda db: False
+    media_ws.load_model = lambda: None
+    return media_ws, session_factory
+
+
+def _create_patient(session_factory, protocol: str, index: int) -> int:
+    from app.db.models import Patient
+
+    db = session_factory()
+    try:
+        patient = Patient(
+            name=f"Bench Patient {index}",
+            phone_number=f"+1555000{index:04d}",
+            disease_track=protocol,
+            protocol=protocol,
+        )
+        db.add(patient)
+        db.commit()
+        return patient.id
+    finally:
+        db.close()
+
+
+def _media_event(stream_sid: str, frame: bytes) -> str:
+    import base64
+    return json.dumps({
+        "event": "media",
+        "streamSid": stream_sid,
+        "media": {"track": "inbound", "payload": base64.b64encode(frame).decode("ascii")},
+    })
+
+
+async def _wait_idle(ws: BenchWebSocket, idle_gap: float, since: float, timeout: float = 60.0) -> bool:
+    """Wait until the agent has sent audio after `since` and then been quiet for `idle_gap`."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+        last = ws.last_outbound
+        if last is not None and last > since and time.monotonic() - last >= idle_gap:
+            return True
+    return False
+
+
+async def replay_call(media_ws, session_factory, collector: StageCollector, recording: dict, index: int, args) -> list[str]:
+    protocol = recording["protocol"]
+    patient_id = _create_patient(session_factory, protocol, index)
+    call_id = f"bench-{index}"
+    stream_sid = f"MZbench{index}"
+    ws = BenchWebSocket({"call_id": call_id, "protocol": protocol, "patient_id": str(patient_id)})
+    collector.finalized[call_id] = asyncio.Event()
+    errors = []
+
+    socket_task = asyncio.create_task(media_ws.media_socket(ws))
+    started = time.monotonic()
+    await ws.inbound.put(json.dumps({
+        "event": "start",
+        "streamSid": stream_sid,
+        "start": {"streamSid": stream_sid, "callSid": call_id, "customParameters": {}},
+    }))
+
+    since = started
+    for answer in recording["answers"]:
+        if not await _wait_idle(ws, args.idle_gap, since):
+            errors.append(f"{recording['name']}: agent silent before {answer['intent_id']}")
+            break
+        since = time.monotonic()
+        frame = tagged_frames(answer["text"], speech_seconds=0.02)[0]
+        await ws.inbound.put(_media_event(stream_sid, frame))
+
+    try:
+        await asyncio.wait_for(collector.finalized[call_id].wait(), timeout=60)
+    except asyncio.TimeoutError:
+        errors.append(f"{recording['name']}: call never finalized")
+    await ws.inbound.put(json.dumps({"event": "stop", "streamSid": stream_sid}))
+    await ws.inbound.put(None)
+    try:
+        await asyncio.wait_for(socket_task, timeout=10)
+    except asyncio.TimeoutError:
+        socket_task.cancel()
+        errors.append(f"{recording['name']}: media socket did not exit")
+    collector.finalized.pop(call_id, None)
+    return errors
+
+
+def load_recordings(path: Path, names: list[str] | None = None) -> list[dict]:
+    files = [path] if path.is_file() else sorted(path.glob("*.json"))
+    recordings = []
+    for f in files:
+        with open(f, encoding="utf-8") as fh:
+            data = json.load(fh)
+        data.setdefault("name", f.stem)
+        if names and data["name"] not in names:
+            continue
+        recordings.append(data)
+    return recordings
+
+
+def export_from_db(limit: int, out_dir: Path) -> int:
+    """Write recordings from the most recent calls in DATABASE_URL (raw transcripts per intent)."""
+    from app.db.models import AgentResponse, PatientCall
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    written = 0
+    try:
+        calls = db.query(PatientCall).order_by(PatientCall.id.desc()).limit(limit).all()
+        for call in calls:
+            rows = (
+                db.query(AgentResponse)
+                .filter(AgentResponse.call_id == call.id)
+                .order_by(AgentResponse.id.asc())
+                .all()
+            )
+            answers = [{"intent_id": r.intent_id, "text": r.raw_text} for r in rows if r.raw_text]
+            if not answers:
+                continue
+            name = f"db_call_{call.id}"
+            out_dir.mkdir(parents=True, exist_ok=True)
+            with open(out_dir / f"{name}.json", "w", encoding="utf-8") as f:
+                json.dump({"name": name, "protocol": call.diagnosis or "GENERAL_MONITORING", "answers": answers}, f, indent=2)
+            written += 1
+    finally:
+        db.close()
+    return written
+
+
+async def run(args) -> dict:
+    from app.telephony import call_stages
+
+    media_ws, session_factory = _install_stubs(args)
+    recordings = load_recordings(Path(args.recordings), args.only)
+    if not recordings:
+        raise SystemExit(f"No recordings found in {args.recordings}")
+
+    collector = StageCollector()
+    call_stages.add_observer(collector)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    errors: list[str] = []
+
+    async def _one(i: int, recording: dict):
+        async with semaphore:
+            if not args.warm_cache:
+                media_ws.TTS_CACHE.clear()
+            errors.extend(await replay_call(media_ws, session_factory, collector, recording, i, args))
+
+    jobs = [(i, rec) for i, rec in enumerate(recordings * args.iterations)]
+    started = time.monotonic()
+    try:
+        await asyncio.gather(*(_one(i, rec) for i, rec in jobs))
+    finally:
+        call_stages.remove_observer(collector)
+
+    return {
+        "calls": len(jobs),
+        "wall_seconds": round(time.monotonic() - started, 2),
+        "stages": {stage: summarize(collector.samples.get(stage, [])) for stage in call_stages.STAGES},
+        "errors": errors,
+    }
+
+
+def check_thresholds(report: dict, thresholds: dict) -> list[str]:
+    failures = []
+    for stage, limit in thresholds.items():
+        if stage.startswith("_"):
+            continue
+        p95 = report["stages"].get(stage, {}).get("p95")
+        if p95 is not None and p95 > limit:
+            failures.append(f"{stage}: p95 {p95}ms > {limit}ms")
+    return failures
+
+
+def print_report(report: dict, thresholds: dict):
+    print(f"Calls: {report['calls']}  wall: {report['wall_seconds']}s")
+    print(f"{'stage':<22}{'n':>6}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'limit':>10}")
+    for stage, s in report["stages"].items():
+        cells = [s[k] if s[k] is not None else "-" for k in ("mean", "p50", "p95", "p99", "max")]
+        limit = thresholds.get(stage, "-")
+        print(f"{stage:<22}{s['count']:>6}" + "".join(f"{c:>10}" for c in cells) + f"{limit:>10}")
+    for error in report["errors"]:
+        print(f"  error: {error}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the media socket call pipeline per stage.")
+    parser.add_argument("--recordings", default=str(RECORDINGS_DIR), help="Recording file or directory.")
+    parser.add_argument("--only", nargs="*", help="Recording names to replay.")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--tts-latency", type=float, default=0.08)
+    parser.add_argument("--llm-latency", type=float, default=0.12)
+    parser.add_argument("--stt-latency", type=float, default=0.15)
+    parser.add_argument("--audio-ms-per-char", type=float, default=2.0, help="Length of stub TTS audio.")
+    parser.add_argument("--idle-gap", type=float, help="Agent silence before the next answer (default from latencies).")
+    parser.add_argument("--warm-cache", action="store_true", help="Keep the TTS cache between calls.")
+    parser.add_argument("--thresholds", default=str(THRESHOLDS_PATH))
+    parser.add_argument("--check", action="store_true", help="Exit non-zero when a stage p95 exceeds its threshold.")
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--export-from-db", type=int, metavar="N", help="Write N recent calls as recordings and exit.")
+    args = parser.parse_args()
+
+    if args.export_from_db:
+        written = export_from_db(args.export_from_db, Path(args.recordings))
+        print(f"Wrote {written} recordings to {args.recordings}")
+        return 0
+
+    if args.idle_gap is None:
+        # Must exceed the pause between the ack and the next question (LLM rephrase + TTS).
+        args.idle_gap = 2 * (args.llm_latency + args.tts_latency) + 0.25
+
+    thresholds = {}
+    if args.thresholds and Path(args.thresholds).exists():
+        with open(args.thresholds, encoding="utf-8") as f:
+            thresholds = json.load(f)
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, {k: v for k, v in thresholds.items() if not k.startswith("_")})
+
+    failed = bool(report["errors"])
+    if args.check:
+        failures = check_thresholds(report, thresholds)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        failed = failed or bool(failures)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
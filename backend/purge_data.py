@@ -3,36 +3,27 @@ Purge All System Data
 Deletes all patients, calls, risks, and users except for the primary admin.
 """
 
+from sqlalchemy import select
+
 from app.db.session import SessionLocal
 from app.db.models import (
-    User, Patient, PatientCall, AgentResponse, CallLog, 
-    ReadmissionRisk, Call, SessionToken, CareAssignment, 
-    Intervention, AuditEvent, MedicationReminder, MedicationEvent, 
-    PasswordReset, PendingRegistration, NurseCallAssignment, 
-    ResponseCorrection, AlertAction, Notification
+    User, Patient, PatientCall, AgentResponse, CallLog, ReadmissionRisk, Call,
+    SessionToken, AuditEvent, PasswordReset, PendingRegistration, Notification
 )
+from app.db.patient_archive import delete_patients
 
 def purge_system_data():
     db = SessionLocal()
     print("Starting system data purge...")
     
     try:
-        # 1. Delete all transactional/patient data
+        # 1. Delete all transactional/patient data, in chunks, children first
         print("Cleaning up patient and call data...")
-        db.query(MedicationEvent).delete()
-        db.query(MedicationReminder).delete()
-        db.query(ResponseCorrection).delete()
-        db.query(NurseCallAssignment).delete()
-        db.query(AlertAction).delete()
-        db.query(Notification).delete()
-        db.query(Intervention).delete()
-        db.query(CareAssignment).delete()
-        db.query(ReadmissionRisk).delete()
-        db.query(AgentResponse).delete()
-        db.query(CallLog).delete()
-        db.query(PatientCall).delete()
-        db.query(Call).delete()
-        db.query(Patient).delete()
+        summary = delete_patients(db, select(Patient.id), archive=False)
+        print(f"Deleted: {summary['deleted']}")
+        # Rows not tied to any patient (unlinked calls, system notifications)
+        for model in (Notification, ReadmissionRisk, AgentResponse, CallLog, PatientCall, Call):
+            db.query(model).delete()
         
         # 2. Clean up users
         print("Cleaning up user accounts (preserving admin)...")
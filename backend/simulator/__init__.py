@@ -0,0 +1,11 @@
+"""
+Local Twilio simulator for CarePulse end-to-end load tests.
+
+Provides a fake Twilio REST API and a fake Deepgram listen endpoint that the
+backend can be pointed at (TWILIO_API_BASE_URL / DEEPGRAM_BASE_URL), plus a
+media-stream client that plays scripted mu-law answers into /telephony/media.
+
+Usage (from the backend directory):
+    python -m simulator serve --port 8100
+    python -m simulator load --target http://127.0.0.1:8000 --patient-ids 1,2 --calls 20 --concurrency 5
+"""
@@ -0,0 +1,69 @@
+import argparse
+import sys
+
+
+def _serve(args) -> int:
+    try:
+        import uvicorn
+    except Exception:
+        print("uvicorn not installed.")
+        return 1
+    from simulator.fake_services import SimulatorOptions, create_app
+
+    options = SimulatorOptions(
+        target=args.target.rstrip("/"),
+        stt_final_delay=args.stt_delay,
+        med_digits=args.digits,
+        answer_gap=args.answer_gap,
+        speech_seconds=args.speech_seconds,
+        drive_calls=not args.no_drive,
+    )
+    uvicorn.run(create_app(options=options), host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+def _add_call_options(parser: argparse.ArgumentParser):
+    parser.add_argument("--target", default="http://127.0.0.1:8000", help="Backend base URL.")
+    parser.add_argument("--stt-delay", type=float, default=0.3, help="Fake Deepgram interim->final delay (s).")
+    parser.add_argument("--digits", default="1", help="DTMF digits for medication IVR calls.")
+    parser.add_argument("--answer-gap", type=float, default=1.5, help="Agent silence before answering (s).")
+    parser.add_argument("--speech-seconds", type=float, default=1.0, help="Length of each scripted answer (s).")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="simulator", description="Local Twilio simulator for CarePulse.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="Run the fake Twilio REST API and Deepgram endpoint.")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8100)
+    serve.add_argument("--no-drive", action="store_true", help="Accept calls without driving them.")
+    _add_call_options(serve)
+
+    load = sub.add_parser("load", help="Open N simulated calls and report latency/capacity.")
+    _add_call_options(load)
+    load.add_argument("--kind", choices=["voice", "medication"], default="voice")
+    load.add_argument("--protocol", default="GENERAL_MONITORING")
+    load.add_argument("--patient-ids", default="", help="Comma separated patient ids, used round-robin.")
+    load.add_argument("--reminder-ids", default="", help="Comma separated reminder ids (medication calls).")
+    load.add_argument("--calls", type=int, default=10)
+    load.add_argument("--concurrency", type=int, default=5)
+    load.add_argument("--ramp", type=float, default=0.0, help="Delay between call starts (s).")
+    load.add_argument("--script", help="JSON answer script (see simulator/script.py).")
+    load.add_argument("--answer-mode", choices=["tagged", "recording"], default="tagged")
+    load.add_argument("--listen-host", default="127.0.0.1")
+    load.add_argument("--listen-port", type=int, default=8100)
+    load.add_argument("--no-fakes", action="store_true", help="Backend uses real Twilio/Deepgram; skip hangup checks.")
+    load.add_argument("--max-p95-ms", type=float, help="Fail if turn latency p95 exceeds this.")
+    load.add_argument("--allow-failures", action="store_true")
+    load.add_argument("--json", action="store_true")
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        return _serve(args)
+    from simulator.load import main as load_main
+    return load_main(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
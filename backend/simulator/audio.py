@@ -0,0 +1,49 @@
+"""
+mu-law frame helpers shared by the media client and the fake Deepgram endpoint.
+
+Scripted answers are sent as "tagged" frames: a short marker followed by the
+answer text, padded with mu-law silence. The fake Deepgram endpoint decodes the
+marker and replies with a final transcript, so no real speech recognition is
+needed. Real recordings (8 kHz mono mu-law) can be played instead when the
+backend talks to the real Deepgram.
+"""
+from pathlib import Path
+
+FRAME_BYTES = 160  # 20ms @ 8kHz mulaw, same chunk size the backend sends
+FRAME_SECONDS = 0.02
+SILENCE_BYTE = b"\xff"
+SILENCE_FRAME = SILENCE_BYTE * FRAME_BYTES
+TAG = b"SIMTXT:"
+
+
+def frames(ulaw: bytes) -> list[bytes]:
+    out = []
+    for i in range(0, len(ulaw), FRAME_BYTES):
+        chunk = ulaw[i:i + FRAME_BYTES]
+        if len(chunk) < FRAME_BYTES:
+            chunk = chunk + SILENCE_BYTE * (FRAME_BYTES - len(chunk))
+        out.append(chunk)
+    return out
+
+
+def tagged_frames(text: str, speech_seconds: float = 1.0) -> list[bytes]:
+    """Frames carrying `text` for the fake Deepgram, padded to roughly `speech_seconds`."""
+    body = TAG + text.encode("utf-8")[:FRAME_BYTES - len(TAG) - 1] + b"\x00"
+    first = body + SILENCE_BYTE * (FRAME_BYTES - len(body))
+    count = max(1, int(speech_seconds / FRAME_SECONDS))
+    return [first] + [SILENCE_FRAME] * (count - 1)
+
+
+def decode_tag(chunk: bytes) -> str | None:
+    idx = chunk.find(TAG)
+    if idx < 0:
+        return None
+    start = idx + len(TAG)
+    end = chunk.find(b"\x00", start)
+    if end < 0:
+        end = len(chunk)
+    return chunk[start:end].decode("utf-8", errors="ignore") or None
+
+
+def load_ulaw(path: str) -> list[bytes]:
+    return frames(Path(path).read_bytes())
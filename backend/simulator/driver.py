@@ -0,0 +1,173 @@
+"""
+Drive one call against the backend the way Twilio does: fetch the voice
+webhook, follow the TwiML, then play the media stream or answer the IVR.
+"""
+import asyncio
+import time
+import urllib.error
+import urllib.request
+import xml.etree.ElementTree as ET
+from urllib.parse import parse_qs, urlencode, urlsplit, urlunsplit
+
+from simulator.media_client import CallResult, SimulatedCall
+from simulator.script import CallScript, build_script, load_script_file
+
+
+def _ws_base(url: str) -> str:
+    if url.startswith("https://"):
+        return url.replace("https://", "wss://", 1)
+    if url.startswith("http://"):
+        return url.replace("http://", "ws://", 1)
+    return url
+
+
+def retarget(url: str, target: str) -> str:
+    """Keep path and query of `url` but send it to `target` (BASE_URL is usually a public tunnel)."""
+    parts = urlsplit(url)
+    base = urlsplit(target)
+    scheme = base.scheme
+    if parts.scheme in ("ws", "wss"):
+        scheme = "wss" if base.scheme == "https" else "ws"
+    return urlunsplit((scheme, base.netloc, parts.path, parts.query, ""))
+
+
+def _post_form(url: str, data: dict, timeout: float = 15) -> tuple[int | None, str]:
+    req = urllib.request.Request(
+        url,
+        data=urlencode(data).encode("utf-8"),
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.status, resp.read().decode("utf-8")
+    except urllib.error.HTTPError as e:
+        try:
+            body = e.read().decode("utf-8")
+        except Exception:
+            body = ""
+        return e.code, body
+    except Exception as e:
+        return None, str(e)
+
+
+async def post_form(url: str, data: dict) -> tuple[int | None, str]:
+    return await asyncio.to_thread(_post_form, url, data)
+
+
+def _twilio_form(call_sid: str, status: str = "in-progress") -> dict:
+    return {
+        "CallSid": call_sid,
+        "AccountSid": "ACsimulator",
+        "From": "+15005550006",
+        "To": "+15005550001",
+        "CallStatus": status,
+        "Direction": "outbound-api",
+    }
+
+
+def parse_stream(twiml: str) -> tuple[str | None, dict]:
+    root = ET.fromstring(twiml)
+    stream = root.find("./Connect/Stream")
+    if stream is None:
+        return None, {}
+    params = {p.get("name"): p.get("value") for p in stream.findall("Parameter") if p.get("name")}
+    return stream.get("url"), params
+
+
+def parse_gather_action(twiml: str) -> str | None:
+    root = ET.fromstring(twiml)
+    gather = root.find("./Gather")
+    return gather.get("action") if gather is not None else None
+
+
+async def run_voice_call(
+    voice_url: str,
+    call_sid: str,
+    target: str,
+    hangup: asyncio.Event | None = None,
+    script: CallScript | None = None,
+    script_file: str | None = None,
+    answer_mode: str = "tagged",
+    answer_gap: float = 1.5,
+    speech_seconds: float = 1.0,
+) -> CallResult:
+    result = CallResult(call_sid=call_sid, kind="voice")
+    status, body = await post_form(retarget(voice_url, target), _twilio_form(call_sid))
+    if status != 200:
+        result.errors.append(f"voice webhook returned {status}: {body[:200]}")
+        return result
+    try:
+        stream_url, custom = parse_stream(body)
+    except ET.ParseError as e:
+        result.errors.append(f"voice webhook returned invalid TwiML: {e}")
+        return result
+    if not stream_url:
+        result.errors.append("voice webhook did not connect a media stream")
+        return result
+
+    query = {k: v[0] for k, v in parse_qs(urlsplit(stream_url).query).items()}
+    protocol = custom.get("protocol") or query.get("protocol") or "GENERAL_MONITORING"
+    if script is None:
+        script = load_script_file(script_file, protocol) if script_file else build_script(protocol)
+
+    call = SimulatedCall(
+        retarget(stream_url, target),
+        call_sid,
+        script,
+        custom_parameters=custom,
+        answer_mode=answer_mode,
+        answer_gap=answer_gap,
+        speech_seconds=speech_seconds,
+        expect_hangup=hangup is not None,
+    )
+    if hangup is not None:
+        call.hangup = hangup
+    return await call.run()
+
+
+async def run_med_call(
+    ivr_url: str,
+    call_sid: str,
+    target: str | None = None,
+    digits: str = "1",
+    status_callback: str | None = None,
+) -> CallResult:
+    started = time.monotonic()
+    result = CallResult(call_sid=call_sid, kind="medication", expected_answers=1)
+    if target:
+        ivr_url = retarget(ivr_url, target)
+    status, body = await post_form(ivr_url, _twilio_form(call_sid))
+    result.intro_latency = time.monotonic() - started
+    if status != 200:
+        result.errors.append(f"med-ivr returned {status}: {body[:200]}")
+        return result
+    try:
+        action = parse_gather_action(body)
+    except ET.ParseError as e:
+        result.errors.append(f"med-ivr returned invalid TwiML: {e}")
+        return result
+    if not action:
+        result.errors.append("med-ivr did not gather digits")
+        return result
+
+    sent = time.monotonic()
+    form = _twilio_form(call_sid)
+    form["Digits"] = digits
+    status, body = await post_form(retarget(action, target or ivr_url), form)
+    result.answers_sent = 1
+    result.turn_latencies.append(time.monotonic() - sent)
+    if status != 200 or "<Say" not in body:
+        result.errors.append(f"med-ivr handle returned {status}: {body[:200]}")
+
+    if status_callback:
+        status, body = await post_form(
+            retarget(status_callback, target or ivr_url), _twilio_form(call_sid, status="completed")
+        )
+        if status != 200:
+            result.errors.append(f"status callback returned {status}: {body[:200]}")
+
+    result.hung_up = True
+    result.duration = time.monotonic() - started
+    result.ok = not result.errors
+    return result
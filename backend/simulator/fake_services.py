@@ -0,0 +1,206 @@
+"""
+Fake Twilio REST API and fake Deepgram listen endpoint.
+
+Point the backend at this app with
+    TWILIO_API_BASE_URL=http://127.0.0.1:8100
+    DEEPGRAM_BASE_URL=http://127.0.0.1:8100
+(TWILIO_ACCOUNT_SID / TWILIO_AUTH_TOKEN / DEEPGRAM_API_KEY just need to be non-empty).
+
+Calls created through the REST API are driven against the backend the same way
+Twilio would: the voice webhook is fetched, the returned TwiML is followed and
+the media stream / IVR gather is played by the simulator.
+"""
+import asyncio
+import json
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
+
+from simulator.audio import decode_tag
+from simulator.media_client import CallResult
+
+
+@dataclass
+class SimulatorOptions:
+    target: str = "http://127.0.0.1:8000"
+    stt_final_delay: float = 0.3
+    med_digits: str = "1"
+    answer_gap: float = 1.5
+    speech_seconds: float = 1.0
+    drive_calls: bool = True
+
+
+@dataclass
+class CallRegistry:
+    hangups: dict[str, asyncio.Event] = field(default_factory=dict)
+    results: list[CallResult] = field(default_factory=list)
+    calls_created: int = 0
+    hangups_requested: int = 0
+    sms_sent: int = 0
+    stt_sessions: int = 0
+    transcripts: int = 0
+
+    def register(self, call_sid: str) -> asyncio.Event:
+        event = self.hangups.setdefault(call_sid, asyncio.Event())
+        return event
+
+    def hangup(self, call_sid: str):
+        self.hangups_requested += 1
+        event = self.hangups.get(call_sid)
+        if event:
+            event.set()
+
+    def release(self, call_sid: str):
+        self.hangups.pop(call_sid, None)
+
+    def stats(self) -> dict:
+        return {
+            "calls_created": self.calls_created,
+            "hangups_requested": self.hangups_requested,
+            "sms_sent": self.sms_sent,
+            "stt_sessions": self.stt_sessions,
+            "transcripts": self.transcripts,
+            "active_calls": len(self.hangups),
+            "results": [asdict(r) for r in self.results[-50:]],
+        }
+
+
+def _call_resource(account_sid: str, call_sid: str, to: str, from_: str, status: str) -> dict:
+    return {
+        "sid": call_sid,
+        "account_sid": account_sid,
+        "to": to,
+        "from": from_,
+        "status": status,
+        "direction": "outbound-api",
+        "api_version": "2010-04-01",
+        "date_created": time.strftime("%a, %d %b %Y %H:%M:%S +0000", time.gmtime()),
+        "uri": f"/2010-04-01/Accounts/{account_sid}/Calls/{call_sid}.json",
+    }
+
+
+def create_app(registry: CallRegistry | None = None, options: SimulatorOptions | None = None) -> FastAPI:
+    registry = registry or CallRegistry()
+    options = options or SimulatorOptions()
+    app = FastAPI(title="CarePulse Twilio Simulator")
+    app.state.registry = registry
+    app.state.options = options
+    background: set[asyncio.Task] = set()
+
+    async def _drive(call_sid: str, url: str, status_callback: str | None):
+        from simulator.driver import run_med_call, run_voice_call
+
+        hangup = registry.register(call_sid)
+        try:
+            if "/telephony/med-ivr" in url:
+                result = await run_med_call(
+                    url,
+                    call_sid,
+                    target=options.target,
+                    digits=options.med_digits,
+                    status_callback=status_callback,
+                )
+            else:
+                result = await run_voice_call(
+                    url,
+                    call_sid,
+                    target=options.target,
+                    hangup=hangup,
+                    answer_gap=options.answer_gap,
+                    speech_seconds=options.speech_seconds,
+                )
+            registry.results.append(result)
+            print(f"[simulator] call {call_sid} ok={result.ok} errors={result.errors}")
+        except Exception as e:
+            print(f"[simulator] call {call_sid} failed: {e}")
+        finally:
+            registry.release(call_sid)
+
+    @app.post("/2010-04-01/Accounts/{account_sid}/Calls.json")
+    async def create_call(account_sid: str, request: Request):
+        form = await request.form()
+        call_sid = f"CA{uuid.uuid4().hex}"
+        registry.calls_created += 1
+        url = form.get("Url") or ""
+        if options.drive_calls and url:
+            task = asyncio.create_task(_drive(call_sid, url, form.get("StatusCallback")))
+            background.add(task)
+            task.add_done_callback(background.discard)
+        body = _call_resource(account_sid, call_sid, form.get("To") or "", form.get("From") or "", "queued")
+        return JSONResponse(body, status_code=201)
+
+    @app.post("/2010-04-01/Accounts/{account_sid}/Calls/{call_sid}.json")
+    async def update_call(account_sid: str, call_sid: str, request: Request):
+        form = await request.form()
+        status = form.get("Status") or "in-progress"
+        if status == "completed":
+            registry.hangup(call_sid)
+        return JSONResponse(_call_resource(account_sid, call_sid, "", "", status))
+
+    @app.post("/2010-04-01/Accounts/{account_sid}/Messages.json")
+    async def create_message(account_sid: str, request: Request):
+        form = await request.form()
+        registry.sms_sent += 1
+        return JSONResponse({
+            "sid": f"SM{uuid.uuid4().hex}",
+            "account_sid": account_sid,
+            "to": form.get("To"),
+            "from": form.get("From"),
+            "body": form.get("Body"),
+            "status": "queued",
+        }, status_code=201)
+
+    @app.get("/v1/projects")
+    async def deepgram_projects():
+        return {"projects": [{"project_id": "simulator", "name": "simulator"}]}
+
+    @app.websocket("/v1/listen")
+    async def deepgram_listen(ws: WebSocket):
+        await ws.accept()
+        registry.stt_sessions += 1
+
+        async def _final(text: str):
+            await asyncio.sleep(options.stt_final_delay)
+            await ws.send_text(json.dumps({
+                "type": "Results",
+                "is_final": True,
+                "speech_final": True,
+                "channel": {"alternatives": [{"transcript": text, "confidence": 0.99}]},
+            }))
+            registry.transcripts += 1
+
+        pending: set[asyncio.Task] = set()
+        try:
+            while True:
+                message = await ws.receive()
+                if message.get("type") == "websocket.disconnect":
+                    break
+                chunk = message.get("bytes")
+                if not chunk:
+                    # KeepAlive / CloseStream text frames
+                    continue
+                text = decode_tag(chunk)
+                if not text:
+                    continue
+                await ws.send_text(json.dumps({
+                    "type": "Results",
+                    "is_final": False,
+                    "channel": {"alternatives": [{"transcript": text, "confidence": 0.9}]},
+                }))
+                task = asyncio.create_task(_final(text))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @app.get("/simulator/stats")
+    async def simulator_stats():
+        return registry.stats()
+
+    return app
@@ -0,0 +1,169 @@
+"""
+Open N simulated calls against a running backend and report capacity numbers.
+
+The fake Twilio/Deepgram app is served in-process on --listen-port so hangups
+requested by the backend reach the same registry the calls wait on. Start the
+backend with TWILIO_API_BASE_URL / DEEPGRAM_BASE_URL pointing at that port.
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from urllib.parse import urlencode
+
+from simulator.driver import run_med_call, run_voice_call
+from simulator.fake_services import CallRegistry, SimulatorOptions, create_app
+from simulator.media_client import CallResult
+from simulator.script import build_script, load_script_file
+from simulator.stats import summarize
+
+
+async def _serve_fakes(registry: CallRegistry, options: SimulatorOptions, host: str, port: int):
+    try:
+        import uvicorn
+    except Exception:
+        print("uvicorn not installed. Fake Twilio/Deepgram services not started.")
+        return None, None
+    config = uvicorn.Config(create_app(registry, options), host=host, port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    for _ in range(100):
+        if server.started:
+            break
+        await asyncio.sleep(0.05)
+    return server, task
+
+
+def _voice_url(target: str, index: int, protocol: str, patient_id: str | None) -> str:
+    params = {"call_id": f"sim-{index}-{uuid.uuid4().hex[:8]}", "protocol": protocol}
+    if patient_id:
+        params["patient_id"] = patient_id
+    return f"{target}/telephony/voice?{urlencode(params)}"
+
+
+def build_report(results: list[CallResult], wall_seconds: float, concurrency: int, peak_active: int) -> dict:
+    cores = os.cpu_count() or 1
+    completed = [r for r in results if r.ok]
+    turn_latencies = [lat for r in results for lat in r.turn_latencies]
+    intro_latencies = [r.intro_latency for r in results if r.intro_latency is not None]
+    errors: dict[str, int] = {}
+    for r in results:
+        for e in r.errors:
+            errors[e] = errors.get(e, 0) + 1
+    return {
+        "calls": len(results),
+        "completed": len(completed),
+        "failed": len(results) - len(completed),
+        "concurrency": concurrency,
+        "peak_active_calls": peak_active,
+        "cpu_count": cores,
+        "concurrent_calls_per_core": round(peak_active / cores, 2),
+        "wall_seconds": round(wall_seconds, 2),
+        "calls_per_minute": round(len(completed) / wall_seconds * 60, 2) if wall_seconds else None,
+        "intro_latency_ms": summarize(intro_latencies),
+        "turn_latency_ms": summarize(turn_latencies),
+        "call_duration_ms": summarize([r.duration for r in results]),
+        "errors": errors,
+    }
+
+
+async def run_load(args) -> dict:
+    target = args.target.rstrip("/")
+    options = SimulatorOptions(
+        target=target,
+        stt_final_delay=args.stt_delay,
+        med_digits=args.digits,
+        answer_gap=args.answer_gap,
+        speech_seconds=args.speech_seconds,
+    )
+    registry = CallRegistry()
+    server = task = None
+    if not args.no_fakes:
+        server, task = await _serve_fakes(registry, options, args.listen_host, args.listen_port)
+
+    patient_ids = [p.strip() for p in (args.patient_ids or "").split(",") if p.strip()]
+    reminder_ids = [r.strip() for r in (args.reminder_ids or "").split(",") if r.strip()]
+    if args.kind == "medication" and not reminder_ids:
+        raise SystemExit("--reminder-ids is required for medication calls")
+
+    script = None
+    if args.kind == "voice":
+        script = load_script_file(args.script, args.protocol) if args.script else build_script(args.protocol)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    active = 0
+    peak_active = 0
+
+    async def _one(index: int) -> CallResult:
+        nonlocal active, peak_active
+        if args.ramp:
+            await asyncio.sleep(index * args.ramp)
+        async with semaphore:
+            active += 1
+            peak_active = max(peak_active, active)
+            call_sid = f"CA{uuid.uuid4().hex}"
+            try:
+                if args.kind == "medication":
+                    reminder_id = reminder_ids[index % len(reminder_ids)]
+                    return await run_med_call(
+                        f"{target}/telephony/med-ivr?reminder_id={reminder_id}",
+                        call_sid,
+                        digits=args.digits,
+                        status_callback=f"{target}/telephony/status/medication?reminder_id={reminder_id}",
+                    )
+                patient_id = patient_ids[index % len(patient_ids)] if patient_ids else None
+                hangup = None if args.no_fakes else registry.register(call_sid)
+                try:
+                    return await run_voice_call(
+                        _voice_url(target, index, args.protocol, patient_id),
+                        call_sid,
+                        target=target,
+                        hangup=hangup,
+                        script=script,
+                        answer_mode=args.answer_mode,
+                        answer_gap=args.answer_gap,
+                        speech_seconds=args.speech_seconds,
+                    )
+                finally:
+                    registry.release(call_sid)
+            finally:
+                active -= 1
+
+    started = time.monotonic()
+    results = await asyncio.gather(*(_one(i) for i in range(args.calls)))
+    wall = time.monotonic() - started
+
+    if server is not None:
+        server.should_exit = True
+        await task
+    return build_report(list(results), wall, args.concurrency, peak_active)
+
+
+def print_report(report: dict):
+    print(f"Calls: {report['calls']}  completed: {report['completed']}  failed: {report['failed']}")
+    print(
+        f"Concurrency: {report['concurrency']}  peak active: {report['peak_active_calls']}  "
+        f"cores: {report['cpu_count']}  calls/core: {report['concurrent_calls_per_core']}"
+    )
+    print(f"Wall time: {report['wall_seconds']}s  throughput: {report['calls_per_minute']} calls/min")
+    for key in ("intro_latency_ms", "turn_latency_ms", "call_duration_ms"):
+        s = report[key]
+        print(f"{key}: n={s['count']} p50={s['p50']} p95={s['p95']} p99={s['p99']} max={s['max']}")
+    for error, count in sorted(report["errors"].items(), key=lambda kv: -kv[1]):
+        print(f"  error x{count}: {error}")
+
+
+def main(args) -> int:
+    report = asyncio.run(run_load(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    failed = report["failed"] > 0 and not args.allow_failures
+    p95 = report["turn_latency_ms"]["p95"]
+    if args.max_p95_ms is not None and p95 is not None and p95 > args.max_p95_ms:
+        print(f"Turn latency p95 {p95}ms exceeds limit {args.max_p95_ms}ms")
+        failed = True
+    return 1 if failed else 0
@@ -0,0 +1,223 @@
+"""
+Media-stream client that behaves like Twilio on /telephony/media.
+
+Streams 20ms inbound frames continuously (silence unless an answer is playing),
+waits for the agent to finish speaking before answering, and measures the
+latency between the end of each answer and the first agent audio after it.
+"""
+import asyncio
+import base64
+import json
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+
+from simulator.audio import FRAME_SECONDS, SILENCE_FRAME, load_ulaw, tagged_frames
+from simulator.script import CallScript
+
+
+AGENT_BURST_GAP_SECONDS = 0.3
+
+
+@dataclass
+class CallResult:
+    call_sid: str
+    kind: str = "voice"
+    ok: bool = False
+    errors: list[str] = field(default_factory=list)
+    answers_sent: int = 0
+    expected_answers: int = 0
+    agent_bursts: int = 0
+    intro_latency: float | None = None
+    turn_latencies: list[float] = field(default_factory=list)
+    hung_up: bool = False
+    duration: float = 0.0
+
+
+class SimulatedCall:
+    def __init__(
+        self,
+        ws_url: str,
+        call_sid: str,
+        script: CallScript,
+        custom_parameters: dict | None = None,
+        answer_mode: str = "tagged",
+        answer_gap: float = 1.5,
+        speech_seconds: float = 1.0,
+        timeout: float = 600.0,
+        expect_hangup: bool = True,
+    ):
+        self.ws_url = ws_url
+        self.call_sid = call_sid
+        self.stream_sid = f"MZ{uuid.uuid4().hex}"
+        self.script = script
+        self.custom_parameters = custom_parameters or {}
+        self.answer_mode = answer_mode
+        self.answer_gap = answer_gap
+        self.speech_seconds = speech_seconds
+        self.timeout = timeout
+        self.expect_hangup = expect_hangup
+        self.hangup = asyncio.Event()
+        self.result = CallResult(call_sid=call_sid, expected_answers=script.expected_questions)
+
+        self._outgoing: deque[bytes] = deque()
+        self._answering = False
+        self._awaiting_since: float | None = None
+        self._last_agent_audio: float | None = None
+        self._agent_speaking = False
+        self._closed = False
+        self._seq = 0
+
+    def _answer_frames(self, answer: dict) -> list[bytes]:
+        path = self.script.recordings.get(answer["intent_id"])
+        if self.answer_mode == "recording" and path:
+            return load_ulaw(path)
+        return tagged_frames(answer["text"], self.speech_seconds)
+
+    def _next_seq(self) -> str:
+        self._seq += 1
+        return str(self._seq)
+
+    async def _send(self, ws, message: dict):
+        await ws.send(json.dumps(message))
+
+    async def _sender(self, ws):
+        chunk = 0
+        next_at = time.monotonic()
+        while not self._closed:
+            frame = self._outgoing.popleft() if self._outgoing else SILENCE_FRAME
+            chunk += 1
+            try:
+                await self._send(ws, {
+                    "event": "media",
+                    "sequenceNumber": self._next_seq(),
+                    "streamSid": self.stream_sid,
+                    "media": {
+                        "track": "inbound",
+                        "chunk": str(chunk),
+                        "timestamp": str(int(chunk * FRAME_SECONDS * 1000)),
+                        "payload": base64.b64encode(frame).decode("ascii"),
+                    },
+                })
+            except Exception:
+                self._closed = True
+                return
+            if self._answering and not self._outgoing:
+                self._answering = False
+                self._awaiting_since = time.monotonic()
+            next_at += FRAME_SECONDS
+            await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+
+    async def _receiver(self, ws, started: float):
+        try:
+            async for raw in ws:
+                try:
+                    data = json.loads(raw)
+                except Exception:
+                    continue
+                if data.get("event") != "media":
+                    continue
+                now = time.monotonic()
+                if not self._agent_speaking:
+                    self._agent_speaking = True
+                    self.result.agent_bursts += 1
+                    if self.result.intro_latency is None:
+                        self.result.intro_latency = now - started
+                    if self._awaiting_since is not None:
+                        self.result.turn_latencies.append(now - self._awaiting_since)
+                        self._awaiting_since = None
+                self._last_agent_audio = now
+        except Exception:
+            pass
+        self._closed = True
+
+    async def run(self) -> CallResult:
+        try:
+            import websockets
+        except Exception:
+            self.result.errors.append("websockets package missing")
+            return self.result
+
+        started = time.monotonic()
+        answers = list(self.script.answers)
+        try:
+            async with websockets.connect(self.ws_url, open_timeout=15, max_size=None) as ws:
+                await self._send(ws, {"event": "connected", "protocol": "Call", "version": "1.0.0"})
+                await self._send(ws, {
+                    "event": "start",
+                    "sequenceNumber": self._next_seq(),
+                    "streamSid": self.stream_sid,
+                    "start": {
+                        "streamSid": self.stream_sid,
+                        "callSid": self.call_sid,
+                        "tracks": ["inbound"],
+                        "mediaFormat": {"encoding": "audio/x-mulaw", "sampleRate": 8000, "channels": 1},
+                        "customParameters": self.custom_parameters,
+                    },
+                })
+                sender = asyncio.create_task(self._sender(ws))
+                receiver = asyncio.create_task(self._receiver(ws, started))
+                try:
+                    await self._converse(answers, started)
+                finally:
+                    if not self._closed:
+                        try:
+                            await self._send(ws, {
+                                "event": "stop",
+                                "sequenceNumber": self._next_seq(),
+                                "streamSid": self.stream_sid,
+                                "stop": {"callSid": self.call_sid},
+                            })
+                        except Exception:
+                            pass
+                    self._closed = True
+                    sender.cancel()
+                    receiver.cancel()
+        except Exception as e:
+            self.result.errors.append(f"media socket error: {type(e).__name__}: {e}")
+
+        self.result.duration = time.monotonic() - started
+        self.result.hung_up = self.hangup.is_set()
+        self._check()
+        return self.result
+
+    async def _converse(self, answers: list[dict], started: float):
+        while not self._closed and not self.hangup.is_set():
+            await asyncio.sleep(0.05)
+            now = time.monotonic()
+            if now - started > self.timeout:
+                self.result.errors.append("call timed out")
+                return
+            if self._agent_speaking and self._last_agent_audio and now - self._last_agent_audio > AGENT_BURST_GAP_SECONDS:
+                self._agent_speaking = False
+            if self._last_agent_audio is None:
+                if now - started > 30:
+                    self.result.errors.append("no agent audio within 30s")
+                    return
+                continue
+            idle = now - self._last_agent_audio
+            if self._answering or self._awaiting_since is not None or idle < self.answer_gap:
+                if self._awaiting_since is not None and now - self._awaiting_since > 30:
+                    self.result.errors.append(f"agent did not respond to answer {self.result.answers_sent}")
+                    return
+                continue
+            if answers:
+                answer = answers.pop(0)
+                self._outgoing.extend(self._answer_frames(answer))
+                self._answering = True
+                self.result.answers_sent += 1
+            elif idle > self.answer_gap * 4:
+                # Script finished and the agent went quiet without hanging up.
+                return
+
+    def _check(self):
+        if self.result.answers_sent < self.result.expected_answers:
+            self.result.errors.append(
+                f"agent flow ended after {self.result.answers_sent}/{self.result.expected_answers} answers"
+            )
+        if len(self.result.turn_latencies) < self.result.answers_sent:
+            self.result.errors.append("missing agent reply after last answer")
+        if self.expect_hangup and not self.result.hung_up:
+            self.result.errors.append("agent never requested hangup")
+        self.result.ok = not self.result.errors
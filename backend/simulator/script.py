@@ -0,0 +1,54 @@
+"""
+Scripted patient answers for simulated monitoring calls.
+"""
+import json
+from dataclasses import dataclass, field
+
+from app.agent.session import AgentSession
+
+
+# A stable, low-risk patient: denies symptoms, reports taking medication.
+DEFAULT_ANSWERS = {
+    "yes_no": "No, I have not.",
+    "trend": "About the same as before.",
+}
+INTENT_ANSWERS = {
+    "INTENT_14_MED_ADHERENCE": "Yes, I took all of them.",
+    "INTENT_19_MED_ADHERENCE_INHALER": "Yes, I used it.",
+}
+
+
+@dataclass
+class CallScript:
+    protocol: str
+    answers: list[dict] = field(default_factory=list)
+    recordings: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def expected_questions(self) -> int:
+        return len(self.answers)
+
+
+def build_script(protocol: str, overrides: dict[str, str] | None = None, recordings: dict[str, str] | None = None) -> CallScript:
+    """One answer per question the agent is expected to wait on (response_type != none)."""
+    session = AgentSession(protocol=protocol)
+    overrides = overrides or {}
+    answers = []
+    for q in session.questions:
+        response_type = q.get("response_type", "yes_no")
+        if response_type == "none":
+            continue
+        intent_id = q["intent_id"]
+        text = overrides.get(intent_id) or INTENT_ANSWERS.get(intent_id) or DEFAULT_ANSWERS.get(response_type, "I am not sure.")
+        answers.append({"intent_id": intent_id, "text": text})
+    return CallScript(protocol=session.protocol, answers=answers, recordings=recordings or {})
+
+
+def load_script_file(path: str, protocol: str) -> CallScript:
+    """
+    JSON file: {"answers": {"INTENT_ID": "text", ...}, "recordings": {"INTENT_ID": "answer.ulaw", ...}}
+    Missing intents fall back to the default answers.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return build_script(protocol, overrides=data.get("answers") or {}, recordings=data.get("recordings") or {})
@@ -0,0 +1,33 @@
+"""
+Small percentile helpers for simulator and benchmark reports.
+"""
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * (pct / 100.0)
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values: list[float], scale: float = 1000.0) -> dict:
+    """count/mean/p50/p95/p99/max, scaled (seconds -> ms by default)."""
+    if not values:
+        return {"count": 0, "mean": None, "p50": None, "p95": None, "p99": None, "max": None}
+
+    def _r(v):
+        return round(v * scale, 2) if v is not None else None
+
+    return {
+        "count": len(values),
+        "mean": _r(sum(values) / len(values)),
+        "p50": _r(percentile(values, 50)),
+        "p95": _r(percentile(values, 95)),
+        "p99": _r(percentile(values, 99)),
+        "max": _r(max(values)),
+    }